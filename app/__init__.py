@@ -1,11 +1,20 @@
 from flask import Flask, url_for
 import os
-import time
 from flask_login import current_user
 from flask_migrate import Migrate
-from sqlalchemy import text
 from app.models import GRADE_LABELS, GRADE_CHOICES
 from .extensions import db, login_manager
+from app.utils.readiness import init_readiness
+from app.utils.db_pool import engine_options, init_db_pool
+from app.utils.replica import init_replica
+from app.metrics import init_metrics
+from app.utils.querytrace import init_query_trace
+from app.utils.profiling import init_profiling
+from app.utils.assets import init_assets
+from app.utils.template_cache import init_template_cache
+from app.utils.page_cache import init_page_cache
+from app.utils.cache import init_cache
+from app.utils.audit import init_audit
 from app.blueprints.student import student_bp
 from app.constants import PAYMENT_METHODS
 
@@ -32,8 +41,22 @@ def create_app():
         or f"sqlite:///{db_path}"
     )
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # pool / timeouts / pgbouncer – ראה app/utils/db_pool.py
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
+    # read replica (אופציונלי) – ראה app/utils/replica.py
+    replica_url = os.getenv("REPLICA_DATABASE_URL")
+    if replica_url:
+        app.config["SQLALCHEMY_BINDS"] = {"replica": {"url": replica_url, **engine_options(replica_url)}}
+    app.config["REPLICA_MAX_LAG_SECONDS"] = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+    app.config["REPLICA_LAG_CHECK_SECONDS"] = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "5"))
+    app.config["REPLICA_STICKY_SECONDS"] = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
     app.config["MATERIALS_UPLOAD_PATH"] = materials_path
-    app.config["TEMPLATES_AUTO_RELOAD"] = True
+    # בלי TEMPLATES_AUTO_RELOAD, Flask בודק את קבצי הטמפלטים רק כש-app.debug
+    # (גם app.run(debug=True)); בפרודקשן לא בכל רינדור
+    if os.getenv("TEMPLATES_AUTO_RELOAD") is not None:
+        app.config["TEMPLATES_AUTO_RELOAD"] = os.getenv("TEMPLATES_AUTO_RELOAD") == "1"
+    # bytecode של טמפלטים על הדיסק, משותף ל-workers (flask templates compile)
+    app.config["JINJA_CACHE_DIR"] = os.getenv("JINJA_CACHE_DIR", os.path.join(app.instance_path, "jinja_cache"))
     app.config["MATERIALS_ALLOWED_EXTENSIONS"] = {
         "pdf", "doc", "docx", "ppt", "pptx", "xls", "xlsx", "txt", "png", "jpg", "jpeg", "gif", "zip", "rar", "mp4", "mp3"
     }
@@ -50,10 +73,65 @@ def create_app():
         TEACHER_EMAIL=os.getenv("TEACHER_EMAIL", ""),     # כתובת המורה לקבלת לידים
     )
 
+    # ---- SQL tracing (N+1 / query budgets) – dev & tests only ----
+    # בלי QUERY_TRACE: פעיל כש-app.debug או app.testing (נבדק בכל בקשה)
+    query_trace = os.getenv("QUERY_TRACE")
+    app.config["QUERY_TRACE"] = None if query_trace is None else query_trace == "1"
+    app.config["QUERY_TRACE_REPEAT_THRESHOLD"] = int(os.getenv("QUERY_TRACE_REPEAT_THRESHOLD", "3"))
+
+    # ---- Profiling (slow requests + on-demand for admins) ----
+    app.config["PROFILING_ENABLED"] = os.getenv("PROFILING_ENABLED", "0") == "1"
+    app.config["PROFILING_HEADER"] = os.getenv("PROFILING_HEADER", "1") == "1"
+    app.config["SLOW_REQUEST_MS"] = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+    app.config["PROFILE_RING_SIZE"] = int(os.getenv("PROFILE_RING_SIZE", "50"))
+    app.config["PROFILE_SAMPLE_INTERVAL_MS"] = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+
+    # ---- Page cache (anonymous landing/login/register); off while app.debug ----
+    app.config["PAGE_CACHE_SECONDS"] = float(os.getenv("PAGE_CACHE_SECONDS", "300"))
+    app.config["PAGE_CACHE_EDGE_SECONDS"] = int(os.getenv("PAGE_CACHE_EDGE_SECONDS", "10"))
+
+    # ---- Application cache (app/utils/cache.py) ----
+    app.config["CACHE_BACKEND"] = os.getenv("CACHE_BACKEND", "local")   # local | redis | null
+    app.config["CACHE_REDIS_URL"] = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    app.config["CACHE_DEFAULT_TTL"] = float(os.getenv("CACHE_DEFAULT_TTL", "300"))
+    app.config["CACHE_MAX_ENTRIES"] = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+
+    # ---- Lesson archive (flask lessons archive) ----
+    app.config["LESSON_ARCHIVE_AFTER_DAYS"] = int(os.getenv("LESSON_ARCHIVE_AFTER_DAYS", "365"))
+
+    # ---- Lesson audit log (flask audit archive) ----
+    app.config["AUDIT_ARCHIVE_AFTER_DAYS"] = int(os.getenv("AUDIT_ARCHIVE_AFTER_DAYS", "180"))
+
+    # ---- Idempotency keys for POSTs (flask idempotency purge) ----
+    app.config["IDEMPOTENCY_TTL_SECONDS"] = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    app.config["IDEMPOTENCY_WAIT_SECONDS"] = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "5"))
+    app.config["IDEMPOTENCY_LOCK_SECONDS"] = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+    # ---- Overdue sweeper (flask lessons sweep-overdue): flag | auto_done ----
+    app.config["OVERDUE_DEFAULT_POLICY"] = os.getenv("OVERDUE_DEFAULT_POLICY", "flag")
+
+    # ---- Health (/readyz, /api/ping – cached, background checker) ----
+    app.config["READINESS_INTERVAL"] = float(os.getenv("READINESS_INTERVAL", "5"))
+    app.config["READINESS_MAX_STALENESS"] = float(os.getenv("READINESS_MAX_STALENESS", "15"))
+
+    # ---- Metrics (Prometheus) ----
+    app.config["METRICS_ENABLED"] = os.getenv("METRICS_ENABLED", "1") == "1"
+    app.config["METRICS_PORT"] = os.getenv("METRICS_PORT") or None
+
     # Init extensions
     db.init_app(app)
     login_manager.init_app(app)
     migrate.init_app(app, db)
+    init_db_pool(app)
+    init_replica(app)
+    init_metrics(app)
+    init_query_trace(app)
+    init_profiling(app)
+    init_assets(app)
+    init_template_cache(app)
+    init_page_cache(app)
+    init_cache(app)
+    init_audit(app)
 
     # Import models so SQLAlchemy knows them
     from . import models  # noqa: F401
@@ -64,6 +142,7 @@ def create_app():
     from .teacher import teacher_bp
     from .admin import admin_bp
     from app.blueprints.lessons import bp as lessons_bp
+    from app.blueprints.api import bp as api_bp
     from app.routes_ping import bp as sys_bp
 
     app.register_blueprint(sys_bp)
@@ -73,7 +152,11 @@ def create_app():
     app.register_blueprint(admin_bp)
     app.register_blueprint(student_bp)
     app.register_blueprint(lessons_bp)
+    app.register_blueprint(api_bp)
 
+    # CLI commands (flask materials gc ...)
+    from .cli import register_cli
+    register_cli(app)
 
     # Template context: dynamic home link based on user role
     @app.context_processor
@@ -90,10 +173,10 @@ def create_app():
         return {"home_url": home_url}
 
     # Diagnostics
-    print("CWD:", os.getcwd())
-    print("APP ROOT:", app.root_path)
-    print("TEMPLATES:", os.path.abspath(app.template_folder))
-    print("STATIC:", os.path.abspath(app.static_folder))
+    app.logger.debug("CWD: %s", os.getcwd())
+    app.logger.debug("APP ROOT: %s", app.root_path)
+    app.logger.debug("TEMPLATES: %s", os.path.abspath(app.template_folder))
+    app.logger.debug("STATIC: %s", os.path.abspath(app.static_folder))
 	
     def inject_payment_constants():
         return dict(PAYMENT_METHODS=PAYMENT_METHODS)
@@ -103,6 +186,7 @@ def create_app():
         rows = [f"{r.rule}  ->  {r.endpoint}" for r in app.url_map.iter_rules()]
         return "<pre>" + "\n".join(sorted(rows)) + "</pre>"
 
+    # liveness: בלי I/O בכלל (readiness ב-/readyz)
     @app.get("/healthz")
     def healthz():
         return "OK"
@@ -118,21 +202,8 @@ def create_app():
 
     # Login loader lives in models.py (already registered)
 
-    # Create tables / wait for DB
-    retries = int(os.getenv("DB_INIT_RETRIES", "20"))
-    delay = float(os.getenv("DB_INIT_DELAY", "1.5"))
-    created = False
-    for attempt in range(1, retries + 1):
-        try:
-            with app.app_context():
-                db.session.execute(text("SELECT 1"))
-                db.create_all()
-            created = True
-            break
-        except Exception as e:  # pragma: no cover - startup only
-            print(f"[create_app] DB not ready (attempt {attempt}/{retries}): {e}")
-            time.sleep(delay)
-    if not created:
-        print("[create_app] Proceeding without create_all; DB still unavailable.")
+    # Schema is owned by migrations / `flask init-db`; no DB I/O here.
+    # A per-worker background thread checks the DB; /readyz reports the cached state.
+    init_readiness(app)
 
     return app
@@ -1,15 +1,19 @@
-from flask import render_template, request, redirect, url_for, flash
+from flask import render_template, request, redirect, url_for, flash, abort
 from flask_login import current_user
 from app.extensions import db
 from app.models import User
 from app.utils.auth import admin_required
+from app.utils.querytrace import query_budget
+from app.utils.profiling import get_profiler
+from sqlalchemy.orm import joinedload
 from . import admin_bp
 
 @admin_bp.route("/users")
+@query_budget(3)
 @admin_required
 def users():
     q = (request.args.get("q") or "").strip()
-    qry = User.query
+    qry = User.query.options(joinedload(User.teacher).load_only(User.id, User.username))
     if q:
         like = f"%{q}%"
         qry = qry.filter((User.username.ilike(like)) | (User.email.ilike(like)))
@@ -31,3 +35,19 @@ def set_role(user_id):
     db.session.commit()
     flash(f"התפקיד של {u.username} עודכן ל-{role}", "success")
     return redirect(url_for("admin.users"))
+
+@admin_bp.route("/profiles")
+@admin_required
+def profiles():
+    profiler = get_profiler()
+    records = list(profiler.records) if profiler else []
+    return render_template("admin/profiles.html", records=records, profiler=profiler)
+
+@admin_bp.route("/profiles/<record_id>")
+@admin_required
+def profile_detail(record_id):
+    profiler = get_profiler()
+    rec = profiler.get(record_id) if profiler else None
+    if rec is None:
+        abort(404)
+    return render_template("admin/profile_detail.html", rec=rec)
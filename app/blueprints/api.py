@@ -0,0 +1,346 @@
+# app/blueprints/api.py
+"""
+REST API בגרסה /api/v1 (JSON): שיעורים, תלמידים, חומרים ותשלומים.
+
+    GET /api/v1/<resource>                   עמוד אחד מהרשימה
+    GET /api/v1/<resource>?ids=1,2,3         כמה פריטים לפי id (עד MAX_IDS)
+    GET /api/v1/<resource>/<id>              פריט אחד
+
+- עימוד לפי מפתח (keyset): תגובת רשימה מחזירה next_cursor, ושולחים אותו
+  ב-?cursor= לעמוד הבא. השאילתה היא WHERE (key) > (last) על מפתח ממוין
+  ומאונדקס – בלי OFFSET, כך שעמוד 1000 עולה כמו עמוד 1. ?order=desc הופך
+  את הכיוון; ?limit= עד MAX_LIMIT.
+- ?fields=start_at,status – רק העמודות האלה נטענות מה-DB (load_only)
+  ומוחזרות; id תמיד מוחזר.
+- הרשאות לפי app/utils/auth.py: מורה רואה את שלו, תלמיד את שלו (בלי
+  שדות התשלום של השיעור), admin הכול. פריט בלי הרשאה נראה כמו שלא קיים.
+- תגובות מעל GZIP_MIN_BYTES נדחסות ב-gzip כשהלקוח שולח Accept-Encoding.
+- שיעורים שעברו ל-lesson_archive לא נכללים.
+"""
+import base64
+import binascii
+import gzip
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from flask import Blueprint, abort, jsonify, request
+from flask_login import current_user
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import lazyload, load_only
+from werkzeug.exceptions import HTTPException
+
+from app.models import Lesson, Payment, StudentMaterial, User
+from app.utils.auth import api_teacher_required, api_user_required
+from app.utils.querytrace import query_budget
+from app.utils.replica import use_replica
+
+bp = Blueprint("api_v1", __name__, url_prefix="/api/v1")
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+MAX_IDS = 100
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+
+
+@dataclass(frozen=True)
+class Resource:
+    model: type
+    fields: tuple                  # עמודות שמותר לבקש
+    default_fields: tuple
+    key: tuple                     # מפתח העימוד; האחרון תמיד id (שובר שוויון)
+    owners: dict                   # role -> עמודת הבעלות; role שלא מופיע מקבל 403
+    where: tuple = ()              # תנאים קבועים
+    filters: dict = field(default_factory=dict)   # פרמטר -> (עמודה, טיפוס), שוויון
+    range_attr: str | None = None  # ?since= / ?until=
+    private_fields: tuple = ()     # לא לתלמידים
+
+
+LESSONS = Resource(
+    model=Lesson,
+    fields=("teacher_id", "student_id", "start_at", "end_at", "status", "duration_minutes",
+            "hourly_rate_at_time_cents", "paid_status", "paid_amount", "payment_method", "notes"),
+    default_fields=("teacher_id", "student_id", "start_at", "end_at", "status", "paid_status"),
+    # ix_lesson_teacher_start / ix_lesson_student_start
+    key=("start_at", "id"),
+    owners={"teacher": "teacher_id", "student": "student_id"},
+    filters={"status": ("status", str), "student_id": ("student_id", int), "teacher_id": ("teacher_id", int)},
+    range_attr="start_at",
+    private_fields=("hourly_rate_at_time_cents", "paid_status", "paid_amount", "payment_method", "notes"),
+)
+
+STUDENTS = Resource(
+    model=User,
+    fields=("username", "email", "grade", "school", "student_rate_cents", "teacher_id", "created_at"),
+    default_fields=("username", "grade", "school", "student_rate_cents"),
+    key=("id",),
+    owners={"teacher": "teacher_id"},
+    where=(User.role == "student",),
+    filters={"school": ("school", str), "grade": ("grade", str)},
+)
+
+MATERIALS = Resource(
+    model=StudentMaterial,
+    fields=("student_id", "teacher_id", "title", "description", "link_url", "file_name", "created_at"),
+    default_fields=("student_id", "title", "link_url", "file_name", "created_at"),
+    key=("id",),
+    owners={"teacher": "teacher_id", "student": "student_id"},
+    filters={"student_id": ("student_id", int)},
+    range_attr="created_at",
+)
+
+PAYMENTS = Resource(
+    model=Payment,
+    fields=("teacher_id", "student_id", "amount_cents", "method", "note", "created_by_id", "created_at"),
+    default_fields=("student_id", "amount_cents", "method", "created_at"),
+    key=("id",),
+    owners={"teacher": "teacher_id", "student": "student_id"},
+    filters={"student_id": ("student_id", int), "method": ("method", str)},
+    range_attr="created_at",
+)
+
+
+# -------------------------
+# עזרים
+# -------------------------
+def _role() -> str:
+    return str(getattr(current_user, "role", "")).lower()
+
+
+def _fields(res: Resource) -> tuple:
+    raw = request.args.get("fields")
+    allowed = res.fields
+    if _role() == "student":
+        allowed = tuple(f for f in allowed if f not in res.private_fields)
+    if not raw:
+        return tuple(f for f in res.default_fields if f in allowed)
+    wanted = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip() and f.strip() != "id"))
+    unknown = [f for f in wanted if f not in allowed]
+    if unknown:
+        abort(400, description=f"unknown fields: {', '.join(unknown)}")
+    return wanted
+
+
+def _query(res: Resource, fields: tuple):
+    """
+    השאילתה הבסיסית: הרשאה + תנאים קבועים + load_only על העמודות הדרושות.
+    קשרים נטענים רק בגישה (lazyload) – ה-API מחזיר רק עמודות, ו-selectin
+    כמו Payment.allocations היה מוסיף שאילתה לכל בקשה.
+    """
+    model = res.model
+    q = model.query.filter(*res.where)
+    if _role() != "admin":
+        owner = res.owners.get(_role())
+        if owner is None:
+            abort(403)
+        q = q.filter(getattr(model, owner) == current_user.id)
+    columns = dict.fromkeys(("id",) + res.key + fields)
+    return q.options(load_only(*(getattr(model, c) for c in columns)), lazyload("*"))
+
+
+def _parse_datetime(name: str):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        abort(400, description=f"{name} must be an ISO date/datetime")
+
+
+def _filtered(res: Resource, q):
+    model = res.model
+    for param, (attr, kind) in res.filters.items():
+        value = request.args.get(param)
+        if value is None or value == "":
+            continue
+        try:
+            q = q.filter(getattr(model, attr) == kind(value))
+        except ValueError:
+            abort(400, description=f"{param} must be {kind.__name__}")
+    if res.range_attr:
+        col = getattr(model, res.range_attr)
+        since, until = _parse_datetime("since"), _parse_datetime("until")
+        if since:
+            q = q.filter(col >= since)
+        if until:
+            q = q.filter(col < until)
+    return q
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _dump(obj, fields: tuple) -> dict:
+    out = {"id": obj.id}
+    for f in fields:
+        out[f] = _plain(getattr(obj, f))
+    return out
+
+
+def _encode_cursor(values, order: str) -> str:
+    raw = json.dumps({"k": [_plain(v) for v in values], "o": order}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(res: Resource, cursor: str, order: str) -> list:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values = data["k"]
+        if data["o"] != order or len(values) != len(res.key):
+            raise ValueError(cursor)
+        out = []
+        for name, value in zip(res.key, values):
+            kind = getattr(res.model, name).type.python_type
+            out.append(datetime.fromisoformat(value) if kind is datetime else kind(value))
+        return out
+    except (binascii.Error, TypeError, KeyError, ValueError):
+        abort(400, description="invalid cursor")
+
+
+def _after(res: Resource, values: list, desc: bool):
+    """(k1, k2) > (v1, v2) כ-OR/AND – עובד בכל מסד ומשתמש באינדקס על k1."""
+    cols = [getattr(res.model, name) for name in res.key]
+    clauses = []
+    for i, col in enumerate(cols):
+        equal = [c == v for c, v in zip(cols[:i], values[:i])]
+        clauses.append(and_(*equal, col < values[i] if desc else col > values[i]))
+    return or_(*clauses)
+
+
+def _collection(res: Resource):
+    if "ids" in request.args:
+        return _bulk(res)
+    fields = _fields(res)
+    order = request.args.get("order", "asc")
+    if order not in ("asc", "desc"):
+        abort(400, description="order must be asc or desc")
+    limit = max(1, min(request.args.get("limit", DEFAULT_LIMIT, type=int), MAX_LIMIT))
+
+    q = _filtered(res, _query(res, fields))
+    cursor = request.args.get("cursor")
+    if cursor:
+        q = q.filter(_after(res, _decode_cursor(res, cursor, order), order == "desc"))
+    cols = [getattr(res.model, name) for name in res.key]
+    q = q.order_by(*(c.desc() if order == "desc" else c.asc() for c in cols))
+
+    rows = q.limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = _encode_cursor([getattr(rows[-1], k) for k in res.key], order) if more else None
+    return jsonify({"data": [_dump(r, fields) for r in rows], "next_cursor": next_cursor})
+
+
+def _bulk(res: Resource):
+    try:
+        ids = list(dict.fromkeys(int(x) for x in request.args["ids"].split(",") if x.strip()))
+    except ValueError:
+        abort(400, description="ids must be integers")
+    if not ids or len(ids) > MAX_IDS:
+        abort(400, description=f"ids: 1..{MAX_IDS} values")
+    fields = _fields(res)
+    found = {obj.id: obj for obj in _query(res, fields).filter(res.model.id.in_(ids))}
+    return jsonify({
+        "data": [_dump(found[i], fields) for i in ids if i in found],
+        "missing": [i for i in ids if i not in found],
+    })
+
+
+def _item(res: Resource, item_id: int):
+    fields = _fields(res)
+    obj = _query(res, fields).filter(res.model.id == item_id).first()
+    if obj is None:
+        abort(404)
+    return jsonify({"data": _dump(obj, fields)})
+
+
+# -------------------------
+# שגיאות ודחיסה
+# -------------------------
+@bp.errorhandler(HTTPException)
+def _http_error(e):
+    return jsonify({"error": e.name, "message": e.description}), e.code
+
+
+@bp.after_request
+def _compress(response):
+    response.vary.add("Accept-Encoding")
+    if (response.status_code != 200 or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or request.accept_encodings["gzip"] <= 0):
+        return response
+    data = response.get_data()
+    if len(data) < GZIP_MIN_BYTES:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+    response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+# -------------------------
+# משאבים
+# -------------------------
+@bp.get("/lessons")
+@query_budget(3)
+@use_replica
+@api_user_required
+def lessons():
+    return _collection(LESSONS)
+
+
+@bp.get("/lessons/<int:item_id>")
+@query_budget(3)
+@use_replica
+@api_user_required
+def lesson(item_id):
+    return _item(LESSONS, item_id)
+
+
+@bp.get("/students")
+@query_budget(3)
+@use_replica
+@api_teacher_required
+def students():
+    return _collection(STUDENTS)
+
+
+@bp.get("/students/<int:item_id>")
+@query_budget(3)
+@use_replica
+@api_teacher_required
+def student(item_id):
+    return _item(STUDENTS, item_id)
+
+
+@bp.get("/materials")
+@query_budget(3)
+@use_replica
+@api_user_required
+def materials():
+    return _collection(MATERIALS)
+
+
+@bp.get("/materials/<int:item_id>")
+@query_budget(3)
+@use_replica
+@api_user_required
+def material(item_id):
+    return _item(MATERIALS, item_id)
+
+
+@bp.get("/payments")
+@query_budget(3)
+@use_replica
+@api_user_required
+def payments():
+    return _collection(PAYMENTS)
+
+
+@bp.get("/payments/<int:item_id>")
+@query_budget(3)
+@use_replica
+@api_user_required
+def payment(item_id):
+    return _item(PAYMENTS, item_id)
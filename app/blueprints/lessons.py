@@ -1,21 +1,24 @@
 # app/blueprints/lessons.py
 from flask import Blueprint, request, redirect, url_for, abort, flash
-from flask_login import login_required
-from app.extensions import db
-from app.models import Lesson
+from flask_login import current_user
 from app.constants import PAYMENT_METHODS
+from app.utils.auth import teacher_required
+from app.utils.idempotency import idempotent
+from app.utils.payments import apply_payment, PaymentError, UPDATED, FORBIDDEN
 
 bp = Blueprint("lessons", __name__)
 
 @bp.post("/lessons/<int:lesson_id>/payment_method")
-@login_required
+@teacher_required
+@idempotent
 def set_payment_method(lesson_id):
-    lesson = Lesson.query.get_or_404(lesson_id)
+    # אותו נתיב כמו teacher.set_payment_method / teacher.set_payments_batch
     value = request.form.get("payment_method")
-    allowed = dict(PAYMENT_METHODS)
-    if value not in allowed:
+    try:
+        result = apply_payment(current_user, [lesson_id], value)[lesson_id]
+    except PaymentError:
         abort(400, description="payment method not allowed")
-    lesson.payment_method = value
-    db.session.commit()
-    flash(f"אופן התשלום עודכן ל־{allowed[value]}", "success")
+    if result != UPDATED:
+        abort(403 if result == FORBIDDEN else 404)
+    flash(f"אופן התשלום עודכן ל־{dict(PAYMENT_METHODS)[(value or '').strip()]}", "success")
     return redirect(request.referrer or url_for("teacher.dashboard"))
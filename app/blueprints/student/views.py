@@ -1,16 +1,16 @@
 from datetime import datetime
 from flask import render_template, current_app, send_from_directory, abort
 from flask_login import login_required, current_user
-from sqlalchemy import func, or_
 from app.extensions import db
-from app.models import Lesson, StudentMaterial
+from app.utils.querytrace import query_budget
+from app.models import Lesson, StudentMaterial, lesson_scheduled_clause
 from . import student_bp
 
 def _get_upcoming_lessons(student_id, limit=5):
     return (Lesson.query
             .filter(Lesson.student_id == student_id,
                     Lesson.start_at >= datetime.utcnow(),
-                    or_(Lesson.status.is_(None), func.lower(Lesson.status).notin_(("cancelled", "done"))))
+                    lesson_scheduled_clause())
             .order_by(Lesson.start_at.asc())
             .limit(limit)
             .all())
@@ -24,6 +24,7 @@ def _get_student_materials(student_id, limit=None):
     return q.all()
 
 @student_bp.route("/dashboard")
+@query_budget(4)
 @login_required
 def dashboard():
     if getattr(current_user, "role", None) != "student":
@@ -0,0 +1,210 @@
+# app/cli.py
+import os
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+materials_cli = AppGroup("materials", help="תחזוקת תיקיית חומרי הלימוד.")
+lessons_cli = AppGroup("lessons", help="תחזוקת טבלת השיעורים.")
+assets_cli = AppGroup("assets", help="קבצים סטטיים לפרודקשן.")
+templates_cli = AppGroup("templates", help="טמפלטים של Jinja.")
+notifications_cli = AppGroup("notifications", help="תור ההתראות.")
+audit_cli = AppGroup("audit", help="יומן השינויים של השיעורים.")
+idempotency_cli = AppGroup("idempotency", help="מפתחות idempotency של בקשות POST.")
+
+
+@materials_cli.command("gc")
+@click.option("--grace-hours", default=24.0, show_default=True,
+              help="קבצים צעירים מזה לא נוגעים בהם (העלאות שעוד לא עשו commit).")
+@click.option("--action", type=click.Choice(["quarantine", "delete"]), default="quarantine", show_default=True)
+@click.option("--quarantine-dir", default=None,
+              help="יעד להסגר (ברירת מחדל: instance/materials_quarantine).")
+@click.option("--dry-run", is_flag=True, help="רק לדווח, בלי לגעת בקבצים.")
+def materials_gc(grace_hours, action, quarantine_dir, dry_run):
+    """מוצא קבצים ב-instance/materials שאין להם שורה ב-student_material."""
+    from app.utils.materials_gc import collect_orphans
+
+    upload_path = current_app.config.get("MATERIALS_UPLOAD_PATH")
+    quarantine_dir = quarantine_dir or os.path.join(current_app.instance_path, "materials_quarantine")
+    stats = collect_orphans(
+        upload_path,
+        grace_seconds=grace_hours * 3600,
+        action=action,
+        quarantine_path=quarantine_dir,
+        dry_run=dry_run,
+        logger=current_app.logger,
+    )
+    mb = stats["reclaimed_bytes"] / (1024 * 1024)
+    verb = "would reclaim" if dry_run else "reclaimed"
+    click.echo(
+        f"scanned={stats['scanned']} referenced={stats['referenced']} too_new={stats['too_new']} "
+        f"orphans={stats['orphans']} failed={stats['failed']} {verb}={stats['reclaimed_bytes']} bytes ({mb:.1f} MB)"
+    )
+
+
+@lessons_cli.command("archive")
+@click.option("--older-than-days", type=int, default=None,
+              help="אופק הארכוב (ברירת מחדל: LESSON_ARCHIVE_AFTER_DAYS).")
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option("--max-batches", type=int, default=None, help="לעצור אחרי N מנות (ההרצה הבאה ממשיכה).")
+@click.option("--pause", default=0.0, show_default=True, help="שניות המתנה בין מנות (להקל על המסד).")
+@click.option("--dry-run", is_flag=True, help="רק לספור כמה שיעורים מועמדים.")
+def lessons_archive(older_than_days, batch_size, max_batches, pause, dry_run):
+    """מעביר שיעורים done/cancelled ישנים ל-lesson_archive, במנות."""
+    from datetime import datetime, timedelta
+    from app.utils.lesson_archive import archive_horizon, archive_lessons
+
+    horizon = archive_horizon()
+    if older_than_days is None:
+        before = horizon
+    else:
+        before = datetime.utcnow() - timedelta(days=older_than_days)
+        if before > horizon:
+            # הדוחות מאחדים את הארכיון רק לפני האופק – שורות חדשות יותר היו נעלמות מהם
+            raise click.BadParameter("must be >= LESSON_ARCHIVE_AFTER_DAYS", param_hint="--older-than-days")
+    stats = archive_lessons(before, batch_size=batch_size, max_batches=max_batches,
+                            pause=pause, dry_run=dry_run, logger=current_app.logger)
+    if dry_run:
+        click.echo(f"before={before:%Y-%m-%d} candidates={stats['remaining']}")
+    else:
+        left = "done" if stats["remaining"] == 0 else "more left"
+        click.echo(f"before={before:%Y-%m-%d} batches={stats['batches']} moved={stats['moved']} ({left})")
+
+
+@lessons_cli.command("sweep-overdue")
+@click.option("--grace-minutes", type=int, default=None, help="ברירת מחדל: OVERDUE_GRACE_MINUTES (30).")
+@click.option("--batch-size", default=500, show_default=True)
+@click.option("--max-batches", type=int, default=None)
+@click.option("--lease-ttl", default=300, show_default=True, help="שניות; הרצה חופפת מדלגת כל עוד החכירה בתוקף.")
+@click.option("--dry-run", is_flag=True, help="רק לספור מועמדים לפי מדיניות.")
+def lessons_sweep_overdue(grace_minutes, batch_size, max_batches, lease_ttl, dry_run):
+    """מסמן שיעורים שעבר זמנם (done אוטומטי / דגל, לפי המורה) ומכניס התראות לתור. מיועד ל-cron."""
+    from app.teacher.dashboard import OVERDUE_GRACE_MINUTES
+    from app.utils.lease import job_lease
+    from app.utils.overdue import sweep_overdue
+
+    grace = OVERDUE_GRACE_MINUTES if grace_minutes is None else grace_minutes
+    if dry_run:
+        stats = sweep_overdue(grace_minutes=grace, dry_run=True)
+        click.echo(f"candidates auto_done={stats['auto_done']} flagged={stats['flagged']}")
+        return
+    with job_lease("lessons.sweep_overdue", ttl=lease_ttl) as lease:
+        if lease is None:
+            click.echo("another sweep holds the lease; skipping")
+            return
+        stats = sweep_overdue(grace_minutes=grace, batch_size=batch_size, max_batches=max_batches,
+                              lease=lease, logger=current_app.logger)
+    click.echo(f"batches={stats['batches']} auto_done={stats['auto_done']} "
+               f"flagged={stats['flagged']} notified_teachers={stats['notified']}")
+
+
+@audit_cli.command("archive")
+@click.option("--batch-size", default=5000, show_default=True)
+@click.option("--max-batches", type=int, default=None, help="לעצור אחרי N מנות (ההרצה הבאה ממשיכה).")
+@click.option("--pause", default=0.0, show_default=True, help="שניות המתנה בין מנות.")
+@click.option("--lease-ttl", default=600, show_default=True)
+def audit_archive(batch_size, max_batches, pause, lease_ttl):
+    """מעביר אירועים ישנים מ-AUDIT_ARCHIVE_AFTER_DAYS ל-lesson_event_archive, במנות. מיועד ל-cron."""
+    from app.utils.audit import archive_events, audit_horizon
+    from app.utils.lease import job_lease
+
+    before = audit_horizon()
+    with job_lease("audit.archive", ttl=lease_ttl) as lease:
+        if lease is None:
+            click.echo("another archive run holds the lease; skipping")
+            return
+        stats = archive_events(before, batch_size=batch_size, max_batches=max_batches,
+                               pause=pause, lease=lease, logger=current_app.logger)
+    click.echo(f"before={before:%Y-%m-%d} batches={stats['batches']} moved={stats['moved']}")
+
+
+@idempotency_cli.command("purge")
+@click.option("--batch-size", default=5000, show_default=True)
+def idempotency_purge(batch_size):
+    """מוחק מפתחות שעבר עליהם IDEMPOTENCY_TTL_SECONDS. מיועד ל-cron."""
+    from app.utils.idempotency import purge_expired
+
+    deleted = purge_expired(batch_size=batch_size, logger=current_app.logger)
+    click.echo(f"deleted={deleted}")
+
+
+@notifications_cli.command("send")
+@click.option("--batch-size", default=100, show_default=True)
+@click.option("--max-attempts", default=5, show_default=True)
+def notifications_send(batch_size, max_attempts):
+    """שולח התראות שממתינות בתור (במייל)."""
+    from app.utils.lease import job_lease
+    from app.utils.notifications import send_pending
+
+    with job_lease("notifications.send", ttl=600) as lease:
+        if lease is None:
+            click.echo("another sender holds the lease; skipping")
+            return
+        stats = send_pending(batch_size=batch_size, max_attempts=max_attempts, logger=current_app.logger)
+    click.echo(f"sent={stats['sent']} failed={stats['failed']}")
+
+
+@assets_cli.command("build")
+@click.option("--min-size", default=256, show_default=True, help="קבצים קטנים מזה לא נדחסים.")
+def assets_build(min_size):
+    """יוצר גרסאות .gz/.br מוכנות מראש לקבצים ב-static (nginx מגיש אותן ישירות)."""
+    from app.utils.assets import build_compressed
+
+    stats = build_compressed(current_app.static_folder, min_size=min_size)
+    click.echo(
+        f"files={stats['files']} gzip={stats['gzip']} brotli={stats['brotli']} skipped={stats['skipped']}"
+        + ("" if stats["brotli_available"] else " (brotli not installed: .gz only)")
+    )
+
+
+@templates_cli.command("compile")
+def templates_compile():
+    """מקמפל את כל הטמפלטים למטמון ה-bytecode (JINJA_CACHE_DIR)."""
+    from app.utils.template_cache import compile_all
+
+    if current_app.jinja_env.bytecode_cache is None:
+        raise click.ClickException("JINJA_CACHE_DIR is not set")
+    compiled, failed = compile_all(current_app)
+    for name, error in failed:
+        click.echo(f"FAILED {name}: {error}", err=True)
+    click.echo(f"compiled={compiled} failed={len(failed)} dir={current_app.config['JINJA_CACHE_DIR']}")
+    if failed:
+        raise SystemExit(1)
+
+
+@click.command("init-db")
+@click.option("--retries", type=int, default=lambda: int(os.getenv("DB_INIT_RETRIES", "20")),
+              show_default="DB_INIT_RETRIES or 20")
+@click.option("--delay", type=float, default=lambda: float(os.getenv("DB_INIT_DELAY", "1.5")),
+              show_default="DB_INIT_DELAY or 1.5")
+def init_db(retries, delay):
+    """ממתין למסד ויוצר טבלאות חסרות (create_all). רץ פעם אחת לפני gunicorn."""
+    from sqlalchemy import text
+    from app.extensions import db
+
+    for attempt in range(1, retries + 1):
+        try:
+            db.session.execute(text("SELECT 1"))
+            # לסגור את הטרנזקציה לפני create_all – במצב SQLite היא מחזיקה את נעילת הכתיבה
+            db.session.commit()
+            db.create_all()
+            click.echo("[init-db] schema ready")
+            return
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"[init-db] DB not ready (attempt {attempt}/{retries}): {e}")
+            time.sleep(delay)
+    raise click.ClickException("DB still unavailable")
+
+
+def register_cli(app):
+    app.cli.add_command(materials_cli)
+    app.cli.add_command(lessons_cli)
+    app.cli.add_command(notifications_cli)
+    app.cli.add_command(audit_cli)
+    app.cli.add_command(idempotency_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(templates_cli)
+    app.cli.add_command(init_db)
@@ -1,8 +1,9 @@
 # app/extensions.py
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from app.utils.replica import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"          # לאן להפנות אם לא מחובר
 login_manager.login_message_category = "info"
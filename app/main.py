@@ -1,17 +1,21 @@
 from datetime import datetime
 from flask import Blueprint, jsonify, redirect, render_template, request, url_for, flash, current_app
 from flask_login import current_user, login_required
-from sqlalchemy import or_
 from .extensions import db, login_manager
 from .models import Lesson, User, GRADE_CHOICES, VALID_GRADES, Lead
 from app.constants import SCHOOLS
 from app.utils.teacher import get_default_teacher
 from app.utils.mail import send_email
+from app.utils.idempotency import idempotent
+from app.utils.querytrace import query_budget
+from app.utils.replica import use_replica
+from sqlalchemy.orm import joinedload
 main_bp = Blueprint("main", __name__)
 @main_bp.route("/")
 def landing():
     return render_template("landing.html")
 @main_bp.post("/contact/lead")
+@idempotent
 def submit_lead():
     # honeypot נגד בוטים: שדה חבוי שלא אמור להתמלא
     if (request.form.get("website") or "").strip():
@@ -148,6 +152,8 @@ def edit_profile():
 def calendar_view():
     return render_template("calendar.html")
 @main_bp.route("/api/calendar/events", endpoint="calendar_events")
+@query_budget(3)
+@use_replica
 @login_required
 def calendar_events():
     role = (getattr(current_user, "role", "") or "").strip()
@@ -155,7 +161,12 @@ def calendar_events():
         q = Lesson.query.filter_by(teacher_id=current_user.id)
     else:
         q = Lesson.query.filter_by(student_id=current_user.id)
-    q = q.filter(or_(Lesson.status.is_(None), Lesson.status != "cancelled"))
+    # שמות המורה/התלמיד ב-JOIN אחד, לא שאילתה לכל שיעור
+    q = q.options(
+        joinedload(Lesson.student).load_only(User.id, User.username),
+        joinedload(Lesson.teacher).load_only(User.id, User.username),
+    )
+    q = q.filter(Lesson.status != "cancelled")
     events = []
     for l in q.order_by(Lesson.start_at.asc()).all():
         title = (
@@ -0,0 +1,137 @@
+# app/metrics.py
+"""
+מדדי Prometheus.
+
+- זמן תגובה לכל endpoint (blueprint.view) – דרך prometheus-flask-exporter.
+- בקשות בטיפול (in-flight).
+- מספר וזמן פקודות SQL לכל בקשה – מאירועי engine של SQLAlchemy.
+- זמן המתנה ל-checkout מה-pool.
+- משך משימות PDF ומייל.
+- hit/miss של מטמון האפליקציה (app/utils/cache.py) לפי namespace.
+
+תחת gunicorn עם כמה workers יש להגדיר PROMETHEUS_MULTIPROC_DIR לפני
+ה-import של prometheus_client (gunicorn.conf.py עושה את זה), והמדדים
+מוגשים מפורט נפרד (METRICS_PORT) ולא דרך האפליקציה.
+"""
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_request_context, request
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.utils.db_pool import add_checkout_observer
+
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled",
+    multiprocess_mode="livesum",
+)
+REQUEST_SQL_STATEMENTS = Histogram(
+    "http_request_sql_statements", "SQL statements issued per request", ["endpoint"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233),
+)
+REQUEST_SQL_SECONDS = Histogram(
+    "http_request_sql_seconds", "Time spent in SQL per request", ["endpoint"],
+)
+SQL_STATEMENT_SECONDS = Histogram(
+    "db_statement_duration_seconds", "Duration of a single SQL statement",
+)
+POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds", "Time waiting for a pooled connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+CACHE_REQUESTS = Counter(
+    "app_cache_requests_total", "Application cache lookups", ["cache", "result"],
+)
+JOB_SECONDS = Histogram(
+    "job_duration_seconds", "Duration of background-ish jobs (PDF export, email)", ["job", "outcome"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+
+# -------------------------
+# משימות (PDF / מייל)
+# -------------------------
+@contextmanager
+def track_job(job: str):
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        JOB_SECONDS.labels(job, outcome).observe(time.perf_counter() - start)
+
+
+def timed_job(job: str):
+    """דקורטור: מודד משך קריאה לפונקציה תחת job_duration_seconds{job=...}."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with track_job(job):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+# -------------------------
+# SQL לכל בקשה
+# -------------------------
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_metrics_t0", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("_metrics_t0")
+    if not stack:
+        return
+    elapsed = time.perf_counter() - stack.pop()
+    SQL_STATEMENT_SECONDS.observe(elapsed)
+    if has_request_context():
+        g._sql_count = g.get("_sql_count", 0) + 1
+        g._sql_seconds = g.get("_sql_seconds", 0.0) + elapsed
+
+
+def init_metrics(app):
+    if not app.config.get("METRICS_ENABLED"):
+        return None
+
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # gunicorn: כל worker כותב לתיקייה משותפת, ה-master מגיש מפורט נפרד
+        from prometheus_flask_exporter.multiprocess import GunicornPrometheusMetrics
+        exporter = GunicornPrometheusMetrics(app, group_by="endpoint")
+    else:
+        from prometheus_flask_exporter import PrometheusMetrics
+        exporter = PrometheusMetrics(app, path=None, group_by="endpoint")
+        port = app.config.get("METRICS_PORT")
+        if port:
+            exporter.start_http_server(int(port))
+
+    @app.before_request
+    def _metrics_before_request():
+        g._sql_count = 0
+        g._sql_seconds = 0.0
+        g._metrics_in_flight = True
+        IN_FLIGHT.inc()
+
+    @app.teardown_request
+    def _metrics_teardown_request(exc):
+        if not g.pop("_metrics_in_flight", False):
+            return
+        IN_FLIGHT.dec()
+        endpoint = request.endpoint or "unknown"
+        REQUEST_SQL_STATEMENTS.labels(endpoint).observe(g.get("_sql_count", 0))
+        REQUEST_SQL_SECONDS.labels(endpoint).observe(g.get("_sql_seconds", 0.0))
+
+    # העטיפה של pool.connect עצמה ב-app/utils/db_pool.py
+    add_checkout_observer(POOL_CHECKOUT_SECONDS.observe)
+
+    app.extensions["metrics"] = exporter
+    return exporter
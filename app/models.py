@@ -5,7 +5,7 @@ from enum import Enum
 from datetime import datetime
 from .extensions import db, login_manager
 from decimal import Decimal
-from sqlalchemy import Index, Numeric, event
+from sqlalchemy import Index, Numeric, event, inspect, literal_column
 
 
 
@@ -18,6 +18,28 @@ class RoleEnum(str, Enum):
     teacher = "teacher"
     admin   = "admin"
 
+class LessonStatus(str, Enum):
+    scheduled = "scheduled"
+    done      = "done"
+    cancelled = "cancelled"
+
+class PaidStatus(str, Enum):
+    unpaid  = "unpaid"
+    partial = "partial"
+    paid    = "paid"
+
+LESSON_STATUSES = tuple(s.value for s in LessonStatus)   # ("scheduled","done","cancelled")
+PAID_STATUSES   = tuple(s.value for s in PaidStatus)     # ("unpaid","partial","paid")
+OVERDUE_POLICIES = ("flag", "auto_done")
+
+
+def _in_list_sql(col: str, values) -> str:
+    return f"{col} IN ({', '.join(repr(v) for v in values)})"
+
+# תנאי ה-WHERE של האינדקסים החלקיים (שיעורים פעילים בלבד)
+SCHEDULED_ONLY = "status = 'scheduled'"
+OVERDUE_UNSWEPT = "status = 'scheduled' AND overdue_flagged_at IS NULL"
+
 class User(UserMixin, db.Model):        # ← יורש מ־UserMixin
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
@@ -31,6 +53,10 @@ class User(UserMixin, db.Model):        # ← יורש מ־UserMixin
     # hourly_rate = db.Column(db.Numeric(10, 2))
     student_rate_cents = db.Column(db.Integer, nullable=False, default=11000, server_default="11000")
     school = db.Column(db.String(50), index=True)   # בית ספר (אופציונלי)
+    # מונה שעולה בכל שינוי ברשימת התלמידים של המורה (מפתח למטמון הדשבורד)
+    students_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # מורה: מה עושה ה-sweeper עם שיעורים שעבר זמנם (OVERDUE_POLICIES; NULL = ברירת המחדל מה-config)
+    overdue_policy = db.Column(db.String(20))
 
 
     def is_teacher(self):
@@ -80,7 +106,39 @@ class User(UserMixin, db.Model):        # ← יורש מ־UserMixin
             return None
     
     
-class Lesson(db.Model):
+class LessonPricingMixin:
+    """חישובי עזר משותפים ל-Lesson ול-LessonArchive."""
+
+    is_archived = False
+
+    @property
+    def cost(self) -> float:
+        hours = (self.duration_minutes or 0) / 60.0
+        return round(self.hourly_rate_at_time * hours, 2)
+
+    @property
+    def hourly_rate(self) -> float:
+        return round((self.hourly_rate_cents or 0) / 100.0, 2)
+
+    @hourly_rate.setter
+    def hourly_rate(self, value):
+        self.hourly_rate_cents = int(round(float(value or 0) * 100))
+
+    @property
+    def hourly_rate_at_time(self) -> float:
+        return round((self.hourly_rate_at_time_cents or 0) / 100.0, 2)
+
+    @hourly_rate_at_time.setter
+    def hourly_rate_at_time(self, value):
+        self.hourly_rate_at_time_cents = int(round(float(value or 0) * 100))
+
+    @property
+    def amount_due(self) -> float:
+        """יתרה לתשלום (עלות פחות סכום ששולם)."""
+        return max(self.cost - float(self.paid_amount or 0.0), 0.0)
+
+
+class Lesson(LessonPricingMixin, db.Model):
     __tablename__ = "lesson"
 
     id = db.Column(db.Integer, primary_key=True)
@@ -96,17 +154,19 @@ class Lesson(db.Model):
     start_at = db.Column(db.DateTime, nullable=False)
     end_at   = db.Column(db.DateTime, nullable=False)
 
-    # סטטוס ותמחור
-    status = db.Column(db.String(20))
+    # סטטוס ותמחור (ערכים מנורמלים: LESSON_STATUSES, תמיד באותיות קטנות)
+    status = db.Column(db.String(20), nullable=False, default="scheduled", server_default="scheduled")
     hourly_rate_cents         = db.Column(db.Integer, nullable=False, server_default="11000")
     hourly_rate_at_time_cents = db.Column(db.Integer, nullable=False, server_default="11000")
 
     # תשלומים
-    paid_status = db.Column(db.String(20), nullable=False, default="unpaid")  # unpaid / partial / paid
+    paid_status = db.Column(db.String(20), nullable=False, default="unpaid", server_default="unpaid")  # unpaid / partial / paid
     paid_amount = db.Column(db.Float,       nullable=False, default=0.0)
 
     payment_method = db.Column(db.String(30), nullable=True)
 
+    # מתי ה-sweeper סימן את השיעור כשעבר זמנו (flag / auto_done); NULL = עוד לא טופל
+    overdue_flagged_at = db.Column(db.DateTime)
 
     # משך השיעור בדקות (נשמר בעמודה)
     duration_minutes = db.Column(db.Integer, nullable=False, default=60)
@@ -114,43 +174,77 @@ class Lesson(db.Model):
     # הערות
     notes = db.Column(db.Text)
 
-    # אינדקסים מועילים
+    # אינדקסים לפי נתיבי הגישה בפועל
     __table_args__ = (
         db.CheckConstraint('end_at > start_at', name='ck_lesson_time_order'),
+        db.CheckConstraint(_in_list_sql("status", LESSON_STATUSES), name="ck_lesson_status"),
+        db.CheckConstraint(_in_list_sql("paid_status", PAID_STATUSES), name="ck_lesson_paid_status"),
         Index("ix_lesson_teacher_start", "teacher_id", "start_at"),
         Index("ix_lesson_student_start", "student_id", "start_at"),
+        # lessons_completed (status='done') ולוח שנה
+        Index("ix_lesson_teacher_status_start", "teacher_id", "status", "start_at"),
+        # דשבורד מורה: שיעורים פעילים אחרונים
+        Index("ix_lesson_teacher_start_scheduled", "teacher_id", "start_at",
+              postgresql_where=db.text(SCHEDULED_ONLY), sqlite_where=db.text(SCHEDULED_ONLY)),
+        # דשבורד תלמיד: שיעורים קרובים
+        Index("ix_lesson_student_start_scheduled", "student_id", "start_at",
+              postgresql_where=db.text(SCHEDULED_ONLY), sqlite_where=db.text(SCHEDULED_ONLY)),
+        # שיעורים שעבר זמנם
+        Index("ix_lesson_teacher_end", "teacher_id", "end_at",
+              postgresql_where=db.text(SCHEDULED_ONLY), sqlite_where=db.text(SCHEDULED_ONLY)),
+        # ה-sweeper: שיעורים שעבר זמנם אצל כל המורים ועוד לא טופלו
+        Index("ix_lesson_overdue_sweep", "end_at",
+              postgresql_where=db.text(OVERDUE_UNSWEPT), sqlite_where=db.text(OVERDUE_UNSWEPT)),
     )
 
 
-    # חישובי עזר
-    @property
-    def cost(self) -> float:
-        hours = (self.duration_minutes or 0) / 60.0
-        return round(self.hourly_rate_at_time * hours, 2)
+    def __repr__(self) -> str:
+        return f"<Lesson id={self.id} teacher={self.teacher_id} student={self.student_id} start={self.start_at} end={self.end_at}>"
 
-    @property
-    def hourly_rate(self) -> float:
-        return round((self.hourly_rate_cents or 0) / 100.0, 2)
 
-    @hourly_rate.setter
-    def hourly_rate(self, value):
-        self.hourly_rate_cents = int(round(float(value or 0) * 100))
+# עמודות שמועברות כמו שהן מ-lesson ל-lesson_archive
+LESSON_ARCHIVE_COLUMNS = (
+    "id", "teacher_id", "student_id", "start_at", "end_at", "status",
+    "hourly_rate_cents", "hourly_rate_at_time_cents", "paid_status", "paid_amount",
+    "payment_method", "duration_minutes", "notes",
+)
 
-    @property
-    def hourly_rate_at_time(self) -> float:
-        return round((self.hourly_rate_at_time_cents or 0) / 100.0, 2)
 
-    @hourly_rate_at_time.setter
-    def hourly_rate_at_time(self, value):
-        self.hourly_rate_at_time_cents = int(round(float(value or 0) * 100))
+class LessonArchive(LessonPricingMixin, db.Model):
+    """
+    שיעורים שהסתיימו/בוטלו לפני אופק הארכוב (flask lessons archive).
+    אותו id כמו ב-lesson, כך שהעברה חוזרת של אותה שורה נכשלת ולא משכפלת.
+    """
+    __tablename__ = "lesson_archive"
 
-    @property
-    def amount_due(self) -> float:
-        """יתרה לתשלום (עלות פחות סכום ששולם)."""
-        return max(self.cost - float(self.paid_amount or 0.0), 0.0)
+    is_archived = True
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    teacher_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+    student_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+
+    teacher = db.relationship("User", foreign_keys=[teacher_id])
+    student = db.relationship("User", foreign_keys=[student_id])
+
+    start_at = db.Column(db.DateTime, nullable=False)
+    end_at   = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    hourly_rate_cents         = db.Column(db.Integer, nullable=False)
+    hourly_rate_at_time_cents = db.Column(db.Integer, nullable=False)
+    paid_status = db.Column(db.String(20), nullable=False)
+    paid_amount = db.Column(db.Float, nullable=False, default=0.0)
+    payment_method = db.Column(db.String(30), nullable=True)
+    duration_minutes = db.Column(db.Integer, nullable=False)
+    notes = db.Column(db.Text)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_lesson_archive_teacher_status_start", "teacher_id", "status", "start_at"),
+        Index("ix_lesson_archive_student_start", "student_id", "start_at"),
+    )
 
     def __repr__(self) -> str:
-        return f"<Lesson id={self.id} teacher={self.teacher_id} student={self.student_id} start={self.start_at} end={self.end_at}>"
+        return f"<LessonArchive id={self.id} teacher={self.teacher_id} student={self.student_id} start={self.start_at}>"
 
 
 class StudentMaterial(db.Model):
@@ -169,15 +263,131 @@ class StudentMaterial(db.Model):
     student = db.relationship("User", foreign_keys=[student_id], backref="materials_received")
     teacher = db.relationship("User", foreign_keys=[teacher_id], backref="materials_created")
 
+    # רשימת החומרים של תלמיד ממוינת לפי created_at – סריקת אינדקס אחת
+    __table_args__ = (
+        Index("ix_student_material_student_created", "student_id", "created_at"),
+    )
+
     def has_file(self) -> bool:
         return bool(self.file_path)
 
     def __repr__(self) -> str:
         return f"<StudentMaterial id={self.id} student={self.student_id} title={self.title!r}>"
 
+class LedgerEntryType(str, Enum):
+    opening = "opening"   # יתרת פתיחה (העברה ידנית / התאמה)
+    charge  = "charge"    # חיוב על שיעור שבוצע (שלילי); ביטול/שינוי מחיר – תיקון חיובי
+    payment = "payment"   # תשלום (חיובי); החזר/ביטול סימון – שלילי
+
+LEDGER_ENTRY_TYPES = tuple(t.value for t in LedgerEntryType)
+
+
+class Payment(db.Model):
+    """תשלום שהתקבל מתלמיד (באגורות). הקצאה לשיעורים ב-PaymentAllocation; היתרה – זיכוי."""
+    __tablename__ = "payment"
+
+    id = db.Column(db.Integer, primary_key=True)
+    teacher_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    amount_cents = db.Column(db.Integer, nullable=False)
+    method = db.Column(db.String(30))
+    note = db.Column(db.String(255))
+    created_by_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    allocations = db.relationship("PaymentAllocation", backref="payment", lazy="selectin")
+
+    __table_args__ = (
+        Index("ix_payment_student_created", "student_id", "created_at"),
+        Index("ix_payment_teacher_created", "teacher_id", "created_at"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<Payment id={self.id} student={self.student_id} amount_cents={self.amount_cents}>"
+
+
+class PaymentAllocation(db.Model):
+    """חלק מתשלום שהוקצה לשיעור. lesson_id בלי FK – השיעור יכול לעבור ל-lesson_archive."""
+    __tablename__ = "payment_allocation"
+
+    id = db.Column(db.Integer, primary_key=True)
+    payment_id = db.Column(db.Integer, db.ForeignKey("payment.id", ondelete="CASCADE"), nullable=False, index=True)
+    lesson_id = db.Column(db.Integer, nullable=False, index=True)
+    amount_cents = db.Column(db.Integer, nullable=False)
+
+
+class LedgerEntry(db.Model):
+    """
+    יומן חשבון של תלמיד – רק הוספה, בלי עדכון/מחיקה.
+    amount_cents חיובי = לטובת התלמיד; balance_after_cents = היתרה המצטברת
+    אחרי השורה, כך שדף חשבון לתקופה הוא סריקת טווח אחת על (student_id, created_at).
+    """
+    __tablename__ = "ledger_entry"
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    teacher_id = db.Column(db.Integer)
+    entry_type = db.Column(db.String(20), nullable=False)
+    amount_cents = db.Column(db.Integer, nullable=False)
+    balance_after_cents = db.Column(db.Integer, nullable=False)
+    lesson_id = db.Column(db.Integer)
+    payment_id = db.Column(db.Integer, db.ForeignKey("payment.id"))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.CheckConstraint(_in_list_sql("entry_type", LEDGER_ENTRY_TYPES), name="ck_ledger_entry_type"),
+        Index("ix_ledger_student_created", "student_id", "created_at", "id"),
+        Index("ix_ledger_lesson", "lesson_id"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<LedgerEntry id={self.id} student={self.student_id} {self.entry_type} {self.amount_cents}>"
+
+
+class StudentBalance(db.Model):
+    """
+    יתרה נוכחית לתלמיד, מתעדכנת יחד עם כל שורה ב-ledger_entry (app/utils/ledger.py).
+    balance_cents = paid_cents - charged_cents; שלילי = התלמיד חייב.
+    """
+    __tablename__ = "student_balance"
+
+    student_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True, autoincrement=False)
+    teacher_id = db.Column(db.Integer)
+    balance_cents = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    charged_cents = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    paid_cents = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # "מי חייב לי" של מורה – ממוין לפי יתרה
+    __table_args__ = (
+        Index("ix_student_balance_teacher_balance", "teacher_id", "balance_cents"),
+    )
+
+    @property
+    def owed_cents(self) -> int:
+        return max(-(self.balance_cents or 0), 0)
+
+    @property
+    def credit_cents(self) -> int:
+        return max(self.balance_cents or 0, 0)
+
+
+def _normalize_lesson_statuses(target: "Lesson") -> None:
+    # הסטטוסים נשמרים תמיד באותיות קטנות, כדי שהשאילתות לא יצטרכו lower()
+    target.status = (target.status or LessonStatus.scheduled.value).strip().lower()
+    target.paid_status = (target.paid_status or PaidStatus.unpaid.value).strip().lower()
+
+
+def lesson_scheduled_clause():
+    """status = 'scheduled' כליטרל (לא bind) – כך SQLite יכול להשתמש באינדקס החלקי."""
+    return Lesson.status == literal_column("'scheduled'")
+
+
 @event.listens_for(Lesson, "before_insert")
 
 def _lesson_before_insert(mapper, connection, target: "Lesson"):
+    _normalize_lesson_statuses(target)
+
     # אם לא קיים צילום תעריף — קבע לפי hourly_rate (או 110 כברירת מחדל)
     if not target.hourly_rate_at_time:
         hr = target.hourly_rate if target.hourly_rate else 110.0
@@ -191,11 +401,184 @@ def _lesson_before_insert(mapper, connection, target: "Lesson"):
 
 @event.listens_for(Lesson, "before_update")
 def _lesson_before_update(mapper, connection, target: "Lesson"):
+    _normalize_lesson_statuses(target)
+
     # אם שינו טווח ולא קיים משך — השלם
     if target.start_at and target.end_at and (not target.duration_minutes):
         delta_min = int(round((target.end_at - target.start_at).total_seconds() / 60.0))
         target.duration_minutes = max(0, delta_min)
 
+# שדות של תלמיד שמוצגים ברשימת התלמידים של המורה
+_STUDENT_LIST_ATTRS = ("teacher_id", "role", "username", "grade", "school", "student_rate_cents")
+
+
+# חיוב השיעור ביומן החשבון מתעדכן באותה טרנזקציה (done / ביטול / שינוי מחיר)
+@event.listens_for(Lesson, "after_insert")
+def _lesson_insert_ledger(mapper, connection, target: "Lesson"):
+    if target.status == LessonStatus.done.value:
+        from app.utils.ledger import sync_lesson_charges
+        sync_lesson_charges(connection, [target], new=True)
+
+
+@event.listens_for(Lesson, "after_update")
+def _lesson_update_ledger(mapper, connection, target: "Lesson"):
+    from app.utils.ledger import LESSON_CHARGE_ATTRS, sync_lesson_charges
+    state = inspect(target)
+    if any(state.attrs[a].history.has_changes() for a in LESSON_CHARGE_ATTRS):
+        sync_lesson_charges(connection, [target])
+
+
+@event.listens_for(Lesson, "after_delete")
+def _lesson_delete_ledger(mapper, connection, target: "Lesson"):
+    from app.utils.ledger import sync_lesson_charges
+    sync_lesson_charges(connection, [target], deleted=True)
+
+
+def _bump_students_version(connection, teacher_ids) -> None:
+    ids = {t for t in teacher_ids if t}
+    if not ids:
+        return
+    user_t = User.__table__
+    connection.execute(
+        user_t.update()
+        .where(user_t.c.id.in_(ids))
+        .values(students_version=user_t.c.students_version + 1)
+    )
+
+
+@event.listens_for(User, "after_insert")
+def _user_after_insert(mapper, connection, target: "User"):
+    if target.teacher_id:
+        _bump_students_version(connection, [target.teacher_id])
+
+
+@event.listens_for(User, "after_update")
+def _user_after_update(mapper, connection, target: "User"):
+    state = inspect(target)
+    changed = False
+    teacher_ids = {target.teacher_id}
+    for attr in _STUDENT_LIST_ATTRS:
+        hist = state.attrs[attr].history
+        if hist.has_changes():
+            changed = True
+            if attr == "teacher_id":
+                teacher_ids.update(hist.deleted)
+    if changed:
+        _bump_students_version(connection, teacher_ids)
+
+
+@event.listens_for(User, "after_delete")
+def _user_after_delete(mapper, connection, target: "User"):
+    if target.teacher_id:
+        _bump_students_version(connection, [target.teacher_id])
+
+
+# עמודות של lesson_event ו-lesson_event_archive (יומן שינויים לשיעורים)
+LESSON_EVENT_COLUMNS = ("id", "lesson_id", "teacher_id", "student_id", "actor_id", "action", "changes", "ts")
+
+
+class LessonEventMixin:
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    lesson_id = db.Column(db.Integer, nullable=False)
+    teacher_id = db.Column(db.Integer)
+    student_id = db.Column(db.Integer)
+    actor_id = db.Column(db.Integer)            # NULL = מערכת (CLI / sweeper)
+    action = db.Column(db.String(20), nullable=False)
+    changes = db.Column(db.Text, nullable=False, default="{}")   # JSON: {שדה: [לפני, אחרי]}
+    ts = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} id={self.id} lesson={self.lesson_id} {self.action} ts={self.ts}>"
+
+
+class LessonEvent(LessonEventMixin, db.Model):
+    """
+    יומן שינויים לשיעורים – רק הוספה (app/utils/audit.py). בלי FK ל-lesson:
+    השורות נשארות גם אחרי מחיקה/ארכוב של השיעור.
+    """
+    __tablename__ = "lesson_event"
+
+    __table_args__ = (
+        Index("ix_lesson_event_lesson_ts", "lesson_id", "ts"),
+        Index("ix_lesson_event_teacher_ts", "teacher_id", "ts"),
+    )
+
+
+class LessonEventArchive(LessonEventMixin, db.Model):
+    """אירועים ישנים מאופק הארכוב (flask audit archive) – אותו id כמו ב-lesson_event."""
+    __tablename__ = "lesson_event_archive"
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True, autoincrement=False)
+
+    __table_args__ = (
+        Index("ix_lesson_event_archive_lesson_ts", "lesson_id", "ts"),
+        Index("ix_lesson_event_archive_teacher_ts", "teacher_id", "ts"),
+    )
+
+
+class JobLease(db.Model):
+    """חכירה של משימה מחזורית (app/utils/lease.py) – שורה אחת לכל משימה."""
+    __tablename__ = "job_lease"
+
+    name = db.Column(db.String(100), primary_key=True)
+    owner = db.Column(db.String(100), nullable=False)
+    acquired_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+class Notification(db.Model):
+    """
+    תור התראות (outbox): נכתב באותה טרנזקציה של השינוי, נשלח אחר כך
+    ב-`flask notifications send`. payload הוא JSON.
+    """
+    __tablename__ = "notification"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default="{}")
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        # השולח סורק רק את מה שעוד לא נשלח
+        Index("ix_notification_pending", "id",
+              postgresql_where=db.text("sent_at IS NULL"), sqlite_where=db.text("sent_at IS NULL")),
+        Index("ix_notification_user_created", "user_id", "created_at"),
+    )
+
+
+class IdempotencyKey(db.Model):
+    """
+    מפתח idempotency של בקשת POST (app/utils/idempotency.py). השורה נתפסת
+    לפני הביצוע (status_code NULL = בביצוע), ובסיום נשמרים הסטטוס וה-Location
+    (וגוף JSON) כדי להחזיר אותם לבקשה חוזרת עם אותו מפתח.
+    """
+    __tablename__ = "idempotency_key"
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(40), nullable=False)        # "user:<id>" / "anon"
+    endpoint = db.Column(db.String(100), nullable=False)
+    key = db.Column(db.String(64), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    token = db.Column(db.String(32), nullable=False)        # מי תפס את השורה
+    status_code = db.Column(db.Integer)
+    location = db.Column(db.String(500))
+    content_type = db.Column(db.String(100))
+    body = db.Column(db.Text)
+    claimed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("scope", "endpoint", "key", name="uq_idempotency_key"),
+        Index("ix_idempotency_key_expires", "expires_at"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<IdempotencyKey {self.endpoint} {self.key} status={self.status_code}>"
+
+
 class Lead(db.Model):
     __tablename__ = "lead"
 
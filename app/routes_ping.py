@@ -1,14 +1,31 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, current_app
 from app.extensions import db
-from sqlalchemy import text
+from app.utils.db_pool import pool_status
 
 bp = Blueprint("sys", __name__)
 
+
+def _readiness():
+    readiness = current_app.extensions["readiness"]
+    readiness.ensure_checker(current_app._get_current_object())
+    return readiness
+
+
+# probes קוראים רק את המצב השמור של thread הבדיקה – בלי round-trip למסד
 @bp.get("/api/ping")
 def ping():
-    try:
-        db.session.execute(text("SELECT 1"))
+    readiness = _readiness()
+    if readiness.is_ready:
         return jsonify({"status": "ok", "db": "connected"}), 200
-    except Exception as e:
-        return jsonify({"status": "error", "db": "down", "message": str(e)}), 500
+    return jsonify({"status": "error", "db": "down", "state": readiness.as_dict()["state"]}), 503
+
 
+@bp.get("/readyz")
+def readyz():
+    readiness = _readiness()
+    payload = readiness.as_dict()
+    payload["pool"] = pool_status(db.engine)
+    replica = current_app.extensions.get("replica")
+    if replica is not None:
+        payload["replica"] = replica.as_dict()
+    return jsonify(payload), (200 if readiness.is_ready else 503)
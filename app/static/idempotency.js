@@ -0,0 +1,31 @@
+// Fills hidden `idempotency_key` inputs with a fresh key per page load.
+// The server (app/utils/idempotency.py) replays the first result for a
+// repeated key, so a double-click or a retried POST does not run twice.
+// The key is generated in the browser because some pages (landing) are
+// served from the page cache and must not share a key between visitors.
+
+const IDEMPOTENCY_FIELD = "idempotency_key";
+
+function newIdempotencyKey() {
+  if (window.crypto && typeof window.crypto.randomUUID === "function") {
+    return window.crypto.randomUUID();
+  }
+  const bytes = new Uint8Array(16);
+  window.crypto.getRandomValues(bytes);
+  return Array.from(bytes, (b) => b.toString(16).padStart(2, "0")).join("");
+}
+
+function initIdempotencyKeys() {
+  const inputs = document.querySelectorAll(`input[name='${IDEMPOTENCY_FIELD}']`);
+  inputs.forEach((input) => {
+    if (!input.value) {
+      input.value = newIdempotencyKey();
+    }
+  });
+}
+
+if (document.readyState === "loading") {
+  document.addEventListener("DOMContentLoaded", initIdempotencyKeys);
+} else {
+  initIdempotencyKeys();
+}
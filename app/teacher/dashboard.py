@@ -0,0 +1,101 @@
+# app/teacher/dashboard.py
+"""
+שכבת קריאה לדשבורד המורה.
+
+- שיעורים אחרונים נטענים יחד עם שם התלמיד ב-JOIN אחד (בלי N+1 בטמפלט).
+- שיעורים שעבר זמנם נשלפים בשאילתה נפרדת על (teacher_id, end_at),
+  ולא מסוננים מתוך 30 השורות האחרונות.
+- רשימת התלמידים (שורות קפואות + ה-HTML המרונדר) נשמרת במטמון האפליקציה
+  לפי (teacher_id, students_version) עם התגית teacher:{id}:students;
+  המונה עולה בכל שינוי שיוך/פרטי תלמיד (ראו אירועי User ב-models.py),
+  כך שהמטמון נכון גם בין workers שונים בלי שאילתה נוספת.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from flask import render_template
+from markupsafe import Markup
+from sqlalchemy.orm import joinedload, load_only
+
+from app.models import Lesson, User, lesson_scheduled_clause
+from app.utils.cache import get_cache, students_tag
+
+OVERDUE_GRACE_MINUTES = 30
+
+
+def _with_student_name(q):
+    return q.options(joinedload(Lesson.student).load_only(User.id, User.username))
+
+
+def recent_lessons_query(teacher_id: int, limit: int = 30):
+    # status מנורמל ו-NOT NULL: "לא done/cancelled" == "scheduled" (אינדקס חלקי)
+    q = (Lesson.query
+         .filter(Lesson.teacher_id == teacher_id, lesson_scheduled_clause())
+         .order_by(Lesson.start_at.desc())
+         .limit(limit))
+    return _with_student_name(q)
+
+
+def overdue_lessons_query(teacher_id: int, now: datetime | None = None, limit: int = 100):
+    threshold = (now or datetime.utcnow()) - timedelta(minutes=OVERDUE_GRACE_MINUTES)
+    q = (Lesson.query
+         .filter(Lesson.teacher_id == teacher_id,
+                 Lesson.end_at < threshold,
+                 lesson_scheduled_clause())
+         .order_by(Lesson.end_at.asc())
+         .limit(limit))
+    return _with_student_name(q)
+
+
+def recent_lessons(teacher_id: int, limit: int = 30):
+    """שיעורים פעילים אחרונים (בלי done/cancelled) + שם תלמיד, בשאילתה אחת."""
+    return recent_lessons_query(teacher_id, limit).all()
+
+
+def overdue_lessons(teacher_id: int, now: datetime | None = None, limit: int = 100):
+    """שיעורים שהסתיימו לפני יותר מחצי שעה ולא סומנו – בכל ההיסטוריה של המורה."""
+    return overdue_lessons_query(teacher_id, now, limit).all()
+
+
+@dataclass(frozen=True)
+class StudentRow:
+    """תלמיד ברשימות של המורה – עותק קפוא שאפשר לשתף בין בקשות."""
+    id: int
+    username: str
+    grade: str | None
+    school: str | None
+    student_rate_cents: int | None
+
+    @property
+    def student_rate(self) -> float:
+        return round((self.student_rate_cents or 0) / 100.0, 2)
+
+
+def teacher_students(teacher_id: int):
+    return (User.query
+            .options(load_only(User.id, User.username, User.grade, User.school, User.student_rate_cents))
+            .filter(User.teacher_id == teacher_id, User.role == "student")
+            .order_by(User.username.asc())
+            .all())
+
+
+def _students_key(teacher, kind: str) -> str:
+    return f"students:{kind}:{teacher.id}:{teacher.students_version or 0}"
+
+
+def teacher_student_rows(teacher) -> tuple[StudentRow, ...]:
+    """התלמידים של המורה לפי שם, ממטמון אם הגרסה לא השתנתה."""
+    def load():
+        return tuple(StudentRow(s.id, s.username, s.grade, s.school, s.student_rate_cents)
+                     for s in teacher_students(teacher.id))
+    return get_cache().get_or_set(_students_key(teacher, "rows"), load,
+                                  tags=[students_tag(teacher.id)])
+
+
+def students_fragment(teacher) -> Markup:
+    """HTML של רשימת התלמידים, ממטמון אם הגרסה לא השתנתה."""
+    def load():
+        return Markup(render_template("teacher/_students_list.html",
+                                      students=teacher_student_rows(teacher)))
+    return get_cache().get_or_set(_students_key(teacher, "html"), load,
+                                  tags=[students_tag(teacher.id)])
@@ -1,18 +1,29 @@
 # app/teacher/routes.py
+import heapq
+import json
 import os
 from datetime import datetime, timedelta
 from io import BytesIO
 from uuid import uuid4
-from flask import render_template, request, redirect, url_for, flash, abort, send_file, current_app, send_from_directory
+from flask import render_template, request, redirect, url_for, flash, abort, send_file, current_app, send_from_directory, jsonify
 from flask_login import current_user
 from app.extensions import db
-from app.models import User, Lesson, StudentMaterial
+from app.models import User, Lesson, LessonArchive, StudentMaterial, OVERDUE_POLICIES
 from app.teacher import teacher_bp
+from app.teacher.dashboard import recent_lessons, overdue_lessons, students_fragment, teacher_student_rows
 from app.utils.auth import teacher_required
+from app.utils.idempotency import idempotent
 from app.utils.pdf_export import generate_lessons_summary_pdf
+from app.utils.querytrace import query_budget
+from app.utils.replica import use_replica
+from app.utils.lesson_archive import reaches_archive
+from app.utils.audit import lesson_history as audit_lesson_history, teacher_events as audit_teacher_events
+from app.utils.ledger import get_balance, record_payment, statement as ledger_statement
+from app.utils.payments import apply_payment, PaymentError, UPDATED as PAYMENT_UPDATED, FORBIDDEN as PAYMENT_FORBIDDEN
 from werkzeug.utils import secure_filename
-from sqlalchemy import or_, func
-from app.constants import PAYMENT_METHODS
+from sqlalchemy import or_, insert
+from sqlalchemy.orm import joinedload
+from app.constants import PAYMENT_METHODS, SCHOOLS
 
 
 # -------------------------
@@ -69,6 +80,25 @@ def _overlap_for_student(student_id, start_at, end_at, exclude_id=None) -> Lesso
     return q.order_by(Lesson.start_at.asc()).first()
 
 
+def _resolve_material_targets(teacher_id, student_ids, grade=None, school=None) -> list[int]:
+    """מזהי התלמידים של המורה שמתאימים לבחירה: רשימת מזהים, כיתה שלמה או בית ספר."""
+    conds = []
+    if student_ids:
+        conds.append(User.id.in_(student_ids))
+    if grade:
+        conds.append(User.grade == str(grade))
+    if school:
+        conds.append(User.school == school)
+    if not conds:
+        return []
+    rows = (db.session.query(User.id)
+            .filter(User.teacher_id == teacher_id, User.role == "student")
+            .filter(or_(*conds))
+            .order_by(User.username.asc())
+            .all())
+    return [r.id for r in rows]
+
+
 def _is_allowed_material(filename: str) -> bool:
     if not filename:
         return False
@@ -83,48 +113,25 @@ def _is_allowed_material(filename: str) -> bool:
 # דשבורד מורה
 # -------------------------
 @teacher_bp.route("/dashboard")
+@query_budget(5)
 @teacher_required
 def dashboard():
-    # תלמידים משויכים
-    students = (User.query
-                .filter(User.teacher_id == current_user.id, User.role == "student")
-                .order_by(User.username.asc())
-                .all())
-
-    # שיעורים אחרונים – בלי cancelled (כולל כאלה עם סטטוס None)
-    lessons = (Lesson.query
-               .filter(
-                   Lesson.teacher_id == current_user.id,
-                   or_(Lesson.status.is_(None), func.lower(Lesson.status).notin_(["cancelled", "done"]))
-               )
-               .order_by(Lesson.start_at.desc())
-               .limit(30)
-               .all())
-
-    now_utc = datetime.utcnow()
-    overdue_threshold = now_utc - timedelta(minutes=30)
-    past_due_lessons = [
-        l for l in lessons
-        if l.end_at and l.end_at < overdue_threshold and (l.status or "").lower() not in {"done", "cancelled"}
-    ]
-
     return render_template(
         "teacher/dashboard.html",
-        students=students,
-        lessons=lessons,
-        past_due_lessons=past_due_lessons,
+        students_html=students_fragment(current_user),
+        lessons=recent_lessons(current_user.id),
+        past_due_lessons=overdue_lessons(current_user.id),
     )
 
 # -------------------------
 # Completed lessons summary
 # -------------------------
 @teacher_bp.route("/lessons/completed")
+@query_budget(5)
+@use_replica
 @teacher_required
 def lessons_completed():
-    students = (User.query
-                .filter(User.teacher_id == current_user.id, User.role == "student")
-                .order_by(User.username.asc())
-                .all())
+    students = teacher_student_rows(current_user)
 
     filters = {
         "start_date": (request.args.get("start_date") or "").strip(),
@@ -134,36 +141,22 @@ def lessons_completed():
         "payment_method": (request.args.get("payment_method") or "").strip(),
     }
 
-    q = (Lesson.query
-         .filter(Lesson.teacher_id == current_user.id)
-         .filter(Lesson.status.isnot(None))
-         .filter(func.lower(Lesson.status) == "done"))
-
-    student_id = filters["student_id"]
-    if student_id:
-        q = q.filter(Lesson.student_id == student_id)
-
     paid_status = filters["paid_status"]
-    if paid_status:
-        if paid_status in {"paid", "partial", "unpaid"}:
-            q = q.filter(func.lower(Lesson.paid_status) == paid_status)
-        else:
-            flash("Invalid paid status filter.", "error")
-            filters["paid_status"] = ""
+    if paid_status and paid_status not in {"paid", "partial", "unpaid"}:
+        flash("Invalid paid status filter.", "error")
+        filters["paid_status"] = ""
 
     payment_method = filters["payment_method"]
     if payment_method != "":
         valid_methods = {v for v, _ in PAYMENT_METHODS}  # סט של הערכים בלבד: {"", "cash", "bit", ...}
-        if payment_method in valid_methods:
-            q = q.filter(Lesson.payment_method == payment_method)
-        else:
+        if payment_method not in valid_methods:
             flash("Invalid payment method filter.", "error")
             filters["payment_method"] = ""
 
+    start_dt = end_dt = None
     if filters["start_date"]:
         try:
             start_dt = datetime.strptime(filters["start_date"], "%Y-%m-%d")
-            q = q.filter(Lesson.start_at >= start_dt)
         except ValueError:
             flash("Invalid start date format.", "error")
             filters["start_date"] = ""
@@ -171,12 +164,33 @@ def lessons_completed():
     if filters["end_date"]:
         try:
             end_dt = datetime.strptime(filters["end_date"], "%Y-%m-%d") + timedelta(days=1)
-            q = q.filter(Lesson.start_at < end_dt)
         except ValueError:
             flash("Invalid end date format.", "error")
             filters["end_date"] = ""
 
-    lessons = q.order_by(Lesson.start_at.desc()).all()
+    def completed_query(model):
+        q = (model.query
+             .options(joinedload(model.student).load_only(User.id, User.username))
+             .filter(model.teacher_id == current_user.id)
+             .filter(model.status == "done"))
+        if filters["student_id"]:
+            q = q.filter(model.student_id == filters["student_id"])
+        if filters["paid_status"]:
+            q = q.filter(model.paid_status == filters["paid_status"])
+        if filters["payment_method"]:
+            q = q.filter(model.payment_method == filters["payment_method"])
+        if start_dt:
+            q = q.filter(model.start_at >= start_dt)
+        if end_dt:
+            q = q.filter(model.start_at < end_dt)
+        return q.order_by(model.start_at.desc())
+
+    lessons = completed_query(Lesson).all()
+    # שיעורים ישנים מהאופק יושבים ב-lesson_archive – מאחדים רק כשהטווח מגיע אליהם
+    if reaches_archive(start_dt):
+        archived = completed_query(LessonArchive).all()
+        if archived:
+            lessons = list(heapq.merge(lessons, archived, key=lambda l: l.start_at, reverse=True))
     total_cost = sum((lesson.cost or 0) for lesson in lessons)
     total_minutes = sum((lesson.duration_minutes or 0) for lesson in lessons)
     total_hours = round(total_minutes / 60.0, 2) if total_minutes else 0
@@ -209,21 +223,55 @@ def lessons_completed():
         total_hours=total_hours,
     )
 
-@teacher_bp.post("/lessons/<int:lesson_id>/payment_method")
+@teacher_bp.post("/lessons/payments")
 @teacher_required
-def set_payment_method(lesson_id):
-    method = (request.form.get("payment_method") or "").strip()
-    lesson = Lesson.query.get_or_404(lesson_id)
+@idempotent
+def set_payments_batch():
+    """סימון תשלום לכמה שיעורים: JSON ‏{lesson_ids, payment_method, amount} או טופס."""
+    data = request.get_json(silent=True) if request.is_json else None
+    if request.is_json and not isinstance(data, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
+    if data is not None:
+        lesson_ids = data.get("lesson_ids") or []
+        method, amount = data.get("payment_method"), data.get("amount")
+    else:
+        lesson_ids = request.form.getlist("lesson_ids", type=int)
+        method, amount = request.form.get("payment_method"), request.form.get("amount")
 
-    lesson.payment_method = method or None
-    lesson.paid_status = "paid" if method else "unpaid"
+    try:
+        results = apply_payment(current_user, lesson_ids, method, amount)
+    except (PaymentError, TypeError, ValueError) as e:
+        if data is not None:
+            return jsonify({"error": str(e)}), 400
+        flash("לא נבחרו שיעורים או שהפרטים לא תקינים.", "error")
+        return redirect(request.referrer or url_for("teacher.lessons_completed"))
+
+    updated = sum(1 for r in results.values() if r == PAYMENT_UPDATED)
+    if data is not None:
+        return jsonify({"updated": updated,
+                        "results": [{"id": i, "result": r} for i, r in results.items()]})
+    skipped = len(results) - updated
+    flash(f"עודכנו {updated} שיעורים." + (f" {skipped} דולגו." if skipped else ""),
+          "success" if updated else "error")
+    return redirect(request.referrer or url_for("teacher.lessons_completed"))
 
-    db.session.commit()
+
+@teacher_bp.post("/lessons/<int:lesson_id>/payment_method")
+@teacher_required
+@idempotent
+def set_payment_method(lesson_id):
+    try:
+        result = apply_payment(current_user, [lesson_id], request.form.get("payment_method"))[lesson_id]
+    except PaymentError:
+        abort(400, description="payment method not allowed")
+    if result != PAYMENT_UPDATED:
+        abort(403 if result == PAYMENT_FORBIDDEN else 404)
     return redirect(request.referrer or url_for("teacher.lessons_completed"))
 
 
 @teacher_bp.route("/lessons/new", methods=["GET", "POST"])
 @teacher_required
+@idempotent
 def lesson_new():
     if request.method == "POST":
         student_id = request.form.get("student_id", type=int)
@@ -282,12 +330,21 @@ def lesson_new():
         flash("?????? ????.", "success")
         return redirect(url_for("teacher.dashboard"))
 
-    students = (User.query
-                .filter(User.teacher_id == current_user.id, User.role == "student")
-                .order_by(User.username.asc())
-                .all())
+    students = teacher_student_rows(current_user)
     return render_template("teacher/lesson_form.html", students=students, default_price=110, min_start=datetime.now().strftime("%Y-%m-%dT%H:%M"))
 
+@teacher_bp.post("/settings/overdue_policy")
+@teacher_required
+def set_overdue_policy():
+    """מה ה-sweeper עושה עם שיעורים שעבר זמנם: flag (להשאיר לטיפול) או auto_done."""
+    policy = (request.form.get("overdue_policy") or "").strip()
+    if policy not in OVERDUE_POLICIES:
+        abort(400)
+    current_user.overdue_policy = policy
+    db.session.commit()
+    flash("ההגדרה נשמרה.", "success")
+    return redirect(request.referrer or url_for("teacher.dashboard"))
+
 @teacher_bp.route("/lessons/<int:lesson_id>/done", methods=["POST"])
 @teacher_required
 def lesson_mark_done(lesson_id):
@@ -381,18 +438,22 @@ def lesson_edit(lesson_id):
 @teacher_bp.route("/materials", methods=["GET", "POST"])
 @teacher_required
 def materials_manage():
-    students = (User.query
-                .filter(User.teacher_id == current_user.id, User.role == "student")
-                .order_by(User.username.asc())
-                .all())
+    students = teacher_student_rows(current_user)
 
     selected_id = request.args.get('student_id', type=int)
     if request.method == 'POST':
         selected_id = request.form.get('student_id', type=int)
-        student = User.query.filter_by(id=selected_id, teacher_id=current_user.id, role='student').first()
-        if not student:
+        student_ids = set(request.form.getlist('student_ids', type=int))
+        if selected_id:
+            student_ids.add(selected_id)
+        grade = (request.form.get('grade') or '').strip()
+        school = (request.form.get('school') or '').strip()
+
+        targets = _resolve_material_targets(current_user.id, student_ids, grade, school)
+        if not targets:
             flash('התלמיד המבוקש לא נמצא.', 'error')
             return redirect(url_for('teacher.materials_manage'))
+        back_id = selected_id if selected_id in targets else targets[0]
 
         title = (request.form.get('title') or '').strip()
         description = (request.form.get('description') or '').strip()
@@ -401,51 +462,73 @@ def materials_manage():
 
         if not title:
             flash('יש להזין כותרת לחומר הלימוד.', 'error')
-            return redirect(url_for('teacher.materials_manage', student_id=student.id))
+            return redirect(url_for('teacher.materials_manage', student_id=back_id))
 
         has_file = file and file.filename
         if not (has_file or link_url or description):
             flash('נא להוסיף קובץ, קישור או תיאור לחומר.', 'error')
-            return redirect(url_for('teacher.materials_manage', student_id=student.id))
+            return redirect(url_for('teacher.materials_manage', student_id=back_id))
 
+        # הקובץ נשמר פעם אחת בלבד – כל השורות מצביעות לאותו file_path
         saved_filename = None
         stored_name = None
+        upload_path = current_app.config.get('MATERIALS_UPLOAD_PATH')
         if has_file:
             original_name = secure_filename(file.filename)
             if not original_name:
                 flash('שם הקובץ אינו תקין.', 'error')
-                return redirect(url_for('teacher.materials_manage', student_id=student.id))
+                return redirect(url_for('teacher.materials_manage', student_id=back_id))
             if not _is_allowed_material(original_name):
                 flash('סוג הקובץ אינו מותר להעלאה.', 'error')
-                return redirect(url_for('teacher.materials_manage', student_id=student.id))
+                return redirect(url_for('teacher.materials_manage', student_id=back_id))
             stored_name = f"{uuid4().hex}_{original_name}"
-            upload_path = current_app.config.get('MATERIALS_UPLOAD_PATH')
             try:
                 file.save(os.path.join(upload_path, stored_name))
             except Exception as exc:
                 current_app.logger.exception('Failed saving material file: %r', exc)
                 flash('שמירת הקובץ נכשלה. נסו שנית.', 'error')
-                return redirect(url_for('teacher.materials_manage', student_id=student.id))
+                return redirect(url_for('teacher.materials_manage', student_id=back_id))
             saved_filename = original_name
 
-        material = StudentMaterial(
-            student_id=student.id,
-            teacher_id=current_user.id,
-            title=title,
-            description=description or None,
-            link_url=link_url or None,
-            file_path=stored_name,
-            file_name=saved_filename,
-        )
-        db.session.add(material)
-        db.session.commit()
-        flash('חומר הלימוד נוסף בהצלחה.', 'success')
-        return redirect(url_for('teacher.materials_manage', student_id=student.id))
+        # INSERT אחד (executemany) לכל התלמידים, commit אחד
+        created_at = datetime.utcnow()
+        rows = [
+            {
+                "student_id": sid,
+                "teacher_id": current_user.id,
+                "title": title,
+                "description": description or None,
+                "link_url": link_url or None,
+                "file_path": stored_name,
+                "file_name": saved_filename,
+                "created_at": created_at,
+            }
+            for sid in targets
+        ]
+        try:
+            db.session.execute(insert(StudentMaterial), rows)
+            db.session.commit()
+        except Exception as exc:
+            db.session.rollback()
+            current_app.logger.exception('Failed inserting materials: %r', exc)
+            if stored_name:
+                try:
+                    os.remove(os.path.join(upload_path, stored_name))
+                except OSError:
+                    pass
+            flash('שמירת החומר נכשלה. נסו שנית.', 'error')
+            return redirect(url_for('teacher.materials_manage', student_id=back_id))
+
+        if len(targets) > 1:
+            flash(f'חומר הלימוד נוסף ל-{len(targets)} תלמידים.', 'success')
+        else:
+            flash('חומר הלימוד נוסף בהצלחה.', 'success')
+        return redirect(url_for('teacher.materials_manage', student_id=back_id))
 
     selected_student = None
     materials = []
     if selected_id:
-        selected_student = User.query.filter_by(id=selected_id, teacher_id=current_user.id, role='student').first()
+        selected_student = next((s for s in students if s.id == selected_id), None)
         if not selected_student and selected_id:
             flash('התלמיד המבוקש לא נמצא אצלך.', 'error')
             return redirect(url_for('teacher.materials_manage'))
@@ -460,7 +543,8 @@ def materials_manage():
     return render_template('teacher/materials.html',
                            students=students,
                            selected_student=selected_student,
-                           materials=materials)
+                           materials=materials,
+                           schools=SCHOOLS)
 
 
 @teacher_bp.post('/materials/<int:material_id>/delete')
@@ -471,7 +555,11 @@ def material_delete(material_id):
         abort(403)
     file_path = material.file_path
     upload_path = current_app.config.get('MATERIALS_UPLOAD_PATH')
-    if file_path and upload_path:
+    shared = file_path and (db.session.query(StudentMaterial.id)
+                            .filter(StudentMaterial.file_path == file_path,
+                                    StudentMaterial.id != material.id)
+                            .first()) is not None
+    if file_path and upload_path and not shared:
         try:
             os.remove(os.path.join(upload_path, file_path))
         except FileNotFoundError:
@@ -519,3 +607,82 @@ def student_edit(student_id):
         return redirect(url_for("teacher.dashboard"))
 
     return render_template("teacher/student_edit.html", student=student)
+
+
+@teacher_bp.route("/students/<int:student_id>/account", methods=["GET", "POST"])
+@teacher_required
+@idempotent
+def student_account(student_id):
+    """יתרה ודף חשבון של תלמיד; POST רושם תשלום שלא שויך לשיעור (מקדמה/זיכוי)."""
+    student = User.query.filter_by(id=student_id, teacher_id=current_user.id).first_or_404()
+
+    if request.method == "POST":
+        method = (request.form.get("payment_method") or "").strip()
+        try:
+            amount_cents = int(round(float(request.form.get("amount") or 0) * 100))
+        except ValueError:
+            amount_cents = 0
+        if amount_cents <= 0 or method not in dict(PAYMENT_METHODS):
+            flash("סכום או אופן תשלום לא תקינים.", "error")
+        else:
+            record_payment(db.session.connection(), teacher_id=current_user.id, student_id=student.id,
+                           amount_cents=amount_cents, method=method, created_by_id=current_user.id,
+                           note=(request.form.get("note") or "").strip()[:255] or None)
+            db.session.commit()
+            flash("התשלום נרשם.", "success")
+        return redirect(url_for("teacher.student_account", student_id=student.id))
+
+    start_dt = end_dt = None
+    try:
+        if request.args.get("start_date"):
+            start_dt = datetime.strptime(request.args["start_date"], "%Y-%m-%d")
+        if request.args.get("end_date"):
+            end_dt = datetime.strptime(request.args["end_date"], "%Y-%m-%d") + timedelta(days=1)
+    except ValueError:
+        flash("Invalid date format.", "error")
+    opening_cents, entries, truncated = ledger_statement(student.id, start_dt, end_dt)
+    return render_template("teacher/student_account.html",
+                           student=student,
+                           balance=get_balance(student.id),
+                           opening_cents=opening_cents,
+                           entries=entries,
+                           truncated=truncated,
+                           payment_methods=PAYMENT_METHODS)
+
+
+@teacher_bp.get("/lessons/<int:lesson_id>/history")
+@teacher_required
+def lesson_history(lesson_id):
+    """היסטוריית השינויים של שיעור (JSON), מהחדש לישן."""
+    events = audit_lesson_history(lesson_id)
+    if not events and not Lesson.query.filter_by(id=lesson_id).first():
+        abort(404)
+    if current_user.role != "admin" and any(e.teacher_id != current_user.id for e in events):
+        abort(403)
+    return jsonify([_event_json(e) for e in events])
+
+
+@teacher_bp.get("/events")
+@teacher_required
+def teacher_events():
+    """אירועים על השיעורים של המורה בטווח (?start=YYYY-MM-DD&end=YYYY-MM-DD), JSON."""
+    try:
+        start = datetime.strptime(request.args["start"], "%Y-%m-%d") if request.args.get("start") else None
+        end = (datetime.strptime(request.args["end"], "%Y-%m-%d") + timedelta(days=1)) if request.args.get("end") else None
+    except ValueError:
+        abort(400, description="dates must be YYYY-MM-DD")
+    limit = min(request.args.get("limit", 200, type=int), 1000)
+    events = audit_teacher_events(current_user.id, start, end, limit=limit)
+    return jsonify([_event_json(e) for e in events])
+
+
+def _event_json(e):
+    return {
+        "id": e.id,
+        "lesson_id": e.lesson_id,
+        "student_id": e.student_id,
+        "actor_id": e.actor_id,
+        "action": e.action,
+        "changes": json.loads(e.changes or "{}"),
+        "ts": e.ts.isoformat(),
+    }
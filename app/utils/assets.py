@@ -0,0 +1,109 @@
+# app/utils/assets.py
+"""
+קבצים סטטיים לפרודקשן.
+
+- url_for('static', filename=...) מקבל ?v=<hash של התוכן> (url_defaults),
+  כך שאפשר להגיש אותם עם Cache-Control: immutable לשנה – שינוי בקובץ
+  משנה את ה-URL. ה-hash מחושב פעם אחת לקובץ (כשהטמפלטים נטענים מחדש –
+  jinja_env.auto_reload, כלומר debug – מחדש כשה-mtime משתנה).
+- `flask assets build` כותב לצד כל קובץ טקסט גרסאות .gz ו-.br שמוכנות
+  מראש, ש-nginx מגיש ישירות (gzip_static / brotli_static). brotli אופציונלי:
+  בלי החבילה `Brotli` נוצרים רק קבצי .gz.
+"""
+import gzip
+import hashlib
+import os
+
+from flask import request
+
+COMPRESSIBLE = {".css", ".js", ".svg", ".txt", ".json", ".html", ".map", ".ico"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class StaticHasher:
+    def __init__(self, static_folder: str, check_mtime=False):
+        self.static_folder = static_folder
+        self.check_mtime = check_mtime   # bool, או פונקציה שנבדקת בכל קריאה
+        self._cache = {}
+
+    def digest(self, filename: str):
+        path = os.path.join(self.static_folder, filename)
+        check_mtime = self.check_mtime() if callable(self.check_mtime) else self.check_mtime
+        try:
+            mtime = os.stat(path).st_mtime if check_mtime else None
+        except OSError:
+            return None
+        cached = self._cache.get(filename)
+        if cached and (not check_mtime or cached[0] == mtime):
+            return cached[1]
+        try:
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        except OSError:
+            return None
+        self._cache[filename] = (mtime, digest)
+        return digest
+
+
+def init_assets(app):
+    hasher = StaticHasher(app.static_folder, check_mtime=lambda: app.jinja_env.auto_reload)
+    app.extensions["static_hasher"] = hasher
+
+    @app.url_defaults
+    def _hashed_static(endpoint, values):
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            digest = hasher.digest(values["filename"])
+            if digest:
+                values["v"] = digest
+
+    @app.after_request
+    def _static_cache_headers(response):
+        # רק URL עם ה-hash הנוכחי מקבל immutable; בלי/עם hash ישן – ברירת המחדל של Flask
+        if request.endpoint == "static" and response.status_code == 200:
+            filename = (request.view_args or {}).get("filename")
+            if filename and request.args.get("v") == hasher.digest(filename):
+                response.headers["Cache-Control"] = IMMUTABLE
+        return response
+
+    return hasher
+
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+def build_compressed(static_folder: str, min_size: int = 256) -> dict:
+    """כותב .gz (ו-.br אם אפשר) לכל קובץ טקסט שהשתנה; מחזיר סטטיסטיקה."""
+    brotli = _brotli()
+    stats = {"files": 0, "gzip": 0, "brotli": 0, "skipped": 0, "brotli_available": brotli is not None}
+    for root, _dirs, files in os.walk(static_folder):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE:
+                continue
+            stats["files"] += 1
+            if os.path.getsize(path) < min_size:
+                stats["skipped"] += 1
+                continue
+            mtime = os.path.getmtime(path)
+            with open(path, "rb") as f:
+                data = f.read()
+
+            variants = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0), "gzip")]
+            if brotli is not None:
+                variants.append((".br", lambda d: brotli.compress(d, quality=11), "brotli"))
+            for suffix, compress, key in variants:
+                target = path + suffix
+                if os.path.exists(target) and os.path.getmtime(target) >= mtime:
+                    continue
+                tmp = target + ".tmp"
+                with open(tmp, "wb") as f:
+                    f.write(compress(data))
+                os.replace(tmp, target)
+                os.utime(target, (mtime, mtime))   # build הבא ידלג עליו עד שהמקור ישתנה
+                stats[key] += 1
+    return stats
@@ -0,0 +1,197 @@
+# app/utils/audit.py
+"""
+יומן שינויים לשיעורים (lesson_event) – רק הוספה.
+
+- נאסף מאירוע after_flush של ה-session: לכל שיעור שנוסף / השתנה / נמחק
+  ב-flush נוצרת שורה אחת עם השדות ששונו ({שדה: [לפני, אחרי]}), וכל השורות
+  של ה-flush נכתבות ב-INSERT מרוכז אחד, באותה טרנזקציה של השינוי עצמו.
+- UPDATE מרוכז (apply_payment, ה-sweeper) עוקף את ה-session – הם קוראים
+  ל-record_events ישירות.
+- action: create / reschedule / done / cancelled / reopen / payment / update / delete,
+  ו-flag מה-sweeper (שיעור שעבר זמנו סומן לטיפול).
+- שאילתות לפי שיעור או לפי מורה וטווח זמן רצות על (lesson_id, ts) /
+  (teacher_id, ts). אירועים ישנים מ-AUDIT_ARCHIVE_AFTER_DAYS עוברים
+  ל-lesson_event_archive (`flask audit archive`) כך שהטבלה החמה נשארת
+  קטנה; השאילתות מאחדות את הארכיון רק כשהטווח מגיע אליו.
+"""
+import heapq
+import json
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from flask import current_app, has_request_context
+from sqlalchemy import delete, event, insert, inspect, select
+
+from app.extensions import db
+from app.models import LESSON_EVENT_COLUMNS, Lesson, LessonEvent, LessonEventArchive
+
+# שדות שנרשמים ביומן (notes נרשם בלי התוכן – רק שהשתנה)
+AUDITED_ATTRS = (
+    "teacher_id", "student_id", "start_at", "end_at", "status", "duration_minutes",
+    "hourly_rate_at_time_cents", "paid_status", "paid_amount", "payment_method", "notes",
+)
+SCHEDULE_ATTRS = {"start_at", "end_at", "duration_minutes"}
+PAYMENT_ATTRS = {"paid_status", "paid_amount", "payment_method"}
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _actor_id():
+    if not has_request_context():
+        return None
+    from flask_login import current_user
+    return current_user.id if getattr(current_user, "is_authenticated", False) else None
+
+
+def classify(changes: dict) -> str:
+    if "status" in changes:
+        new = changes["status"][1]
+        return {"done": "done", "cancelled": "cancelled"}.get(new, "reopen")
+    if SCHEDULE_ATTRS & changes.keys():
+        return "reschedule"
+    if changes.keys() <= PAYMENT_ATTRS:
+        return "payment"
+    return "update"
+
+
+def event_row(lesson, action: str, changes: dict, actor_id=None, ts=None) -> dict:
+    return {
+        "lesson_id": lesson.id,
+        "teacher_id": lesson.teacher_id,
+        "student_id": lesson.student_id,
+        "actor_id": actor_id,
+        "action": action,
+        "changes": json.dumps(changes, ensure_ascii=False, default=str),
+        "ts": ts or datetime.utcnow(),
+    }
+
+
+def record_events(connection, rows) -> None:
+    """INSERT מרוכז אחד לכל השורות (dict-ים מ-event_row)."""
+    if rows:
+        connection.execute(insert(LessonEvent.__table__), rows)
+
+
+def _diff(state) -> dict:
+    changes = {}
+    for attr in AUDITED_ATTRS:
+        hist = state.attrs[attr].history
+        if not hist.has_changes():
+            continue
+        old = hist.deleted[0] if hist.deleted else None
+        new = hist.added[0] if hist.added else None
+        if old == new:
+            continue
+        if attr == "notes":
+            changes[attr] = True
+        else:
+            changes[attr] = [_jsonable(old), _jsonable(new)]
+    return changes
+
+
+def _after_flush(session, flush_context):
+    found = []   # (lesson, action, changes)
+    for obj in session.new:
+        if isinstance(obj, Lesson):
+            snapshot = {a: [None, _jsonable(getattr(obj, a))] for a in AUDITED_ATTRS
+                        if a != "notes" and getattr(obj, a) is not None}
+            found.append((obj, "create", snapshot))
+    for obj in session.dirty:
+        if isinstance(obj, Lesson) and obj not in session.deleted:
+            changes = _diff(inspect(obj))
+            if changes:
+                found.append((obj, classify(changes), changes))
+    for obj in session.deleted:
+        if isinstance(obj, Lesson):
+            found.append((obj, "delete", {}))
+    if not found:
+        return
+    actor, now = _actor_id(), datetime.utcnow()
+    record_events(session.connection(),
+                  [event_row(obj, action, changes, actor, now) for obj, action, changes in found])
+
+
+def init_audit(app) -> None:
+    from app.utils.replica import RoutingSession
+    if not event.contains(RoutingSession, "after_flush", _after_flush):
+        event.listen(RoutingSession, "after_flush", _after_flush)
+
+
+# -------------------------
+# קריאה
+# -------------------------
+def audit_horizon(now: Optional[datetime] = None) -> datetime:
+    days = int(current_app.config.get("AUDIT_ARCHIVE_AFTER_DAYS", 180))
+    return (now or datetime.utcnow()) - timedelta(days=days)
+
+
+def _events(model, start, end, limit, **filters):
+    q = model.query
+    for name, value in filters.items():
+        q = q.filter(getattr(model, name) == value)
+    if start:
+        q = q.filter(model.ts >= start)
+    if end:
+        q = q.filter(model.ts < end)
+    return q.order_by(model.ts.desc(), model.id.desc()).limit(limit).all()
+
+
+def _query(start, end, limit, **filters):
+    events = _events(LessonEvent, start, end, limit, **filters)
+    if (start is None or start < audit_horizon()) and len(events) < limit:
+        archived = _events(LessonEventArchive, start, end, limit - len(events), **filters)
+        events = list(heapq.merge(events, archived, key=lambda e: (e.ts, e.id), reverse=True))[:limit]
+    return events
+
+
+def lesson_history(lesson_id: int, limit: int = 200):
+    """כל האירועים של שיעור, מהחדש לישן."""
+    return _query(None, None, limit, lesson_id=lesson_id)
+
+
+def teacher_events(teacher_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   limit: int = 500):
+    """אירועים של מורה בטווח [start, end), מהחדש לישן – סריקת טווח על (teacher_id, ts)."""
+    return _query(start, end, limit, teacher_id=teacher_id)
+
+
+# -------------------------
+# ארכוב
+# -------------------------
+def archive_events(before: datetime, batch_size: int = 5000, max_batches: Optional[int] = None,
+                   pause: float = 0.0, lease=None, logger=None) -> dict:
+    """מעביר אירועים ישנים ל-lesson_event_archive במנות (INSERT ... SELECT + DELETE לכל מנה)."""
+    stats = {"batches": 0, "moved": 0}
+    cols = [LessonEvent.__table__.c[name] for name in LESSON_EVENT_COLUMNS]
+    candidates = (select(LessonEvent.id).where(LessonEvent.ts < before)
+                  .order_by(LessonEvent.id).limit(batch_size))
+    while max_batches is None or stats["batches"] < max_batches:
+        ids = db.session.execute(candidates).scalars().all()
+        if not ids:
+            break
+        try:
+            db.session.execute(
+                insert(LessonEventArchive.__table__).from_select(
+                    list(LESSON_EVENT_COLUMNS), select(*cols).where(LessonEvent.id.in_(ids)))
+            )
+            db.session.execute(delete(LessonEvent.__table__).where(LessonEvent.id.in_(ids)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        stats["batches"] += 1
+        stats["moved"] += len(ids)
+        if logger:
+            logger.info("audit archive: batch %d moved %d (last id %d)", stats["batches"], len(ids), ids[-1])
+        if lease is not None and not lease.renew():
+            if logger:
+                logger.warning("audit archive: lease lost, stopping")
+            break
+        if pause:
+            time.sleep(pause)
+    return stats
@@ -4,36 +4,47 @@ from typing import Iterable
 from flask import abort, redirect, url_for
 from flask_login import login_required, current_user
 
-def _require_roles(roles: Iterable[str], *, allow_admin: bool = True):
+def has_role(user, roles: Iterable[str], *, allow_admin: bool = True) -> bool:
+    """האם למשתמש יש אחד התפקידים ב-roles (admin עובר אם allow_admin)."""
+    user_role = str(getattr(user, "role", "")).lower()
+    # אם מותר לאדמין, והוא אדמין — אפשר לעבור
+    if allow_admin and user_role == "admin":
+        return True
+    return user_role in {str(r).lower() for r in roles}
+
+
+def _require_roles(roles: Iterable[str], *, allow_admin: bool = True, api: bool = False):
     """
     מחזיר דקורטור שמחייב שלמשתמש יהיה אחד התפקידים ב-roles.
     ברירת המחדל: לאפשר גם ל-admin לעבור (allow_admin=True).
+    api=True: משתמש לא מחובר מקבל 401 במקום הפניה לדף ההתחברות.
     """
-    wanted = {str(r).lower() for r in roles}
+    roles = tuple(roles)
 
     def deco(fn):
         @wraps(fn)
-        @login_required
         def wrapper(*args, **kwargs):
             # שים לב: is_authenticated הוא property (ללא סוגריים)
             if not current_user.is_authenticated:
+                if api:
+                    abort(401)
                 return redirect(url_for("auth.login"))
 
-            user_role = str(getattr(current_user, "role", "")).lower()
-
-            # אם מותר לאדמין, והוא אדמין — אפשר לעבור
-            if allow_admin and user_role == "admin":
-                return fn(*args, **kwargs)
-
-            if user_role not in wanted:
+            if not has_role(current_user, roles, allow_admin=allow_admin):
                 # אין הרשאה — 403
                 abort(403)
 
             return fn(*args, **kwargs)
-        return wrapper
+        if api:
+            return wrapper
+        return wraps(fn)(login_required(wrapper))
     return deco
 
 # שימושים נוחים
 teacher_required      = _require_roles(["teacher"])                 # מורה או אדמין
 admin_required        = _require_roles(["admin"], allow_admin=False)  # רק אדמין
 teacher_only_required = _require_roles(["teacher"], allow_admin=False) # רק מורה, לא אדמין
+
+# ל-API (/api/v1): אותם כללים, 401 ב-JSON במקום הפניה
+api_teacher_required  = _require_roles(["teacher"], api=True)                 # מורה או אדמין
+api_user_required     = _require_roles(["teacher", "student"], api=True)      # כל משתמש מחובר
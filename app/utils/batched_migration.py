@@ -0,0 +1,117 @@
+# app/utils/batched_migration.py
+"""
+עדכוני נתונים "אונליין" במיגרציות Alembic: במנות, עם checkpoint והמשך
+אחרי כישלון. עובד על SQLite ועל Postgres.
+
+    def upgrade():
+        with op.get_context().autocommit_block():
+            batched_update(
+                op.get_bind(), "lesson_duration_backfill", "lesson",
+                set_sql="duration_minutes = 60",
+                where_sql="duration_minutes IS NULL",
+            )
+
+- keyset על עמודת המפתח (id): כל מנה היא UPDATE ... WHERE id > :lo AND
+  id <= :hi, כך שאף מנה לא נועלת יותר מ-batch_size שורות ולא סורקת מההתחלה.
+- autocommit_block: כל מנה נשמרת מיד (המיגרציה כולה לא יושבת בטרנזקציה
+  אחת שנועלת את הטבלה עד הסוף).
+- checkpoint בטבלת data_migration_checkpoint אחרי כל מנה; הרצה חוזרת
+  ממשיכה מהמפתח האחרון. set_sql חייב להיות אידמפוטנטי (מנה שנשמרה לפני
+  שה-checkpoint נכתב תרוץ שוב). הטבלה לא ב-db.metadata; migrations/env.py
+  מחריג אותה מ-autogenerate.
+- האטה: pause שניות בין מנות. DATA_MIGRATION_BATCH_SIZE / DATA_MIGRATION_PAUSE
+  דורסים את ברירות המחדל מהסביבה.
+"""
+import os
+import time
+from datetime import datetime
+
+import sqlalchemy as sa
+
+CHECKPOINT_TABLE = "data_migration_checkpoint"
+
+_metadata = sa.MetaData()
+checkpoints = sa.Table(
+    CHECKPOINT_TABLE, _metadata,
+    sa.Column("name", sa.String(100), primary_key=True),
+    sa.Column("last_key", sa.BigInteger, nullable=False, default=0),
+    sa.Column("rows_done", sa.BigInteger, nullable=False, default=0),
+    sa.Column("updated_at", sa.DateTime, nullable=False),
+    sa.Column("finished_at", sa.DateTime, nullable=True),
+)
+
+
+def minutes_between(start_col: str, end_col: str, dialect: str) -> str:
+    """ביטוי SQL (מספר שלם) להפרש בדקות בין שתי עמודות DateTime."""
+    if dialect == "postgresql":
+        minutes = f"EXTRACT(EPOCH FROM ({end_col} - {start_col})) / 60"
+    else:
+        minutes = f"(julianday({end_col}) - julianday({start_col})) * 1440"
+    return f"CAST(ROUND({minutes}) AS INTEGER)"
+
+
+def _load_checkpoint(bind, name):
+    checkpoints.create(bind, checkfirst=True)
+    return bind.execute(sa.select(checkpoints).where(checkpoints.c.name == name)).mappings().first()
+
+
+def _save_checkpoint(bind, name, last_key, rows_done, finished=False):
+    now = datetime.utcnow()
+    values = {
+        "last_key": last_key,
+        "rows_done": rows_done,
+        "updated_at": now,
+        "finished_at": now if finished else None,
+    }
+    updated = bind.execute(checkpoints.update().where(checkpoints.c.name == name).values(**values)).rowcount
+    if not updated:
+        bind.execute(checkpoints.insert().values(name=name, **values))
+
+
+def batched_update(bind, name, table, set_sql, where_sql=None, key="id", batch_size=None,
+                   pause=None, params=None, log=print):
+    """
+    מריץ UPDATE {table} SET {set_sql} [WHERE {where_sql}] במנות לפי {key}.
+    מחזיר כמה שורות עודכנו בהרצה הזו. מיועד לרוץ בתוך autocommit_block.
+    """
+    batch_size = int(batch_size or os.getenv("DATA_MIGRATION_BATCH_SIZE", "5000"))
+    pause = float(pause if pause is not None else os.getenv("DATA_MIGRATION_PAUSE", "0"))
+
+    cp = _load_checkpoint(bind, name)
+    if cp and cp["finished_at"] is not None:
+        log(f"[{name}] already finished at {cp['finished_at']}, skipping")
+        return 0
+    last_key = cp["last_key"] if cp else 0
+    rows_done = cp["rows_done"] if cp else 0
+    if cp:
+        log(f"[{name}] resuming after {key}={last_key} ({rows_done} rows done)")
+
+    max_key = bind.execute(sa.text(f"SELECT MAX({key}) FROM {table}")).scalar() or 0
+    next_hi = sa.text(
+        f"SELECT MAX({key}) FROM (SELECT {key} FROM {table} WHERE {key} > :lo "
+        f"ORDER BY {key} LIMIT :n) AS batch"
+    )
+    extra = f" AND ({where_sql})" if where_sql else ""
+    update = sa.text(f"UPDATE {table} SET {set_sql} WHERE {key} > :lo AND {key} <= :hi{extra}")
+
+    updated_now = 0
+    started = time.perf_counter()
+    while True:
+        hi = bind.execute(next_hi, {"lo": last_key, "n": batch_size}).scalar()
+        if hi is None:
+            break
+        count = bind.execute(update, {"lo": last_key, "hi": hi, **(params or {})}).rowcount or 0
+        last_key = hi
+        rows_done += count
+        updated_now += count
+        _save_checkpoint(bind, name, last_key, rows_done)
+
+        elapsed = time.perf_counter() - started
+        pct = 100.0 * last_key / max_key if max_key else 100.0
+        log(f"[{name}] {key}<={last_key} ({pct:.1f}%) updated={rows_done} {updated_now / elapsed if elapsed else 0:.0f} rows/s")
+        if pause:
+            time.sleep(pause)
+
+    _save_checkpoint(bind, name, last_key, rows_done, finished=True)
+    log(f"[{name}] done: {rows_done} rows")
+    return updated_now
@@ -0,0 +1,295 @@
+# app/utils/cache.py
+"""
+שכבת מטמון לאפליקציה, עם ביטול לפי תגיות.
+
+    cache = get_cache()
+    rows = cache.get_or_set(key, loader, ttl=300, tags=[students_tag(teacher_id)])
+    cache.invalidate_tags(students_tag(teacher_id))
+
+- CACHE_BACKEND=local (ברירת מחדל): LRU + TTL בזיכרון התהליך.
+- CACHE_BACKEND=redis: מטמון משותף לכל ה-workers (CACHE_REDIS_URL, דורש את
+  החבילה redis). תגית = מונה גרסה ב-Redis; ערך שנשמר עם גרסה ישנה של אחת
+  התגיות שלו נחשב miss.
+- CACHE_BACKEND=null: בלי מטמון (loader בכל קריאה).
+
+הביטול מופעל מאירועי המודלים (User / Lesson) ורק אחרי commit, כדי שבקשה
+מקבילה לא תמלא את המטמון מחדש בנתונים שעוד לא נשמרו. ב-backend מקומי
+ה-workers האחרים לא שומעים על הביטול – לכן מפתחות שחייבים להיות עדכניים
+כוללים גם גרסה מהמסד (למשל User.students_version), וה-TTL חוסם את השאר.
+
+ערכים במטמון משותפים בין בקשות ו-threads: לשמור רק ערכים שלא משתנים
+(tuple, dataclass קפוא, מחרוזת) – לא אובייקטי ORM.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
+
+from app.metrics import CACHE_REQUESTS
+
+_MISSING = object()
+
+
+def students_tag(teacher_id) -> str:
+    return f"teacher:{teacher_id}:students"
+
+
+def lessons_tag(teacher_id) -> str:
+    return f"teacher:{teacher_id}:lessons"
+
+
+TEACHERS_TAG = "teachers"
+
+
+# -------------------------
+# backends
+# -------------------------
+class LocalBackend:
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._data = OrderedDict()   # key -> (expires_at, tags, value)
+        self._tags = {}              # tag -> set(keys)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                return _MISSING
+            self._data.move_to_end(key)
+            return entry[2]
+
+    def set(self, key, value, ttl, tags):
+        with self._lock:
+            self._drop(key)
+            self._data[key] = (time.monotonic() + ttl, tuple(tags), value)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.max_entries:
+                self._drop(next(iter(self._data)))
+
+    def invalidate_tags(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def _drop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisBackend:
+    def __init__(self, url: str, prefix: str = "app-cache:"):
+        import redis   # תלות אופציונלית – רק כשבוחרים CACHE_BACKEND=redis
+        self.r = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _tag_keys(self, tags):
+        return [f"{self.prefix}tag:{t}" for t in tags]
+
+    def _versions(self, tags):
+        if not tags:
+            return ()
+        return tuple(int(v or 0) for v in self.r.mget(self._tag_keys(tags)))
+
+    def get(self, key):
+        raw = self.r.get(self.prefix + key)
+        if raw is None:
+            return _MISSING
+        tags, versions, value = pickle.loads(raw)
+        if self._versions(tags) != versions:
+            return _MISSING
+        return value
+
+    def set(self, key, value, ttl, tags):
+        tags = tuple(tags)
+        payload = pickle.dumps((tags, self._versions(tags), value))
+        self.r.set(self.prefix + key, payload, ex=max(1, int(ttl)))
+
+    def invalidate_tags(self, tags):
+        if tags:
+            pipe = self.r.pipeline()
+            for k in self._tag_keys(tags):
+                pipe.incr(k)
+            pipe.execute()
+
+    def clear(self):
+        for key in self.r.scan_iter(self.prefix + "*"):
+            self.r.delete(key)
+
+
+class NullBackend:
+    def get(self, key):
+        return _MISSING
+
+    def set(self, key, value, ttl, tags):
+        pass
+
+    def invalidate_tags(self, tags):
+        pass
+
+    def clear(self):
+        pass
+
+
+# -------------------------
+# חזית
+# -------------------------
+class Cache:
+    def __init__(self, backend, default_ttl: float = 300):
+        self.backend = backend
+        self.default_ttl = default_ttl
+
+    def get_or_set(self, key: str, loader, ttl=None, tags=()):
+        """מחזיר את הערך מהמטמון, או מריץ loader() ושומר. namespace = החלק הראשון של המפתח."""
+        namespace = key.split(":", 1)[0]
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            current_app.logger.warning("cache get failed for %s", key, exc_info=True)
+            value = _MISSING
+        if value is not _MISSING:
+            CACHE_REQUESTS.labels(namespace, "hit").inc()
+            return value
+        CACHE_REQUESTS.labels(namespace, "miss").inc()
+        value = loader()
+        try:
+            self.backend.set(key, value, ttl or self.default_ttl, tags)
+        except Exception:
+            current_app.logger.warning("cache set failed for %s", key, exc_info=True)
+        return value
+
+    def invalidate_tags(self, *tags):
+        tags = [t for t in tags if t]
+        if not tags:
+            return
+        try:
+            self.backend.invalidate_tags(tags)
+        except Exception:
+            current_app.logger.warning("cache invalidation failed for %s", tags, exc_info=True)
+
+    def clear(self):
+        self.backend.clear()
+
+
+def get_cache() -> Cache:
+    return current_app.extensions["cache"]
+
+
+# -------------------------
+# ביטול מאירועי מודלים (אחרי commit)
+# -------------------------
+_PENDING = "_cache_pending_tags"
+
+
+def invalidate_after_commit(session, *tags):
+    """מבטל את התגיות אחרי ה-commit של session (למשל אחרי UPDATE מרוכז)."""
+    session.info.setdefault(_PENDING, set()).update(t for t in tags if t)
+
+
+def _queue_tags(target, *tags):
+    session = object_session(target)
+    if session is not None:
+        invalidate_after_commit(session, *tags)
+
+
+def _user_tags(target, is_update: bool):
+    from app.models import _STUDENT_LIST_ATTRS
+    state = inspect(target)
+    tags = set()
+    # ברשימת התלמידים: אותם שדות שמעלים את User.students_version
+    if not is_update or any(state.attrs[a].history.has_changes() for a in _STUDENT_LIST_ATTRS):
+        teacher_ids = {target.teacher_id}
+        teacher_ids.update(state.attrs.teacher_id.history.deleted or ())
+        tags.update(students_tag(t) for t in teacher_ids if t)
+    # המורה ברירת המחדל: רק הוספה/מחיקה/שינוי תפקיד או אימייל של מורה (לא כל login)
+    role_hist = state.attrs.role.history
+    if (target.role == "teacher" and not is_update) or role_hist.has_changes():
+        tags.add(TEACHERS_TAG)
+    elif target.role == "teacher" and state.attrs.email.history.has_changes():
+        tags.add(TEACHERS_TAG)
+    return tags
+
+
+def _on_user_insert(mapper, connection, target):
+    _queue_tags(target, *_user_tags(target, is_update=False))
+
+
+def _on_user_update(mapper, connection, target):
+    _queue_tags(target, *_user_tags(target, is_update=True))
+
+
+def _on_user_delete(mapper, connection, target):
+    _queue_tags(target, *_user_tags(target, is_update=False))
+
+
+def _on_lesson_change(mapper, connection, target):
+    teacher_ids = {target.teacher_id}
+    teacher_ids.update(inspect(target).attrs.teacher_id.history.deleted or ())
+    _queue_tags(target, *(lessons_tag(t) for t in teacher_ids if t))
+
+
+def _after_commit(session):
+    tags = session.info.pop(_PENDING, None)
+    if tags:
+        cache = current_app.extensions.get("cache")
+        if cache is not None:
+            cache.invalidate_tags(*tags)
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING, None)
+
+
+def _register_invalidation():
+    from app.models import Lesson, User
+    from app.utils.replica import RoutingSession
+
+    listeners = [
+        (User, "after_insert", _on_user_insert),
+        (User, "after_update", _on_user_update),
+        (User, "after_delete", _on_user_delete),
+        (Lesson, "after_insert", _on_lesson_change),
+        (Lesson, "after_update", _on_lesson_change),
+        (Lesson, "after_delete", _on_lesson_change),
+    ]
+    for model, ev, handler in listeners:
+        if not event.contains(model, ev, handler):
+            event.listen(model, ev, handler)
+    if not event.contains(RoutingSession, "after_commit", _after_commit):
+        event.listen(RoutingSession, "after_commit", _after_commit)
+        event.listen(RoutingSession, "after_rollback", _after_rollback)
+
+
+def init_cache(app) -> Cache:
+    kind = (app.config.get("CACHE_BACKEND") or "local").lower()
+    if kind == "redis":
+        backend = RedisBackend(app.config["CACHE_REDIS_URL"])
+    elif kind == "null":
+        backend = NullBackend()
+    else:
+        backend = LocalBackend(max_entries=int(app.config.get("CACHE_MAX_ENTRIES", 2048)))
+    cache = Cache(backend, default_ttl=float(app.config.get("CACHE_DEFAULT_TTL", 300)))
+    app.extensions["cache"] = cache
+    _register_invalidation()
+    return cache
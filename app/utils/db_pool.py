@@ -0,0 +1,225 @@
+# app/utils/db_pool.py
+"""
+הגדרות engine/pool של SQLAlchemy מתוך משתני סביבה, וטלמטריה של ה-pool.
+
+ברירות המחדל מותאמות ל-gunicorn `-w 3 --threads 2`: כל worker צריך לכל
+היותר חיבור אחד ל-thread, אז pool_size=GUNICORN_THREADS ועוד overflow קטן.
+
+SQLite: pragmas ו-BEGIN IMMEDIATE דרך app/utils/sqlite_mode.py.
+
+משתנים (Postgres בלבד; ב-SQLite נשארים עם ברירות המחדל של SQLAlchemy):
+  DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+  DB_POOL_PRE_PING (1/0), DB_POOL_CLASS (queue/null), DB_CONNECT_TIMEOUT,
+  DB_STATEMENT_TIMEOUT_MS, DB_IDLE_IN_TX_TIMEOUT_MS,
+  PGBOUNCER_MODE (1/0) – pgbouncer ב-transaction pooling: NullPool כברירת
+  מחדל, בלי startup options (pgbouncer דוחה אותם) ובלי prepared statements;
+  ה-timeouts נקבעים ב-SET LOCAL בתחילת כל טרנזקציה.
+
+ה-timeouts מיועדים לבקשות; מיגרציות (migrations/env.py) רצות בתוך
+without_timeouts(), כדי ש-backfill או בניית אינדקס על טבלה גדולה לא ייהרגו.
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import NullPool
+
+from app.extensions import db
+from app.utils.sqlite_mode import configure_sqlite
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+
+def engine_options(uri: str) -> dict:
+    """ערך ל-SQLALCHEMY_ENGINE_OPTIONS לפי ה-URI ומשתני הסביבה."""
+    if not uri.startswith("postgresql"):
+        return {}
+
+    pgbouncer = os.getenv("PGBOUNCER_MODE", "0") == "1"
+    pool_class = os.getenv("DB_POOL_CLASS", "null" if pgbouncer else "queue").lower()
+    opts = {"pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1"}
+
+    if pool_class == "null":
+        opts["poolclass"] = NullPool
+    else:
+        threads = _env_int("GUNICORN_THREADS", 2)
+        opts.update(
+            pool_size=_env_int("DB_POOL_SIZE", threads),
+            max_overflow=_env_int("DB_MAX_OVERFLOW", 2),
+            pool_timeout=_env_int("DB_POOL_TIMEOUT", 10),
+            pool_recycle=_env_int("DB_POOL_RECYCLE", 1800),
+            pool_use_lifo=True,   # חיבורים עודפים מתיישנים ונסגרים ב-recycle
+        )
+
+    # גם ה-thread של readiness נשען על זה כדי לזהות מסד שנפל בזמן חסום
+    connect_args = {"connect_timeout": _env_int("DB_CONNECT_TIMEOUT", 5)}
+    if uri.startswith("postgresql+psycopg:"):
+        # psycopg 3: prepared statements שבורים מול pgbouncer ב-transaction mode
+        if pgbouncer:
+            connect_args["prepare_threshold"] = None
+    if not pgbouncer:
+        options = []
+        stmt_ms = _env_int("DB_STATEMENT_TIMEOUT_MS", 0)
+        idle_ms = _env_int("DB_IDLE_IN_TX_TIMEOUT_MS", 0)
+        if stmt_ms:
+            options.append(f"-c statement_timeout={stmt_ms}")
+        if idle_ms:
+            options.append(f"-c idle_in_transaction_session_timeout={idle_ms}")
+        if options:
+            connect_args["options"] = " ".join(options)
+    opts["connect_args"] = connect_args
+    return opts
+
+
+def install_transaction_timeouts(engine) -> None:
+    """pgbouncer: SET LOCAL בתחילת כל טרנזקציה (תקף רק לטרנזקציה)."""
+    stmt_ms = _env_int("DB_STATEMENT_TIMEOUT_MS", 0)
+    idle_ms = _env_int("DB_IDLE_IN_TX_TIMEOUT_MS", 0)
+    sets = []
+    if stmt_ms:
+        sets.append(f"SET LOCAL statement_timeout = {stmt_ms}")
+    if idle_ms:
+        sets.append(f"SET LOCAL idle_in_transaction_session_timeout = {idle_ms}")
+    if not sets:
+        return
+    sql = "; ".join(sets)
+
+    @event.listens_for(engine, "begin")
+    def _set_local_timeouts(conn):
+        if conn.get_execution_options().get("db_timeouts", True):
+            conn.exec_driver_sql(sql)
+
+
+@contextmanager
+def without_timeouts(connection):
+    """
+    מבטל את statement_timeout / idle_in_transaction_session_timeout לחיבור
+    הזה (מיגרציות). pgbouncer: רק מדלגים על ה-SET LOCAL; אחרת SET ברמת
+    ה-session (גם ל-autocommit_block של המיגרציות) ו-RESET בסוף.
+    """
+    connection.execution_options(db_timeouts=False)
+    session_level = (connection.dialect.name == "postgresql"
+                     and os.getenv("PGBOUNCER_MODE", "0") != "1"
+                     and (_env_int("DB_STATEMENT_TIMEOUT_MS", 0) or _env_int("DB_IDLE_IN_TX_TIMEOUT_MS", 0)))
+    if session_level:
+        connection.exec_driver_sql("SET statement_timeout = 0")
+        connection.exec_driver_sql("SET idle_in_transaction_session_timeout = 0")
+        connection.commit()
+    try:
+        yield connection
+    finally:
+        if session_level:
+            connection.rollback()
+            connection.exec_driver_sql("RESET statement_timeout")
+            connection.exec_driver_sql("RESET idle_in_transaction_session_timeout")
+            connection.commit()
+
+
+# -------------------------
+# טלמטריה
+# -------------------------
+class PoolStats:
+    """זמני checkout אחרונים (חלון מתגלגל) + ספירות, לתהליך הנוכחי."""
+
+    def __init__(self, window: int = 1024):
+        self._waits = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+
+    def observe(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkouts += 1
+            if timed_out:
+                self.timeouts += 1
+            self._waits.append(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            checkouts, timeouts = self.checkouts, self.timeouts
+        if not waits:
+            return {"checkouts": checkouts, "timeouts": timeouts, "wait_ms": None}
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(p / 100.0 * len(waits)))] * 1000, 3)
+
+        return {
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_ms": {"p50": pct(50), "p95": pct(95), "max": round(waits[-1] * 1000, 3), "window": len(waits)},
+        }
+
+
+pool_stats = PoolStats()
+_checkout_observers = []
+
+
+def add_checkout_observer(fn) -> None:
+    """fn(seconds) ייקרא אחרי כל checkout (למשל היסטוגרמת Prometheus)."""
+    if fn not in _checkout_observers:
+        _checkout_observers.append(fn)
+
+
+def _instrument_pool(engine) -> None:
+    pool = engine.pool
+    if getattr(pool, "_telemetry_wrapped", False):
+        return
+    original_connect = pool.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return original_connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            pool_stats.observe(elapsed, timed_out)
+            for fn in _checkout_observers:
+                fn(elapsed)
+
+    pool.connect = timed_connect
+    pool._telemetry_wrapped = True
+
+
+def configure_engine(engine) -> None:
+    _instrument_pool(engine)
+    # dispose() יוצר pool חדש – עוטפים גם אותו
+    if not event.contains(engine, "engine_disposed", _instrument_pool):
+        event.listen(engine, "engine_disposed", _instrument_pool)
+    if engine.dialect.name == "postgresql" and os.getenv("PGBOUNCER_MODE", "0") == "1":
+        install_transaction_timeouts(engine)
+    elif engine.dialect.name == "sqlite":
+        configure_sqlite(engine)
+
+
+def pool_status(engine) -> dict:
+    pool = engine.pool
+    status = {"class": type(pool).__name__, **pool_stats.snapshot()}
+    if hasattr(pool, "checkedout") and hasattr(pool, "size"):
+        size = pool.size()
+        checked_out = pool.checkedout()
+        capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+        status.update(
+            size=size,
+            checked_out=checked_out,
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+            saturation=round(checked_out / capacity, 3) if capacity else None,
+        )
+    return status
+
+
+def init_db_pool(app) -> None:
+    """עוטף את ה-pool של כל engine (אחרי db.init_app)."""
+    with app.app_context():
+        for engine in db.engines.values():
+            configure_engine(engine)
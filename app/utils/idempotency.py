@@ -0,0 +1,233 @@
+# app/utils/idempotency.py
+"""
+מפתחות idempotency לבקשות POST (קביעת שיעור, סימון תשלום, טופס פנייה).
+
+הלקוח שולח מפתח – כותרת Idempotency-Key, או שדה idempotency_key בטופס
+(ממולא ב-static/idempotency.js בכל טעינת עמוד). בקשה ראשונה עם המפתח:
+
+1. תופסת שורה ב-idempotency_key ב-INSERT (ייחודי על scope+endpoint+key)
+   ומבצעת commit לפני שה-view רץ – כך שבקשה כפולה ב-worker אחר נכשלת
+   ב-INSERT ולא מריצה שוב את בדיקת ההתנגשויות / שליחת המייל;
+2. מריצה את ה-view ושומרת את הסטטוס, ה-Location וגוף JSON.
+
+ה-commit של התפיסה לא מפקיע את האובייקטים שכבר נטענו ב-session
+(current_user וכו'), וה-INSERT רץ ב-SAVEPOINT כדי שמפתח קיים לא יגרור
+rollback של כל ה-session – אחרת ה-view היה טוען אותם שוב מהמסד.
+
+בקשה חוזרת מקבלת את אותה תגובה בלי ביצוע (Idempotent-Replayed: true).
+אם הראשונה עוד רצה – מחכים עד IDEMPOTENCY_WAIT_SECONDS ואז 409. אותו
+מפתח עם גוף אחר – 422. חריגה או 5xx משחררים את המפתח לניסיון חוזר;
+תפיסה של worker שמת נלקחת מחדש אחרי IDEMPOTENCY_LOCK_SECONDS. השורות
+נשמרות IDEMPOTENCY_TTL_SECONDS ונמחקות ב-`flask idempotency purge`.
+
+בקשה בלי מפתח רצה כרגיל.
+"""
+import hashlib
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import abort, current_app, flash, jsonify, request
+from flask_login import current_user
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import IdempotencyKey
+
+KEY_HEADER = "Idempotency-Key"
+KEY_FIELD = "idempotency_key"
+KEY_RE = re.compile(r"^[A-Za-z0-9_.:-]{8,64}$")
+# שדות שלא נכנסים לטביעת הבקשה
+UNHASHED_FIELDS = {KEY_FIELD, "csrf_token"}
+MAX_BODY = 64 * 1024
+POLL_INTERVAL = 0.1
+
+
+def _request_key():
+    key = request.headers.get(KEY_HEADER)
+    if key is None and not request.is_json:
+        key = request.form.get(KEY_FIELD)
+    key = (key or "").strip()
+    if not key:
+        return None
+    if not KEY_RE.match(key):
+        abort(400, description=f"{KEY_HEADER} must be 8-64 characters [A-Za-z0-9_.:-]")
+    return key
+
+
+def _fingerprint() -> str:
+    h = hashlib.sha256(f"{request.method} {request.path}\n".encode())
+    if request.is_json:
+        h.update(request.get_data(cache=True))
+    else:
+        for name, value in sorted(request.form.items(multi=True)):
+            if name not in UNHASHED_FIELDS:
+                h.update(f"{name}={value}\n".encode())
+    return h.hexdigest()
+
+
+def _scope() -> str:
+    if getattr(current_user, "is_authenticated", False):
+        return f"user:{current_user.id}"
+    return "anon"
+
+
+@contextmanager
+def _keep_loaded():
+    """commit בתוך הבלוק לא מפקיע את האובייקטים שכבר נטענו ב-session."""
+    session = db.session()
+    previous = session.expire_on_commit
+    session.expire_on_commit = False
+    try:
+        yield
+    finally:
+        session.expire_on_commit = previous
+
+
+def _claim(scope: str, endpoint: str, key: str, fingerprint: str):
+    """מחזיר (row_id, token, None) אם תפסנו, אחרת (None, None, השורה הקיימת או None)."""
+    with _keep_loaded():
+        return _claim_row(scope, endpoint, key, fingerprint)
+
+
+def _claim_row(scope: str, endpoint: str, key: str, fingerprint: str):
+    t = IdempotencyKey.__table__
+    cfg = current_app.config
+    now = datetime.utcnow()
+    token = uuid.uuid4().hex
+    values = {
+        "request_hash": fingerprint, "token": token, "status_code": None, "location": None,
+        "content_type": None, "body": None, "claimed_at": now,
+        "expires_at": now + timedelta(seconds=cfg.get("IDEMPOTENCY_TTL_SECONDS", 86400)),
+    }
+    try:
+        with db.session.begin_nested():
+            row_id = db.session.execute(
+                insert(t).values(scope=scope, endpoint=endpoint, key=key, **values).returning(t.c.id)
+            ).scalar_one()
+        db.session.commit()
+        return row_id, token, None
+    except IntegrityError:
+        pass   # ה-SAVEPOINT בוטל; שאר ה-session נשאר
+
+    # מפתח שפג תוקפו, או תפיסה של worker שמת באמצע – לוקחים מחדש ב-UPDATE מותנה
+    stale = now - timedelta(seconds=cfg.get("IDEMPOTENCY_LOCK_SECONDS", 60))
+    where = (t.c.scope == scope, t.c.endpoint == endpoint, t.c.key == key)
+    row_id = db.session.execute(
+        update(t)
+        .where(*where, or_(t.c.expires_at < now,
+                           and_(t.c.status_code.is_(None), t.c.claimed_at < stale)))
+        .values(**values)
+        .returning(t.c.id)
+    ).scalar()
+    db.session.commit()
+    if row_id:
+        return row_id, token, None
+    existing = db.session.execute(
+        select(t.c.request_hash, t.c.status_code, t.c.location, t.c.content_type, t.c.body).where(*where)
+    ).first()
+    db.session.commit()
+    return None, None, existing
+
+
+def _finish(row_id: int, token: str, response) -> None:
+    t = IdempotencyKey.__table__
+    body = None
+    if response.is_json and not response.direct_passthrough:
+        data = response.get_data(as_text=True)
+        body = data if len(data) <= MAX_BODY else None
+    db.session.execute(
+        update(t).where(t.c.id == row_id, t.c.token == token)
+        .values(status_code=response.status_code, location=response.headers.get("Location"),
+                content_type=response.content_type if body is not None else None, body=body)
+    )
+    db.session.commit()
+
+
+def _abandon(row_id: int, token: str) -> None:
+    t = IdempotencyKey.__table__
+    db.session.execute(delete(t).where(t.c.id == row_id, t.c.token == token))
+    db.session.commit()
+
+
+def _replay(row):
+    response = current_app.response_class(row.body or "", status=row.status_code,
+                                          content_type=row.content_type)
+    if row.location:
+        response.headers["Location"] = row.location
+    response.headers["Idempotent-Replayed"] = "true"
+    if 300 <= row.status_code < 400 and not request.is_json:
+        flash("הבקשה כבר התקבלה – היא לא נשלחה שוב.", "info")
+    return response
+
+
+def _conflict(status: int, message: str):
+    if request.is_json or KEY_HEADER in request.headers:
+        response = jsonify({"error": message})
+        response.status_code = status
+    else:
+        response = current_app.response_class(message, status=status, mimetype="text/plain")
+    if status == 409:
+        response.headers["Retry-After"] = "1"
+    return response
+
+
+def idempotent(fn):
+    """דקורטור ל-view של POST; מתחת לדקורטור ההרשאות (כדי ש-current_user ידוע)."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = _request_key()
+        if key is None:
+            return fn(*args, **kwargs)
+
+        scope, endpoint, fingerprint = _scope(), request.endpoint, _fingerprint()
+        deadline = time.monotonic() + current_app.config.get("IDEMPOTENCY_WAIT_SECONDS", 5)
+        while True:
+            row_id, token, existing = _claim(scope, endpoint, key, fingerprint)
+            if row_id:
+                break
+            if existing is not None:
+                if existing.request_hash != fingerprint:
+                    return _conflict(422, "idempotency key reused with a different request")
+                if existing.status_code is not None:
+                    return _replay(existing)
+            if time.monotonic() >= deadline:
+                return _conflict(409, "a request with this idempotency key is still in progress")
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            response = current_app.make_response(fn(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            _abandon(row_id, token)
+            raise
+        if response.status_code >= 500:
+            db.session.rollback()
+            _abandon(row_id, token)
+        else:
+            _finish(row_id, token, response)
+        return response
+    return wrapper
+
+
+def purge_expired(batch_size: int = 5000, now=None, logger=None) -> int:
+    """מוחק מפתחות שפג תוקפם, במנות; מחזיר כמה נמחקו."""
+    t = IdempotencyKey.__table__
+    now = now or datetime.utcnow()
+    total = 0
+    while True:
+        ids = db.session.execute(
+            select(t.c.id).where(t.c.expires_at < now).order_by(t.c.expires_at).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        db.session.execute(delete(t).where(t.c.id.in_(ids), t.c.expires_at < now))
+        db.session.commit()
+        total += len(ids)
+        if logger:
+            logger.info("idempotency purge: deleted %d", len(ids))
+    return total
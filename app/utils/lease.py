@@ -0,0 +1,99 @@
+# app/utils/lease.py
+"""
+חכירה (lease) למשימות מחזוריות – כדי ששתי הרצות של אותה משימה (cron חופף,
+שני שרתים) לא ירוצו יחד.
+
+    with job_lease("lessons.sweep_overdue", ttl=300) as lease:
+        if lease is None:
+            return   # הרצה אחרת מחזיקה
+        ...
+
+שורה אחת לכל משימה ב-job_lease. הלקיחה היא UPDATE מותנה אחד (רק אם
+החכירה פגה או שהיא כבר שלנו), כך שגם ב-Postgres וגם ב-SQLite רק מתחרה אחד
+מצליח. תהליך שמת משחרר את החכירה מעצמו כשה-TTL נגמר; משימה ארוכה
+מאריכה אותה ב-renew().
+"""
+import os
+import socket
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import JobLease
+
+
+def lease_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Lease:
+    def __init__(self, name: str, ttl: float, owner: str | None = None):
+        self.name = name
+        self.ttl = ttl
+        self.owner = owner or lease_owner()
+        self.held = False
+
+    def _expiry(self, now):
+        return now + timedelta(seconds=self.ttl)
+
+    def acquire(self) -> bool:
+        t = JobLease.__table__
+        now = datetime.utcnow()
+        taken = db.session.execute(
+            update(t)
+            .where(t.c.name == self.name, (t.c.expires_at < now) | (t.c.owner == self.owner))
+            .values(owner=self.owner, acquired_at=now, expires_at=self._expiry(now))
+        ).rowcount
+        if not taken:
+            exists = db.session.execute(select(t.c.name).where(t.c.name == self.name)).first()
+            if not exists:
+                try:
+                    db.session.execute(insert(t).values(
+                        name=self.name, owner=self.owner, acquired_at=now, expires_at=self._expiry(now)))
+                    taken = 1
+                except IntegrityError:
+                    # מישהו אחר יצר את השורה באותו רגע – הוא המחזיק
+                    db.session.rollback()
+                    return False
+        db.session.commit()
+        self.held = bool(taken)
+        return self.held
+
+    def renew(self) -> bool:
+        """מאריך את החכירה; False אם כבר לא שלנו (למשל פגה ונלקחה)."""
+        t = JobLease.__table__
+        now = datetime.utcnow()
+        ok = db.session.execute(
+            update(t).where(t.c.name == self.name, t.c.owner == self.owner)
+            .values(expires_at=self._expiry(now))
+        ).rowcount
+        db.session.commit()
+        self.held = bool(ok)
+        return self.held
+
+    def release(self) -> None:
+        if not self.held:
+            return
+        t = JobLease.__table__
+        # עבודה שלא נשמרה (חריגה בתוך ה-with) לא נכנסת לטרנזקציה של השחרור
+        db.session.rollback()
+        db.session.execute(
+            update(t).where(t.c.name == self.name, t.c.owner == self.owner)
+            .values(expires_at=datetime.utcnow())
+        )
+        db.session.commit()
+        self.held = False
+
+
+@contextmanager
+def job_lease(name: str, ttl: float = 300):
+    lease = Lease(name, ttl)
+    acquired = lease.acquire()
+    try:
+        yield lease if acquired else None
+    finally:
+        lease.release()
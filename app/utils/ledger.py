@@ -0,0 +1,286 @@
+# app/utils/ledger.py
+"""
+יומן חשבון לתלמידים (באגורות, רק הוספה).
+
+- ledger_entry: חיובים על שיעורים שבוצעו (charge, שלילי) ותשלומים (payment,
+  חיובי). כל שורה שומרת את היתרה המצטברת אחריה (balance_after_cents).
+- student_balance: היתרה הנוכחית – שורה אחת לתלמיד, מתעדכנת ב-UPDATE אטומי
+  (balance = balance + delta ... RETURNING) באותה טרנזקציה של השורות ביומן.
+  נעילת השורה מסדרת כותבים מקבילים לאותו תלמיד, כך שהיתרות המצטברות רציפות.
+- payment / payment_allocation: תשלום שהתקבל והחלוקה שלו לשיעורים; מה שלא
+  הוקצה נשאר זיכוי (מקדמה).
+
+החיוב על שיעור מסונכרן מאירועי Lesson (models.py): סימון done, ביטול, שינוי
+תעריף/משך/תלמיד או מחיקה רושמים רק את ההפרש מול מה שכבר חויב ביומן לאותו
+שיעור. Lesson.paid_amount / paid_status נשארים כתצוגה מסוכמת לשיעור.
+"""
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, text, update
+
+from app.extensions import db
+from app.models import LedgerEntry, LedgerEntryType, LessonStatus, Payment, PaymentAllocation, StudentBalance
+
+LESSON_CHARGE_ATTRS = ("status", "student_id", "hourly_rate_at_time_cents", "duration_minutes")
+
+CHARGE = LedgerEntryType.charge.value
+PAYMENT = LedgerEntryType.payment.value
+
+
+def cost_cents(rate_cents, minutes) -> int:
+    """עלות שיעור באגורות – אותו עיגול כמו LessonPricingMixin.cost."""
+    rate = round((rate_cents or 0) / 100.0, 2)
+    return int(round(round(rate * ((minutes or 0) / 60.0), 2) * 100))
+
+
+def lesson_charge_cents(lesson) -> int:
+    if lesson.status != LessonStatus.done.value:
+        return 0
+    return cost_cents(lesson.hourly_rate_at_time_cents, lesson.duration_minutes)
+
+
+# -------------------------
+# כתיבה
+# -------------------------
+def _ensure_balances(connection, teacher_by_student: dict) -> None:
+    bal = StudentBalance.__table__
+    rows = [{"student_id": s, "teacher_id": t, "balance_cents": 0, "charged_cents": 0,
+             "paid_cents": 0, "updated_at": datetime.utcnow()}
+            for s, t in teacher_by_student.items()]
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        connection.execute(dialect_insert(bal).values(rows)
+                           .on_conflict_do_nothing(index_elements=["student_id"]))
+        return
+    existing = set(connection.execute(
+        select(bal.c.student_id).where(bal.c.student_id.in_(list(teacher_by_student)))
+    ).scalars())
+    missing = [r for r in rows if r["student_id"] not in existing]
+    if missing:
+        connection.execute(insert(bal), missing)
+
+
+def post_entries(connection, entries) -> None:
+    """
+    רושם שורות ביומן ומעדכן את student_balance – UPDATE אחד לכל תלמיד
+    (לפי סדר id, כדי ששתי טרנזקציות לא יינעלו הפוך) ו-INSERT מרוכז אחד.
+    entries: dict-ים עם student_id, teacher_id, entry_type, amount_cents
+    ו-lesson_id / payment_id אופציונליים.
+    """
+    by_student = {}
+    for e in entries:
+        if e["amount_cents"] and e["student_id"]:
+            by_student.setdefault(e["student_id"], []).append(e)
+    if not by_student:
+        return
+
+    bal = StudentBalance.__table__
+    _ensure_balances(connection, {s: es[-1].get("teacher_id") for s, es in by_student.items()})
+    rows = []
+    for student_id in sorted(by_student):
+        es = by_student[student_id]
+        delta = sum(e["amount_cents"] for e in es)
+        charged = -sum(e["amount_cents"] for e in es if e["entry_type"] == CHARGE)
+        paid = sum(e["amount_cents"] for e in es if e["entry_type"] == PAYMENT)
+        teacher_id = es[-1].get("teacher_id")
+        values = {
+            "balance_cents": bal.c.balance_cents + delta,
+            "charged_cents": bal.c.charged_cents + charged,
+            "paid_cents": bal.c.paid_cents + paid,
+            "updated_at": datetime.utcnow(),
+        }
+        if teacher_id:
+            values["teacher_id"] = teacher_id
+        end_balance = connection.execute(
+            update(bal).where(bal.c.student_id == student_id).values(**values)
+            .returning(bal.c.balance_cents)
+        ).scalar_one()
+
+        # הזמן נלקח אחרי נעילת השורה – סדר created_at תואם לסדר היתרות
+        now = datetime.utcnow()
+        running = end_balance - delta
+        for e in es:
+            running += e["amount_cents"]
+            rows.append({
+                "student_id": student_id,
+                "teacher_id": e.get("teacher_id"),
+                "entry_type": e["entry_type"],
+                "amount_cents": e["amount_cents"],
+                "balance_after_cents": running,
+                "lesson_id": e.get("lesson_id"),
+                "payment_id": e.get("payment_id"),
+                "created_at": now,
+            })
+    connection.execute(insert(LedgerEntry.__table__), rows)
+
+
+def sync_lesson_charges(connection, lessons, *, new: bool = False, deleted: bool = False) -> None:
+    """
+    מיישר את החיוב ביומן לכל שיעור לפי המצב הנוכחי שלו (done -> עלות, אחרת 0).
+    lessons: אובייקטי Lesson או שורות עם אותם שדות. new=True מדלג על בדיקת
+    חיובים קיימים (שיעור חדש), deleted=True מבטל את כל החיוב.
+    """
+    lessons = [l for l in lessons if l.id is not None]
+    if not lessons:
+        return
+    led = LedgerEntry.__table__
+    current = {}   # lesson_id -> {student_id: חיוב נטו (חיובי)}
+    if not new:
+        rows = connection.execute(
+            select(led.c.lesson_id, led.c.student_id, func.sum(led.c.amount_cents))
+            .where(led.c.lesson_id.in_([l.id for l in lessons]), led.c.entry_type == CHARGE)
+            .group_by(led.c.lesson_id, led.c.student_id)
+        ).all()
+        for lesson_id, student_id, total in rows:
+            current.setdefault(lesson_id, {})[student_id] = -(total or 0)
+
+    entries = []
+    for l in lessons:
+        target = {}
+        charge = 0 if deleted else lesson_charge_cents(l)
+        if charge and l.student_id:
+            target[l.student_id] = charge
+        have = current.get(l.id, {})
+        for student_id in sorted(set(target) | set(have)):
+            diff = target.get(student_id, 0) - have.get(student_id, 0)
+            if diff:
+                entries.append({"student_id": student_id, "teacher_id": l.teacher_id,
+                                "entry_type": CHARGE, "amount_cents": -diff, "lesson_id": l.id})
+    post_entries(connection, entries)
+
+
+def record_payment(connection, *, teacher_id, student_id, amount_cents, method=None,
+                   created_by_id=None, allocations=(), note=None) -> int:
+    """
+    תשלום (או החזר, amount_cents שלילי) מתלמיד: שורת payment, הקצאות
+    לשיעורים ({lesson_id: cents}) ושורת payment ביומן. מחזיר payment_id.
+    """
+    allocations = {k: v for k, v in dict(allocations).items() if v}
+    payment_id = connection.execute(
+        insert(Payment.__table__).values(
+            teacher_id=teacher_id, student_id=student_id, amount_cents=amount_cents,
+            method=method or None, note=note, created_by_id=created_by_id,
+            created_at=datetime.utcnow(),
+        ).returning(Payment.__table__.c.id)
+    ).scalar_one()
+    if allocations:
+        connection.execute(insert(PaymentAllocation.__table__), [
+            {"payment_id": payment_id, "lesson_id": lesson_id, "amount_cents": cents}
+            for lesson_id, cents in allocations.items()
+        ])
+    post_entries(connection, [{
+        "student_id": student_id, "teacher_id": teacher_id, "entry_type": PAYMENT,
+        "amount_cents": amount_cents, "payment_id": payment_id,
+        "lesson_id": next(iter(allocations)) if len(allocations) == 1 else None,
+    }])
+    return payment_id
+
+
+_LEGACY_SOURCES = """
+    SELECT l.id AS lesson_id, l.teacher_id, l.student_id, l.start_at AS ts, 'charge' AS entry_type,
+           0 AS ord, -cc.cents AS amount_cents
+      FROM {table} l
+      JOIN charge_cost cc ON cc.rate_cents = COALESCE(l.hourly_rate_at_time_cents, 0)
+                         AND cc.minutes = COALESCE(l.duration_minutes, 0)
+     WHERE l.status = 'done' AND l.student_id IS NOT NULL
+    UNION ALL
+    SELECT id, teacher_id, student_id, start_at, 'payment', 1,
+           CAST(ROUND(paid_amount * 100) AS INTEGER)
+      FROM {table} WHERE paid_amount > 0 AND student_id IS NOT NULL
+"""
+
+
+_LEGACY_PRICES = """
+    SELECT DISTINCT COALESCE(hourly_rate_at_time_cents, 0), COALESCE(duration_minutes, 0)
+      FROM {table} WHERE status = 'done' AND student_id IS NOT NULL
+"""
+
+
+def _charge_cost_cte(connection, tables) -> str:
+    """
+    טבלת VALUES של (תעריף, משך) -> עלות לפי cost_cents() – העיגול של SQL
+    (חצי הרחק מאפס) שונה מ-round של Python, וחיוב שמולא אחרת היה מקבל
+    הפרש של אגורה ב-sync_lesson_charges הבא. זוגות שונים יש מעטים.
+    """
+    pairs = set()
+    for table in tables:
+        pairs.update(connection.execute(text(_LEGACY_PRICES.format(table=table))).all())
+    rows = ", ".join(f"({int(r)}, {int(m)}, {cost_cents(r, m)})" for r, m in sorted(pairs))
+    if not rows:
+        rows = "(0, 0, 0)"
+    return f"charge_cost (rate_cents, minutes, cents) AS (VALUES {rows})"
+
+
+def backfill_from_lessons(connection, include_archive: bool = True) -> bool:
+    """
+    בונה את היומן מהעמודות הישנות של lesson (ו-lesson_archive): חיוב לכל
+    שיעור done (העלות לפי cost_cents) ותשלום לכל paid_amount > 0, עם יתרה
+    מצטברת בפונקציית חלון, ואחר כך student_balance. רץ רק על יומן ריק; מחזיר True אם מילא.
+    """
+    if connection.execute(text("SELECT 1 FROM ledger_entry LIMIT 1")).first():
+        return False
+    tables = ("lesson", "lesson_archive") if include_archive else ("lesson",)
+    sources = " UNION ALL ".join(_LEGACY_SOURCES.format(table=t) for t in tables)
+
+    connection.execute(text(f"""
+        INSERT INTO ledger_entry (student_id, teacher_id, entry_type, amount_cents,
+                                  balance_after_cents, lesson_id, created_at)
+        WITH {_charge_cost_cte(connection, tables)}
+        SELECT student_id, teacher_id, entry_type, amount_cents,
+               SUM(amount_cents) OVER (PARTITION BY student_id ORDER BY ts, lesson_id, ord
+                                       ROWS UNBOUNDED PRECEDING),
+               lesson_id, ts
+          FROM ({sources}) AS src
+         WHERE amount_cents <> 0
+    """))
+    connection.execute(text("""
+        INSERT INTO student_balance (student_id, teacher_id, balance_cents, charged_cents, paid_cents, updated_at)
+        SELECT le.student_id, MAX(u.teacher_id), SUM(le.amount_cents),
+               -SUM(CASE WHEN le.entry_type = 'charge' THEN le.amount_cents ELSE 0 END),
+               SUM(CASE WHEN le.entry_type = 'payment' THEN le.amount_cents ELSE 0 END),
+               CURRENT_TIMESTAMP
+          FROM ledger_entry le JOIN "user" u ON u.id = le.student_id
+         GROUP BY le.student_id
+    """))
+    return True
+
+
+# -------------------------
+# קריאה
+# -------------------------
+def get_balance(student_id: int) -> StudentBalance | None:
+    """יתרה נוכחית – שליפה לפי מפתח ראשי."""
+    return db.session.get(StudentBalance, student_id)
+
+
+def statement(student_id: int, start: datetime | None = None, end: datetime | None = None,
+              limit: int = 500):
+    """
+    דף חשבון לתקופה: (יתרת פתיחה, שורות מהישנה לחדשה, truncated) – סריקת
+    טווח אחת על ix_ledger_student_created, מהסוף: בתקופה עם יותר מ-limit
+    שורות מוחזרות ה-limit האחרונות ו-truncated=True. יתרת הפתיחה נגזרת
+    מהשורה הראשונה שמוחזרת (כלומר היתרה לפני השורות המוצגות).
+    """
+    q = LedgerEntry.query.filter(LedgerEntry.student_id == student_id)
+    if start:
+        q = q.filter(LedgerEntry.created_at >= start)
+    if end:
+        q = q.filter(LedgerEntry.created_at < end)
+    entries = q.order_by(LedgerEntry.created_at.desc(), LedgerEntry.id.desc()).limit(limit + 1).all()
+    truncated = len(entries) > limit
+    entries = entries[:limit][::-1]
+    if entries:
+        opening = entries[0].balance_after_cents - entries[0].amount_cents
+    elif start:
+        prev = (LedgerEntry.query
+                .filter(LedgerEntry.student_id == student_id, LedgerEntry.created_at < start)
+                .order_by(LedgerEntry.created_at.desc(), LedgerEntry.id.desc())
+                .first())
+        opening = prev.balance_after_cents if prev else 0
+    else:
+        opening = 0
+    return opening, entries, truncated
@@ -0,0 +1,79 @@
+# app/utils/lesson_archive.py
+"""
+ארכוב שיעורים ישנים: lesson -> lesson_archive.
+
+שיעור שהסטטוס שלו done/cancelled ו-start_at שלו לפני האופק
+(now - LESSON_ARCHIVE_AFTER_DAYS) עובר לטבלת הארכיון. כל מנה היא טרנזקציה
+אחת (INSERT ... SELECT + DELETE לפי אותם ids), כך שהרצה שנקטעה לא משאירה
+חצי מצב, והרצה חוזרת פשוט ממשיכה מאיפה שנעצרה.
+
+הדוחות (lessons_completed / PDF) מאחדים את הארכיון רק כשטווח התאריכים
+המבוקש מתחיל לפני האופק; הדשבורדים ולוח השנה נוגעים רק ב-lesson.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import delete, insert, literal, select
+
+from app.extensions import db
+from app.models import LESSON_ARCHIVE_COLUMNS, Lesson, LessonArchive
+
+ARCHIVABLE_STATUSES = ("done", "cancelled")
+
+
+def archive_horizon(now: Optional[datetime] = None) -> datetime:
+    days = int(current_app.config.get("LESSON_ARCHIVE_AFTER_DAYS", 365))
+    return (now or datetime.utcnow()) - timedelta(days=days)
+
+
+def reaches_archive(start_dt: Optional[datetime]) -> bool:
+    """האם טווח שמתחיל ב-start_dt (None = בלי גבול) עשוי לכלול שורות מהארכיון."""
+    return start_dt is None or start_dt < archive_horizon()
+
+
+def archive_lessons(before: datetime, batch_size: int = 1000, max_batches: Optional[int] = None,
+                    pause: float = 0.0, dry_run: bool = False, logger=None) -> dict:
+    """מעביר שיעורים במנות; מחזיר {"batches", "moved", "remaining"}."""
+    stats = {"batches": 0, "moved": 0, "remaining": None}
+    candidates = (
+        select(Lesson.id)
+        .where(Lesson.status.in_(ARCHIVABLE_STATUSES), Lesson.start_at < before)
+        .order_by(Lesson.id)
+        .limit(batch_size)
+    )
+
+    if dry_run:
+        stats["remaining"] = db.session.execute(
+            select(db.func.count()).select_from(Lesson)
+            .where(Lesson.status.in_(ARCHIVABLE_STATUSES), Lesson.start_at < before)
+        ).scalar_one()
+        return stats
+
+    now = datetime.utcnow()
+    lesson_cols = [Lesson.__table__.c[name] for name in LESSON_ARCHIVE_COLUMNS]
+    while max_batches is None or stats["batches"] < max_batches:
+        ids = db.session.execute(candidates).scalars().all()
+        if not ids:
+            stats["remaining"] = 0
+            break
+        try:
+            db.session.execute(
+                insert(LessonArchive.__table__).from_select(
+                    [*LESSON_ARCHIVE_COLUMNS, "archived_at"],
+                    select(*lesson_cols, literal(now)).where(Lesson.id.in_(ids)),
+                )
+            )
+            db.session.execute(delete(Lesson.__table__).where(Lesson.id.in_(ids)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        stats["batches"] += 1
+        stats["moved"] += len(ids)
+        if logger:
+            logger.info("lesson archive: batch %d moved %d (last id %d)", stats["batches"], len(ids), ids[-1])
+        if pause:
+            time.sleep(pause)
+    return stats
@@ -7,6 +7,8 @@ from email.message import EmailMessage
 from typing import Iterable, Optional, Union, List
 from flask import current_app
 
+from app.metrics import track_job
+
 
 def _as_list(x) -> List[str]:
     if not x:
@@ -89,23 +91,28 @@ def send_email(
 
     # שליחה בפועל
     try:
-        if use_ssl or port == 465:
-            context = ssl.create_default_context()
-            with smtplib.SMTP_SSL(server, port, context=context) as smtp:
-                if username and password:
-                    smtp.login(username, password)
-                smtp.send_message(msg, from_addr=sender, to_addrs=all_rcpts)
-        else:
-            with smtplib.SMTP(server, port) as smtp:
-                smtp.ehlo()
-                if use_tls:
-                    context = ssl.create_default_context()
-                    smtp.starttls(context=context)
-                    smtp.ehlo()
-                if username and password:
-                    smtp.login(username, password)
-                smtp.send_message(msg, from_addr=sender, to_addrs=all_rcpts)
+        with track_job("email"):
+            _deliver(msg, server, port, username, password, use_tls, use_ssl, sender, all_rcpts)
         return True
     except Exception as e:
         current_app.logger.exception("send_email failed: %r", e)
         return False
+
+
+def _deliver(msg, server, port, username, password, use_tls, use_ssl, sender, all_rcpts) -> None:
+    if use_ssl or port == 465:
+        context = ssl.create_default_context()
+        with smtplib.SMTP_SSL(server, port, context=context) as smtp:
+            if username and password:
+                smtp.login(username, password)
+            smtp.send_message(msg, from_addr=sender, to_addrs=all_rcpts)
+    else:
+        with smtplib.SMTP(server, port) as smtp:
+            smtp.ehlo()
+            if use_tls:
+                context = ssl.create_default_context()
+                smtp.starttls(context=context)
+                smtp.ehlo()
+            if username and password:
+                smtp.login(username, password)
+            smtp.send_message(msg, from_addr=sender, to_addrs=all_rcpts)
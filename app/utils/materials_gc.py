@@ -0,0 +1,101 @@
+# app/utils/materials_gc.py
+"""
+איסוף קבצים יתומים בתיקיית החומרים (instance/materials).
+
+קבצים שנשארו בדיסק בלי שורת student_material (מחיקה שנכשלה, commit שנכשל
+אחרי file.save) מזוהים בסריקה זורמת של התיקייה מול קבוצת ה-file_path
+שמופיעים בטבלה. הטבלה נקראת עם server-side cursor, והתיקייה עם os.scandir,
+כך שאף אחד מהם לא נטען לזיכרון כרשימה מלאה.
+"""
+import os
+import shutil
+import time
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models import StudentMaterial
+
+FETCH_BATCH = 5000
+
+
+def referenced_file_paths(batch_size: int = FETCH_BATCH) -> set:
+    """כל ערכי file_path שמופיעים ב-student_material (נקרא במנות מהשרת)."""
+    stmt = (select(StudentMaterial.file_path)
+            .where(StudentMaterial.file_path.isnot(None))
+            .distinct()
+            .execution_options(stream_results=True, yield_per=batch_size))
+    refs = set()
+    for partition in db.session.execute(stmt).scalars().partitions(batch_size):
+        refs.update(partition)
+    return refs
+
+
+def _iter_files(root: str) -> Iterator[os.DirEntry]:
+    with os.scandir(root) as it:
+        for entry in it:
+            if entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def collect_orphans(
+    upload_path: str,
+    *,
+    grace_seconds: float = 24 * 3600,
+    action: str = "quarantine",
+    quarantine_path: Optional[str] = None,
+    dry_run: bool = False,
+    logger=None,
+) -> dict:
+    """
+    מוחק/מעביר להסגר קבצים יתומים שגילם עולה על grace_seconds.
+    מחזיר dict עם ספירות ובתים שהתפנו.
+    """
+    if action not in {"quarantine", "delete"}:
+        raise ValueError(f"unknown action: {action!r}")
+    if action == "quarantine":
+        if not quarantine_path:
+            raise ValueError("quarantine_path is required for action='quarantine'")
+        if not dry_run:
+            os.makedirs(quarantine_path, exist_ok=True)
+
+    stats = {"scanned": 0, "referenced": 0, "too_new": 0, "orphans": 0, "failed": 0, "reclaimed_bytes": 0}
+    if not upload_path or not os.path.isdir(upload_path):
+        return stats
+
+    refs = referenced_file_paths()
+    cutoff = time.time() - grace_seconds
+
+    for entry in _iter_files(upload_path):
+        stats["scanned"] += 1
+        if entry.name in refs:
+            stats["referenced"] += 1
+            continue
+        try:
+            st = entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+        # קובץ טרי עשוי להיות באמצע העלאה שעוד לא עשתה commit
+        if st.st_mtime > cutoff:
+            stats["too_new"] += 1
+            continue
+
+        stats["orphans"] += 1
+        if dry_run:
+            stats["reclaimed_bytes"] += st.st_size
+            continue
+        try:
+            if action == "delete":
+                os.remove(entry.path)
+            else:
+                shutil.move(entry.path, os.path.join(quarantine_path, entry.name))
+            stats["reclaimed_bytes"] += st.st_size
+        except FileNotFoundError:
+            pass
+        except Exception as exc:
+            stats["failed"] += 1
+            if logger:
+                logger.warning("materials gc: failed handling %s: %r", entry.name, exc)
+
+    return stats
@@ -0,0 +1,72 @@
+# app/utils/notifications.py
+"""
+תור התראות (טבלת notification, outbox).
+
+הכותבים מכניסים שורות באותה טרנזקציה של השינוי (queue_notifications), כך
+שהתראה נשלחת רק על שינוי שנשמר. `flask notifications send` שולח את מה
+שממתין במייל, מסמן sent_at, ומנסה שוב שורות שנכשלו עד max_attempts.
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy import insert, select, update
+
+from app.extensions import db
+from app.models import Notification, User
+from app.utils.mail import send_email
+
+
+def queue_notifications(connection, items) -> int:
+    """items: dict-ים עם user_id, kind, payload (dict). INSERT מרוכז אחד."""
+    rows = [{"user_id": i["user_id"], "kind": i["kind"],
+             "payload": json.dumps(i.get("payload") or {}, ensure_ascii=False),
+             "created_at": datetime.utcnow(), "attempts": 0}
+            for i in items if i.get("user_id")]
+    if rows:
+        connection.execute(insert(Notification.__table__), rows)
+    return len(rows)
+
+
+def _format_lessons_overdue(payload: dict) -> tuple[str, str]:
+    lines = []
+    if payload.get("auto_done"):
+        lines.append("שיעורים שסומנו אוטומטית כ'בוצע':")
+        lines += [f"  • {i['start_at'].replace('T', ' ')}" for i in payload["auto_done"]]
+    if payload.get("flagged"):
+        lines.append("שיעורים שעבר זמנם ועדיין לא סומנו:")
+        lines += [f"  • {i['start_at'].replace('T', ' ')}" for i in payload["flagged"]]
+    count = len(payload.get("auto_done", [])) + len(payload.get("flagged", []))
+    return f"{count} שיעורים שעבר זמנם", "\n".join(lines)
+
+
+FORMATTERS = {
+    "lessons_overdue": _format_lessons_overdue,
+}
+
+
+def send_pending(batch_size: int = 100, max_attempts: int = 5, logger=None) -> dict:
+    """שולח התראות שממתינות (הוותיקות קודם); מחזיר {"sent", "failed"}."""
+    stats = {"sent": 0, "failed": 0}
+    rows = db.session.execute(
+        select(Notification.id, Notification.kind, Notification.payload, User.email)
+        .join(User, User.id == Notification.user_id)
+        .where(Notification.sent_at.is_(None), Notification.attempts < max_attempts)
+        .order_by(Notification.id)
+        .limit(batch_size)
+    ).all()
+    t = Notification.__table__
+    for row in rows:
+        fmt = FORMATTERS.get(row.kind)
+        ok = False
+        if fmt and row.email:
+            subject, body = fmt(json.loads(row.payload or "{}"))
+            ok = send_email(subject, body, row.email)
+        values = {"attempts": t.c.attempts + 1}
+        if ok:
+            values["sent_at"] = datetime.utcnow()
+        db.session.execute(update(t).where(t.c.id == row.id).values(**values))
+        db.session.commit()   # כל התראה בנפרד – כישלון בהמשך לא שולח שוב את מה שכבר יצא
+        stats["sent" if ok else "failed"] += 1
+        if not ok and logger:
+            logger.warning("notification %s (%s) not sent", row.id, row.kind)
+    return stats
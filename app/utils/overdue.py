@@ -0,0 +1,129 @@
+# app/utils/overdue.py
+"""
+sweeper לשיעורים שעבר זמנם (flask lessons sweep-overdue, מ-cron).
+
+שיעור scheduled שהסתיים לפני יותר מ-OVERDUE_GRACE_MINUTES ועוד לא טופל
+(overdue_flagged_at IS NULL) נמצא בשאילתה אחת על פני כל המורים (האינדקס
+החלקי ix_lesson_overdue_sweep). כל מנה מעודכנת ב-UPDATE אחד:
+
+- מדיניות המורה auto_done: status = 'done' (והחיוב נרשם ביומן החשבון);
+- flag (ברירת המחדל): רק overdue_flagged_at, השיעור נשאר בדשבורד לטיפול.
+
+באותה טרנזקציה נכנסת לתור התראה אחת לכל מורה במנה. הרצות חופפות לא
+מתנגשות: ה-CLI רץ תחת חכירה (app/utils/lease.py), וה-UPDATE עצמו מותנה
+במצב שנקרא (scheduled ועוד לא סומן), כך ששינוי מקביל של המורה גובר.
+"""
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import case, func, select, update
+
+from app.extensions import db
+from app.models import Lesson, User, lesson_scheduled_clause
+from app.teacher.dashboard import OVERDUE_GRACE_MINUTES
+from app.utils.audit import event_row, record_events
+from app.utils.cache import invalidate_after_commit, lessons_tag
+from app.utils.ledger import sync_lesson_charges
+from app.utils.notifications import queue_notifications
+
+AUTO_DONE = "auto_done"
+FLAG = "flag"
+
+
+def _candidates(threshold: datetime, default_policy: str, limit: int):
+    return (
+        select(Lesson.id, Lesson.teacher_id, Lesson.student_id, Lesson.start_at,
+               Lesson.hourly_rate_at_time_cents, Lesson.duration_minutes,
+               func.coalesce(User.overdue_policy, default_policy).label("policy"))
+        .join(User, User.id == Lesson.teacher_id)
+        .where(lesson_scheduled_clause(),
+               Lesson.overdue_flagged_at.is_(None),
+               Lesson.end_at < threshold)
+        .order_by(Lesson.end_at)
+        .limit(limit)
+    )
+
+
+def sweep_overdue(now: Optional[datetime] = None, grace_minutes: int = OVERDUE_GRACE_MINUTES,
+                  batch_size: int = 500, max_batches: Optional[int] = None, dry_run: bool = False,
+                  lease=None, pause: float = 0.0, logger=None) -> dict:
+    """מטפל בשיעורים שעבר זמנם במנות; מחזיר {"batches", "auto_done", "flagged", "notified"}."""
+    now = now or datetime.utcnow()
+    threshold = now - timedelta(minutes=grace_minutes)
+    default_policy = current_app.config.get("OVERDUE_DEFAULT_POLICY", FLAG)
+    stats = {"batches": 0, "auto_done": 0, "flagged": 0, "notified": 0}
+
+    if dry_run:
+        sub = _candidates(threshold, default_policy, None).subquery()
+        for policy, n in db.session.execute(select(sub.c.policy, func.count()).group_by(sub.c.policy)):
+            stats["auto_done" if policy == AUTO_DONE else "flagged"] += n
+        return stats
+
+    lesson_t = Lesson.__table__
+    while max_batches is None or stats["batches"] < max_batches:
+        rows = db.session.execute(_candidates(threshold, default_policy, batch_size)).all()
+        if not rows:
+            break
+        by_id = {r.id: r for r in rows}
+        auto_ids = [r.id for r in rows if r.policy == AUTO_DONE]
+        try:
+            # UPDATE אחד למנה; התנאים חוזרים על הבחירה כדי ששינוי מקביל לא יידרס
+            new_status = lesson_t.c.status
+            if auto_ids:
+                new_status = case((lesson_t.c.id.in_(auto_ids), "done"), else_=lesson_t.c.status)
+            changed = db.session.execute(
+                update(lesson_t)
+                .where(lesson_t.c.id.in_(list(by_id)),
+                       lesson_t.c.status == "scheduled",
+                       lesson_t.c.overdue_flagged_at.is_(None))
+                .values(status=new_status, overdue_flagged_at=now)
+                .returning(lesson_t.c.id, lesson_t.c.status)
+            ).all()
+
+            per_teacher = {}
+            charged = []
+            events = []
+            for lesson_id, status in changed:
+                r = by_id[lesson_id]
+                changes = {"overdue_flagged_at": [None, now.isoformat()]}
+                if status == "done":
+                    changes["status"] = ["scheduled", "done"]
+                events.append(event_row(r, "done" if status == "done" else "flag", changes, ts=now))
+                bucket = per_teacher.setdefault(r.teacher_id, {"auto_done": [], "flagged": []})
+                item = {"id": lesson_id, "start_at": r.start_at.isoformat(timespec="minutes")}
+                if status == "done":
+                    bucket["auto_done"].append(item)
+                    charged.append(SimpleNamespace(**r._mapping, status="done"))
+                else:
+                    bucket["flagged"].append(item)
+
+            # UPDATE מרוכז עוקף את אירועי Lesson – החיובים והמטמון ידנית
+            sync_lesson_charges(db.session.connection(), charged)
+            record_events(db.session.connection(), events)
+            queue_notifications(db.session.connection(), [
+                {"user_id": teacher_id, "kind": "lessons_overdue", "payload": payload}
+                for teacher_id, payload in per_teacher.items()
+            ])
+            invalidate_after_commit(db.session, *(lessons_tag(t) for t in per_teacher))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        stats["batches"] += 1
+        stats["auto_done"] += len(charged)
+        stats["flagged"] += len(changed) - len(charged)
+        stats["notified"] += len(per_teacher)
+        if logger:
+            logger.info("overdue sweep: batch %d updated %d (%d auto-done) for %d teachers",
+                        stats["batches"], len(changed), len(charged), len(per_teacher))
+        if lease is not None and not lease.renew():
+            if logger:
+                logger.warning("overdue sweep: lease lost, stopping")
+            break
+        if pause:
+            time.sleep(pause)
+    return stats
@@ -0,0 +1,97 @@
+# app/utils/page_cache.py
+"""
+מטמון עמודים מלא לאורחים (landing / login / register).
+
+בקשת GET של אורח – בלי משתמש ב-session, בלי flash ממתין ובלי עוגיית
+remember – מוגשת מהזיכרון של התהליך עם ETag; If-None-Match תואם מחזיר
+304 בלי רינדור בכלל. כל השאר (משתמש מחובר, POST, הודעות flash) עובר
+כרגיל ולא נשמר. במצב debug (פיתוח מקומי) המטמון לא פעיל.
+
+הרינדור הראשון נשמר ל-PAGE_CACHE_SECONDS. התגובה כוללת גם
+X-Accel-Expires כדי שה-micro-cache של nginx (nginx/nginx.conf) ישמור אותה
+לכמה שניות; nginx מסיר את הכותרת לפני שהיא מגיעה לדפדפן.
+"""
+import hashlib
+import threading
+import time
+
+from flask import current_app, g, request, session
+
+CACHED_ENDPOINTS = {"main.landing", "auth.landing", "auth.login", "auth.register"}
+
+
+class PageCache:
+    def __init__(self, ttl: float, edge_ttl: int, max_entries: int = 256):
+        self.ttl = ttl
+        self.edge_ttl = edge_ttl
+        self.max_entries = max_entries
+        self._entries = {}   # key -> (expires_at, etag, body, mimetype)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cacheable_request() -> bool:
+        if current_app.debug:
+            return False
+        if request.method not in ("GET", "HEAD") or request.endpoint not in CACHED_ENDPOINTS:
+            return False
+        if "_user_id" in session or "_flashes" in session:
+            return False
+        remember = current_app.config.get("REMEMBER_COOKIE_NAME", "remember_token")
+        return remember not in request.cookies
+
+    @staticmethod
+    def key() -> str:
+        return request.full_path
+
+    def _headers(self, response, etag):
+        response.set_etag(etag)
+        # הדפדפן תמיד מאמת מחדש (זול: 304); nginx שומר ל-edge_ttl שניות
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Accel-Expires"] = str(self.edge_ttl)
+        response.vary.add("Cookie")
+        return response
+
+    def before_request(self):
+        if not self.cacheable_request():
+            return None
+        g._page_cache = True
+        with self._lock:
+            entry = self._entries.get(self.key())
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        _, etag, body, mimetype = entry
+        response = current_app.response_class(body, mimetype=mimetype)
+        response.headers["X-Page-Cache"] = "HIT"
+        self._headers(response, etag)
+        return response.make_conditional(request)
+
+    def after_request(self, response):
+        if not g.pop("_page_cache", False) or response.headers.get("X-Page-Cache") == "HIT":
+            return response
+        # flash/login בתוך ה-view הופכים את התגובה לאישית
+        if response.status_code != 200 or session.modified or response.direct_passthrough:
+            return response
+        body = response.get_data()
+        etag = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[self.key()] = (time.monotonic() + self.ttl, etag, body, response.mimetype)
+        response.headers["X-Page-Cache"] = "MISS"
+        self._headers(response, etag)
+        return response.make_conditional(request)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def init_page_cache(app):
+    ttl = float(app.config.get("PAGE_CACHE_SECONDS", 0))
+    if ttl <= 0:
+        return None
+    cache = PageCache(ttl=ttl, edge_ttl=int(app.config.get("PAGE_CACHE_EDGE_SECONDS", 10)))
+    app.extensions["page_cache"] = cache
+    app.before_request(cache.before_request)
+    app.after_request(cache.after_request)
+    return cache
@@ -0,0 +1,152 @@
+# app/utils/payments.py
+"""
+סימון תשלומים על שיעורים – נתיב אחד לכל ה-endpoints.
+
+    results = apply_payment(current_user, [12, 13, 14], "bit", amount=None)
+    # {12: "updated", 13: "forbidden", 14: "archived"}
+
+- ההרשאה לכל ה-ids נבדקת בשאילתה אחת (מורה – רק השיעורים שלו; admin – הכל).
+- העדכון עצמו הוא UPDATE אחד על כל השיעורים המורשים.
+- amount (בשקלים, לכל שיעור) אופציונלי: בלי סכום ועם אופן תשלום – השיעור
+  שולם במלואו (paid_amount = העלות); עם סכום – paid/partial/unpaid לפי
+  העלות של כל שורה; אופן תשלום ריק בלי סכום – מבטל את הסימון.
+- ההפרש מול הסכום הקודם נרשם ביומן החשבון (app/utils/ledger.py): תשלום אחד
+  לכל תלמיד, עם הקצאה לכל שיעור (ביטול סימון = החזר שלילי).
+- שיעורים בארכיון (lesson_archive) לקריאה בלבד ומדולגים.
+"""
+import math
+
+from sqlalchemy import case, select, update
+
+from app.constants import PAYMENT_METHODS
+from app.extensions import db
+from app.models import Lesson, LessonArchive
+from app.utils.audit import event_row, record_events
+from app.utils.cache import invalidate_after_commit, lessons_tag
+from app.utils.ledger import cost_cents, record_payment
+
+MAX_BATCH = 500
+
+UPDATED = "updated"
+NOT_FOUND = "not_found"
+FORBIDDEN = "forbidden"
+ARCHIVED = "archived"
+
+
+class PaymentError(ValueError):
+    """קלט לא תקין (אופן תשלום / סכום / רשימת שיעורים)."""
+
+
+def _normalize(method, amount):
+    method = (method or "").strip()
+    if method not in dict(PAYMENT_METHODS):
+        raise PaymentError("payment method not allowed")
+    if amount in (None, ""):
+        return method, None
+    try:
+        amount = round(float(amount), 2)
+    except (TypeError, ValueError):
+        raise PaymentError("invalid amount")
+    if not math.isfinite(amount) or amount < 0:
+        raise PaymentError("invalid amount")
+    return method, amount
+
+
+def _authorize(user, lesson_ids):
+    """{id: תוצאה} לכל id – בשאילתה אחת (ועוד אחת רק אם חסרים ids)."""
+    rows = db.session.execute(
+        select(Lesson.id, Lesson.teacher_id, Lesson.student_id, Lesson.paid_amount,
+               Lesson.paid_status, Lesson.payment_method,
+               Lesson.hourly_rate_at_time_cents, Lesson.duration_minutes)
+        .where(Lesson.id.in_(lesson_ids))
+        .with_for_update()   # הסכום הקודם נקרא ונכתב באותה טרנזקציה (הפרש ליומן)
+    ).all()
+    is_admin = str(getattr(user, "role", "")).lower() == "admin"
+    results = {i: NOT_FOUND for i in lesson_ids}
+    allowed = []
+    for row in rows:
+        if is_admin or row.teacher_id == user.id:
+            results[row.id] = UPDATED
+            allowed.append(row)
+        else:
+            results[row.id] = FORBIDDEN
+
+    missing = [i for i, r in results.items() if r == NOT_FOUND]
+    if missing:
+        q = select(LessonArchive.id).where(LessonArchive.id.in_(missing))
+        if not is_admin:
+            q = q.where(LessonArchive.teacher_id == user.id)
+        for (lesson_id,) in db.session.execute(q):
+            results[lesson_id] = ARCHIVED
+    return results, allowed
+
+
+def _new_paid_cents(row, method, amount) -> int:
+    if amount is None:
+        return cost_cents(row.hourly_rate_at_time_cents, row.duration_minutes) if method else 0
+    return int(round(amount * 100))
+
+
+def _paid_status(row, paid_cents) -> str:
+    if paid_cents <= 0:
+        return "unpaid"
+    cost = cost_cents(row.hourly_rate_at_time_cents, row.duration_minutes)
+    return "paid" if paid_cents >= cost else "partial"
+
+
+def _record_ledger(user, allowed, new_paid, method) -> None:
+    """תשלום אחד לכל תלמיד על ההפרש בין הסכום החדש לקודם, עם הקצאה לכל שיעור."""
+    by_student = {}
+    for row in allowed:
+        delta = new_paid[row.id] - int(round((row.paid_amount or 0) * 100))
+        if delta and row.student_id:
+            by_student.setdefault((row.student_id, row.teacher_id), {})[row.id] = delta
+    connection = db.session.connection()
+    for (student_id, teacher_id), allocations in sorted(by_student.items()):
+        record_payment(connection, teacher_id=teacher_id, student_id=student_id,
+                       amount_cents=sum(allocations.values()), method=method,
+                       created_by_id=user.id, allocations=allocations)
+
+
+def _record_audit(user, allowed, new_paid, status, method) -> None:
+    rows = []
+    for row in allowed:
+        after = {"paid_amount": new_paid[row.id] / 100.0, "paid_status": status[row.id],
+                 "payment_method": method or None}
+        changes = {k: [getattr(row, k), v] for k, v in after.items() if getattr(row, k) != v}
+        if changes:
+            rows.append(event_row(row, "payment", changes, actor_id=user.id))
+    record_events(db.session.connection(), rows)
+
+
+def apply_payment(user, lesson_ids, method, amount=None, *, commit: bool = True) -> dict:
+    """מסמן תשלום על כמה שיעורים ב-UPDATE אחד; מחזיר {lesson_id: תוצאה}."""
+    method, amount = _normalize(method, amount)
+    ids = list(dict.fromkeys(int(i) for i in lesson_ids))
+    if not ids:
+        raise PaymentError("no lessons selected")
+    if len(ids) > MAX_BATCH:
+        raise PaymentError(f"at most {MAX_BATCH} lessons per request")
+
+    results, allowed = _authorize(user, ids)
+    if allowed:
+        new_paid = {row.id: _new_paid_cents(row, method, amount) for row in allowed}
+        status = {row.id: _paid_status(row, new_paid[row.id]) for row in allowed}
+        # UPDATE אחד; הערכים לכל שורה דרך CASE על id
+        db.session.execute(
+            update(Lesson)
+            .where(Lesson.id.in_(list(new_paid)))
+            .values(
+                payment_method=method or None,
+                paid_amount=case({i: c / 100.0 for i, c in new_paid.items()}, value=Lesson.id),
+                paid_status=case(status, value=Lesson.id),
+            )
+            .execution_options(synchronize_session="fetch")
+        )
+        _record_ledger(user, allowed, new_paid, method)
+        _record_audit(user, allowed, new_paid, status, method)
+        # UPDATE מרוכז לא מפעיל אירועי mapper – מבטלים את המטמון ידנית
+        invalidate_after_commit(db.session, *{lessons_tag(row.teacher_id) for row in allowed})
+        if commit:
+            db.session.commit()
+    return results
@@ -12,6 +12,8 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 
+from app.metrics import timed_job
+
 FONT_NAME = "LessonAssistant"
 FONT_PATH = Path(__file__).resolve().parent.parent / "static" / "fonts" / "Assistant-Regular.ttf"
 FALLBACK_FONTS = [
@@ -98,6 +100,7 @@ def _draw_wrapped_lines(pdf: canvas.Canvas, raw_line: str, x_right: float, y_pos
     return y_pos
 
 
+@timed_job("pdf_export")
 def generate_lessons_summary_pdf(*, teacher_name: str, lessons: Iterable, filters: dict, totals: Tuple[int, float, float]) -> bytes:
     """Create a PDF summary for completed lessons."""
     _ensure_font_registered()
@@ -0,0 +1,212 @@
+# app/utils/profiling.py
+"""
+פרופיילר דוגם ולכידת בקשות איטיות.
+
+- PROFILING_ENABLED=1: כל בקשה נמדדת; בקשה שלקחה יותר מ-SLOW_REQUEST_MS
+  נשמרת (ציר זמן SQL, זמן רינדור טמפלטים, דגימות מחסנית) ב-ring buffer.
+- PROFILING_HEADER=1 (ברירת מחדל): אדמין יכול לבקש פרופיל לבקשה בודדת
+  עם הכותרת X-Profile: 1 – היא נשמרת בלי קשר לזמן.
+
+כשאף אחד מהם לא פעיל לא נרשם שום hook. כשרק הכותרת פעילה, בקשה רגילה
+משלמת בדיקת כותרת אחת. הדגימה נעשית ע"י thread אחד לתהליך שמסתכל רק על
+threads שנמצאים באמצע בקשה מפורפלת.
+
+ה-buffer הוא לכל תהליך (worker), כך שהמסך באדמין מציג את מה שנלכד
+ב-worker שטיפל בבקשת הצפייה.
+"""
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+
+from flask import before_render_template, current_app, g, has_request_context, request, template_rendered
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROFILE_HEADER = "X-Profile"
+MAX_SQL_ENTRIES = 500
+MAX_STACK_DEPTH = 40
+
+
+class _Sampler(threading.Thread):
+    """דוגם את המחסנית של threads רשומים כל interval שניות."""
+
+    def __init__(self, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.active: dict[int, Counter] = {}
+        self.pid = os.getpid()
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            if not self.active:
+                continue
+            frames = sys._current_frames()
+            for ident, counter in list(self.active.items()):
+                frame = frames.get(ident)
+                if frame is not None:
+                    counter[_collapse(frame)] += 1
+
+
+def _collapse(frame) -> str:
+    parts = []
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class Profiler:
+    def __init__(self, app):
+        cfg = app.config
+        self.slow_ms = float(cfg.get("SLOW_REQUEST_MS", 1000))
+        self.capture_all = bool(cfg.get("PROFILING_ENABLED"))
+        self.allow_header = bool(cfg.get("PROFILING_HEADER"))
+        self.interval = float(cfg.get("PROFILE_SAMPLE_INTERVAL_MS", 5)) / 1000.0
+        self.records = deque(maxlen=int(cfg.get("PROFILE_RING_SIZE", 50)))
+        self._sampler = None
+        self._lock = threading.Lock()
+
+    # ---- sampler (נוצר בעצלות, ומחדש אחרי fork) ----
+    def sampler(self) -> _Sampler:
+        with self._lock:
+            if self._sampler is None or self._sampler.pid != os.getpid():
+                self._sampler = _Sampler(self.interval)
+                self._sampler.start()
+            return self._sampler
+
+    def get(self, record_id):
+        for rec in self.records:
+            if rec["id"] == record_id:
+                return rec
+        return None
+
+    # ---- hooks ----
+    def before_request(self):
+        forced = False
+        if self.allow_header and request.headers.get(PROFILE_HEADER) == "1":
+            forced = getattr(current_user, "role", None) == "admin"
+        if not (self.capture_all or forced):
+            return
+        ident = threading.get_ident()
+        stacks = Counter()
+        self.sampler().active[ident] = stacks
+        g._prof = {
+            "t0": time.perf_counter(),
+            "forced": forced,
+            "ident": ident,
+            "stacks": stacks,
+            "sql": [],
+            "templates": [],
+            "tpl_stack": [],
+        }
+
+    def after_request(self, response):
+        prof = g.get("_prof")
+        if prof is None:
+            return response
+        duration_ms = (time.perf_counter() - prof["t0"]) * 1000
+        if self._sampler is not None:
+            self._sampler.active.pop(prof["ident"], None)
+        if prof["forced"] or duration_ms >= self.slow_ms:
+            rec = self._record(prof, response, duration_ms)
+            self.records.appendleft(rec)
+            response.headers["X-Profile-Id"] = rec["id"]
+        g._prof = None
+        return response
+
+    def teardown_request(self, exc):
+        # בקשה שנפלה לפני after_request – לא להשאיר thread רשום בדוגם
+        prof = g.pop("_prof", None)
+        if prof is not None and self._sampler is not None:
+            self._sampler.active.pop(prof["ident"], None)
+
+    def _record(self, prof, response, duration_ms) -> dict:
+        sql_total = sum(s["duration_ms"] for s in prof["sql"])
+        tpl_total = sum(t["duration_ms"] for t in prof["templates"])
+        samples = sum(prof["stacks"].values())
+        return {
+            "id": uuid.uuid4().hex[:12],
+            "ts": datetime.utcnow(),
+            "method": request.method,
+            "path": request.full_path.rstrip("?"),
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            "user_id": getattr(current_user, "id", None),
+            "forced": prof["forced"],
+            "duration_ms": round(duration_ms, 2),
+            "sql": prof["sql"],
+            "sql_count": len(prof["sql"]),
+            "sql_ms": round(sql_total, 2),
+            "templates": prof["templates"],
+            "template_ms": round(tpl_total, 2),
+            "samples": samples,
+            "stacks": prof["stacks"].most_common(30),
+        }
+
+    # ---- SQL ----
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and g.get("_prof") is not None:
+            conn.info.setdefault("_prof_t0", []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not has_request_context():
+            return
+        prof = g.get("_prof")
+        stack = conn.info.get("_prof_t0")
+        if prof is None or not stack:
+            return
+        start = stack.pop()
+        if len(prof["sql"]) < MAX_SQL_ENTRIES:
+            prof["sql"].append({
+                "offset_ms": round((start - prof["t0"]) * 1000, 2),
+                "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                "statement": statement[:1000],
+            })
+
+    # ---- templates ----
+    @staticmethod
+    def _before_render(sender, template, context, **extra):
+        prof = g.get("_prof")
+        if prof is not None:
+            prof["tpl_stack"].append(time.perf_counter())
+
+    @staticmethod
+    def _rendered(sender, template, context, **extra):
+        prof = g.get("_prof")
+        if prof is not None and prof["tpl_stack"]:
+            start = prof["tpl_stack"].pop()
+            prof["templates"].append({
+                "name": template.name,
+                "offset_ms": round((start - prof["t0"]) * 1000, 2),
+                "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            })
+
+
+def init_profiling(app):
+    profiler = Profiler(app)
+    app.extensions["profiler"] = profiler
+    if not (profiler.capture_all or profiler.allow_header):
+        return profiler
+
+    app.before_request(profiler.before_request)
+    app.after_request(profiler.after_request)
+    app.teardown_request(profiler.teardown_request)
+    if not event.contains(Engine, "before_cursor_execute", Profiler._before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", Profiler._before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", Profiler._after_cursor_execute)
+    before_render_template.connect(Profiler._before_render, app)
+    template_rendered.connect(Profiler._rendered, app)
+    return profiler
+
+
+def get_profiler():
+    return current_app.extensions.get("profiler")
@@ -0,0 +1,126 @@
+# app/utils/querytrace.py
+"""
+מעקב SQL לכל בקשה (פיתוח/בדיקות): זיהוי N+1 ותקציב שאילתות.
+
+כל פקודה שנשלחת בזמן טיפול בבקשה נרשמת, מנורמלת ל"צורה" (בלי ליטרלים,
+רשימות IN מכווצות) ומקובצת. צורה שחוזרת QUERY_TRACE_REPEAT_THRESHOLD
+פעמים ומעלה היא כמעט תמיד lazy-load בלולאה.
+
+- פיתוח: אזהרה בלוג + כותרות X-Query-Count / X-Query-Repeats, ובאנר קטן
+  בתחתית דפי HTML כשיש חזרות.
+- בדיקות (TESTING): view שמסומן ב-@query_budget(n) וחורג – זורק
+  QueryBudgetExceeded, כך שהבדיקה נכשלת.
+
+QUERY_TRACE=1/0 מפעיל/מכבה במפורש; בלי ערך המעקב פעיל כש-app.debug או
+app.testing – גם כשהם נקבעים אחרי create_app (app.run(debug=True), בדיקות).
+פקודות טרנזקציה (BEGIN / COMMIT / SAVEPOINT...) לא נספרות, כדי שאותו
+תקציב יתאים גם ל-SQLite (BEGIN IMMEDIATE) וגם ל-Postgres.
+
+@query_budget חייב לשבת מתחת ל-@bp.route (כלומר לעטוף את ה-view
+שנרשם), מעל דקורטורי ההרשאות.
+"""
+import re
+from collections import Counter
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from markupsafe import escape
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+_WS = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)")
+_TRANSACTION = re.compile(r"^\s*(?:BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE|END)\b", re.IGNORECASE)
+
+
+def normalize_sql(statement: str) -> str:
+    s = _WS.sub(" ", statement).strip()
+    s = _STRING.sub("?", s)
+    s = _NUMBER.sub("?", s)
+    s = _PARAM_LIST.sub("(?...)", s)
+    return s
+
+
+def query_budget(n: int):
+    """מצהיר כמה פקודות SQL מותר ל-view להריץ בבקשה אחת."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            return fn(*args, **kwargs)
+        wrapper._query_budget = n
+        return wrapper
+    return deco
+
+
+def _record(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        log = g.get("_query_trace")
+        if log is not None and not _TRANSACTION.match(statement):
+            log.append(statement)
+
+
+def _enabled(app) -> bool:
+    configured = app.config.get("QUERY_TRACE")
+    if configured is None:
+        return app.debug or app.testing
+    return configured
+
+
+def _before_request():
+    if not _enabled(current_app):
+        return
+    if not event.contains(Engine, "before_cursor_execute", _record):
+        event.listen(Engine, "before_cursor_execute", _record)
+    g._query_trace = []
+
+
+def _after_request(response):
+    statements = g.pop("_query_trace", None)
+    if statements is None:
+        return response
+
+    cfg = current_app.config
+    threshold = cfg.get("QUERY_TRACE_REPEAT_THRESHOLD", 3)
+    shapes = Counter(normalize_sql(s) for s in statements)
+    repeats = [(shape, n) for shape, n in shapes.most_common() if n >= threshold]
+
+    response.headers["X-Query-Count"] = str(len(statements))
+    response.headers["X-Query-Repeats"] = str(len(repeats))
+    for shape, n in repeats:
+        current_app.logger.warning("N+1 suspect on %s: %d x %s", request.endpoint, n, shape[:300])
+
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, "_query_budget", None)
+    if budget is not None and len(statements) > budget:
+        msg = f"{request.endpoint} issued {len(statements)} SQL statements (budget {budget})"
+        if cfg.get("TESTING"):
+            raise QueryBudgetExceeded(msg + "\n" + "\n".join(f"{n} x {s}" for s, n in shapes.most_common()))
+        current_app.logger.warning(msg)
+
+    if repeats and response.mimetype == "text/html" and not response.direct_passthrough:
+        banner = (
+            '<div style="position:fixed;bottom:0;left:0;right:0;z-index:9999;background:#fff3cd;'
+            'border-top:1px solid #e0c068;padding:.4rem .8rem;font:12px monospace;direction:ltr;text-align:left">'
+            f"SQL: {len(statements)} statements, {len(repeats)} repeated shape(s): "
+            + "; ".join(f"{n}&times; {escape(s[:120])}" for s, n in repeats[:3])
+            + "</div>"
+        )
+        body = response.get_data(as_text=True)
+        if "</body>" in body:
+            response.set_data(body.replace("</body>", banner + "</body>", 1))
+    return response
+
+
+def init_query_trace(app) -> None:
+    if app.config.get("QUERY_TRACE") is False:
+        return
+    # המאזין על Engine נרשם רק בבקשה הראשונה שבה המעקב פעיל
+    app.before_request(_before_request)
+    app.after_request(_after_request)
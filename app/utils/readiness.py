@@ -0,0 +1,145 @@
+# app/utils/readiness.py
+"""
+מצב מוכנות (readiness) של האפליקציה.
+
+create_app לא מתחבר למסד ולא ממתין לו. בכל תהליך (worker) רץ thread רקע
+שבודק את המסד פעם ב-READINESS_INTERVAL שניות – שאילתה אחת שגם קוראת את
+גרסת alembic ומשווה ל-head של תיקיית migrations.
+
+/readyz ו-/api/ping רק קוראים את התוצאה השמורה, כך שסופת probes לא עולה
+אף round-trip למסד. מסד שנפל מזוהה תוך READINESS_INTERVAL (+ connect
+timeout); תוצאה ישנה מ-READINESS_MAX_STALENESS נחשבת לא מוכנה, למקרה
+שה-thread עצמו נתקע.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import text
+
+from app.extensions import db
+
+STARTING = "starting"
+READY = "ready"
+DB_UNAVAILABLE = "db_unavailable"
+SCHEMA_OUTDATED = "schema_outdated"
+STALE = "stale"
+
+
+def _migration_heads(app):
+    """ה-heads של תיקיית migrations (קריאת קבצים, פעם אחת בעלייה)."""
+    try:
+        from alembic.config import Config
+        from alembic.script import ScriptDirectory
+
+        directory = app.extensions["migrate"].directory
+        cfg = Config()
+        cfg.set_main_option("script_location", directory)
+        return tuple(sorted(ScriptDirectory.from_config(cfg).get_heads()))
+    except Exception:
+        app.logger.warning("readiness: could not read migration heads", exc_info=True)
+        return None
+
+
+class Readiness:
+    def __init__(self, interval: float = 5.0, max_staleness: float = 15.0, heads=None):
+        self.interval = interval
+        self.max_staleness = max_staleness
+        self.heads = heads
+        self.state = STARTING
+        self.error = None
+        self.revision = None
+        self.checked_at = None
+        self._lock = threading.Lock()
+        self._thread_pid = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._effective_state() == READY
+
+    def _effective_state(self) -> str:
+        with self._lock:
+            state, checked_at = self.state, self.checked_at
+        if checked_at is not None and time.time() - checked_at > self.max_staleness:
+            return STALE
+        return state
+
+    def check(self) -> bool:
+        """round-trip אחד למסד. חייב app context; נקרא מה-thread."""
+        revision = None
+        try:
+            # בדיקה לקריאה בלבד – ב-SQLite לא לוקחים נעילת כתיבה
+            with db.engine.connect().execution_options(sqlite_begin="deferred") as conn:
+                try:
+                    revision = tuple(sorted(
+                        conn.execute(text("SELECT version_num FROM alembic_version")).scalars()
+                    ))
+                except Exception:
+                    # אין טבלת alembic_version (סכמה מ-init-db) – רק זמינות
+                    conn.rollback()
+                    conn.execute(text("SELECT 1"))
+            if revision and self.heads and revision != self.heads:
+                state, error = SCHEMA_OUTDATED, None
+            else:
+                state, error = READY, None
+        except Exception as exc:
+            state, error = DB_UNAVAILABLE, type(exc).__name__
+        with self._lock:
+            self.state, self.error, self.checked_at = state, error, time.time()
+            self.revision = revision
+        return state == READY
+
+    def ensure_checker(self, app) -> None:
+        """מפעיל את thread הבדיקה בתהליך הנוכחי (פעם אחת, ומחדש אחרי fork)."""
+        pid = os.getpid()
+        if self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread_pid == pid:
+                return
+            self._thread_pid = pid
+        threading.Thread(target=self._run, args=(app,), name="readiness", daemon=True).start()
+
+    def _run(self, app):
+        while True:
+            try:
+                with app.app_context():
+                    self.check()
+            except Exception:
+                app.logger.exception("readiness check crashed")
+            time.sleep(self.interval)
+
+    def as_dict(self) -> dict:
+        state = self._effective_state()
+        with self._lock:
+            return {
+                "state": state,
+                "error": self.error,
+                "checked_at": self.checked_at,
+                "age_seconds": round(time.time() - self.checked_at, 2) if self.checked_at else None,
+                "schema": {
+                    "revision": list(self.revision) if self.revision else None,
+                    "head": list(self.heads) if self.heads else None,
+                },
+            }
+
+
+def init_readiness(app) -> Readiness:
+    interval = float(app.config.get("READINESS_INTERVAL", 5))
+    readiness = Readiness(
+        interval=interval,
+        max_staleness=float(app.config.get("READINESS_MAX_STALENESS", interval * 3)),
+        heads=_migration_heads(app),
+    )
+    app.extensions["readiness"] = readiness
+    return readiness
+
+
+def dispose_engines(app) -> None:
+    """
+    סוגר את מאגרי החיבורים שירשנו מתהליך האב (gunicorn --preload).
+    close=False: לא סוגרים את ה-sockets של האב, רק מפסיקים להשתמש בהם.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
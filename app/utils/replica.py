@@ -0,0 +1,132 @@
+# app/utils/replica.py
+"""
+ניתוב קריאות ל-read replica (אופציונלי).
+
+- REPLICA_DATABASE_URL מגדיר bind נוסף בשם "replica" (SQLALCHEMY_BINDS).
+  בלעדיו הכול ממשיך ל-primary וה-decorator לא עושה כלום.
+- view שמסומן ב-@use_replica מריץ את ה-SELECT-ים שלו על ה-replica.
+  כתיבות (flush) ו-text() תמיד הולכים ל-primary, ואחרי flush ראשון בבקשה
+  גם הקריאות חוזרות ל-primary.
+- read-your-writes: אחרי בקשה כותבת מוצלחת (POST וכו') ה-session של
+  המשתמש "נדבק" ל-primary למשך REPLICA_STICKY_SECONDS.
+- lag: פעם ב-REPLICA_LAG_CHECK_SECONDS (לכל תהליך) נמדד ה-lag של ה-replica;
+  מעל REPLICA_MAX_LAG_SECONDS, או כשהוא לא זמין – חוזרים ל-primary.
+
+כמו @query_budget, ה-decorator יושב מתחת ל-@bp.route.
+"""
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+
+REPLICA_BIND = "replica"
+STICKY_KEY = "_primary_until"
+
+_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaMonitor:
+    """מצב ה-replica בתהליך הנוכחי, עם בדיקת lag מוגבלת בקצב."""
+
+    def __init__(self, max_lag: float, check_every: float):
+        self.max_lag = max_lag
+        self.check_every = check_every
+        self.lag = None
+        self.error = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def healthy(self) -> bool:
+        return self.error is None and self.lag is not None and self.lag <= self.max_lag
+
+    def maybe_check(self, engine) -> bool:
+        if time.monotonic() - self.checked_at >= self.check_every and self._lock.acquire(blocking=False):
+            # thread אחד בודק; השאר משתמשים בתוצאה הקודמת
+            try:
+                self._check(engine)
+            finally:
+                self._lock.release()
+        return self.healthy
+
+    def _check(self, engine):
+        try:
+            if engine.dialect.name == "postgresql":
+                with engine.connect() as conn:
+                    lag = float(conn.execute(_LAG_SQL).scalar() or 0)
+            else:
+                lag = 0.0
+            self.lag, self.error = lag, None
+        except Exception as exc:
+            self.lag, self.error = None, type(exc).__name__
+        self.checked_at = time.monotonic()
+        if self.error:
+            current_app.logger.warning("replica unavailable (%s), reading from primary", self.error)
+        elif self.lag > self.max_lag:
+            current_app.logger.warning("replica lag %.1fs > %.1fs, reading from primary", self.lag, self.max_lag)
+
+    def as_dict(self) -> dict:
+        return {"healthy": self.healthy, "lag_seconds": self.lag, "error": self.error}
+
+
+def _replica_engine():
+    """ה-engine של ה-replica אם הבקשה הנוכחית מנותבת אליו, אחרת None."""
+    if not has_request_context() or g.get("_db_route") != REPLICA_BIND or g.get("_db_wrote"):
+        return None
+    ext = current_app.extensions["sqlalchemy"]
+    return ext.engines.get(REPLICA_BIND)
+
+
+class RoutingSession(Session):
+    """Session של Flask-SQLAlchemy שמפנה SELECT-ים ל-replica בתוך @use_replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and getattr(clause, "is_select", False):
+            engine = _replica_engine()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_wrote(session, flush_context):
+    if has_request_context():
+        g._db_wrote = True
+
+
+def use_replica(fn):
+    """מסמן view לקריאה בלבד: ה-SELECT-ים שלו ירוצו על ה-replica כשאפשר."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        monitor = current_app.extensions.get("replica")
+        if monitor is not None and session.get(STICKY_KEY, 0) < time.time():
+            engine = current_app.extensions["sqlalchemy"].engines[REPLICA_BIND]
+            if monitor.maybe_check(engine):
+                g._db_route = REPLICA_BIND
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def init_replica(app):
+    if REPLICA_BIND not in (app.config.get("SQLALCHEMY_BINDS") or {}):
+        return None
+    monitor = ReplicaMonitor(
+        max_lag=float(app.config.get("REPLICA_MAX_LAG_SECONDS", 5)),
+        check_every=float(app.config.get("REPLICA_LAG_CHECK_SECONDS", 5)),
+    )
+    app.extensions["replica"] = monitor
+    sticky = float(app.config.get("REPLICA_STICKY_SECONDS", 5))
+
+    @app.after_request
+    def _replica_sticky(response):
+        if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+            session[STICKY_KEY] = time.time() + sticky
+        return response
+
+    return monitor
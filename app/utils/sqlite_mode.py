@@ -0,0 +1,109 @@
+# app/utils/sqlite_mode.py
+"""
+מצב SQLite לשרת יחיד (ברירת המחדל כשאין DATABASE_URL).
+
+- בכל חיבור חדש: journal_mode=WAL (קוראים לא חוסמים כותב), synchronous=NORMAL,
+  busy_timeout, mmap_size, cache_size, temp_store=MEMORY.
+- טרנזקציות כתיבה נפתחות ב-BEGIN IMMEDIATE: נעילת הכתיבה נלקחת בהתחלה
+  (ומחכה ב-busy_timeout) במקום להיכשל ב-"database is locked" כשטרנזקציה
+  שכבר קראה מנסה לכתוב. כתיבה = בקשת POST/PUT/PATCH/DELETE, או עבודה מחוץ
+  לבקשה (CLI/סקריפטים) אלא אם החיבור סומן sqlite_begin="deferred".
+  אחרי commit ראשון בבקשה הטרנזקציות הבאות שלה רגילות – כדי שקריאה של
+  אובייקט שפג תוקפו (ואז, למשל, שליחת מייל) לא תחזיק את נעילת הכתיבה.
+- בתוך תהליך, הכותבים עומדים בתור אחד (lock לכל תהליך) לפני BEGIN IMMEDIATE,
+  כך ש-threads של אותו worker לא מתחרים על ה-busy handler של SQLite.
+
+SQLITE_TUNED=0 מחזיר להתנהגות של pysqlite כמו שהיא.
+"""
+import os
+import threading
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+_GATE_KEY = "_sqlite_write_gate"
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+
+class _WriteGate:
+    """lock אחד לכל תהליך (נוצר מחדש אחרי fork)."""
+
+    def __init__(self):
+        self._pid = None
+        self._lock = None
+
+    def lock(self) -> threading.Lock:
+        if self._pid != os.getpid():
+            self._pid, self._lock = os.getpid(), threading.Lock()
+        return self._lock
+
+
+_gate = _WriteGate()
+
+
+def _is_write(conn) -> bool:
+    if has_request_context():
+        return request.method in WRITE_METHODS and not g.get("_sqlite_committed")
+    return conn.get_execution_options().get("sqlite_begin") != "deferred"
+
+
+def _release(info) -> None:
+    lock = info.pop(_GATE_KEY, None)
+    if lock is not None:
+        lock.release()
+
+
+def configure_sqlite(engine) -> None:
+    if os.getenv("SQLITE_TUNED", "1") != "1":
+        return
+    busy_ms = _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+    pragmas = [
+        f"PRAGMA busy_timeout = {busy_ms}",
+        "PRAGMA synchronous = NORMAL",
+        f"PRAGMA mmap_size = {_env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)}",
+        f"PRAGMA cache_size = -{_env_int('SQLITE_CACHE_SIZE_KB', 64 * 1024)}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+    in_memory = engine.url.database in (None, "", ":memory:")
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, record):
+        # SQLAlchemy שולט ב-BEGIN (ראה _begin למטה), לא pysqlite
+        dbapi_conn.isolation_level = None
+        cur = dbapi_conn.cursor()
+        try:
+            if not in_memory:
+                cur.execute("PRAGMA journal_mode = WAL")
+            for pragma in pragmas:
+                cur.execute(pragma)
+        finally:
+            cur.close()
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        if _is_write(conn):
+            lock = _gate.lock()
+            if lock.acquire(timeout=busy_ms / 1000.0):
+                conn.info[_GATE_KEY] = lock
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        else:
+            conn.exec_driver_sql("BEGIN")
+
+    @event.listens_for(engine, "commit")
+    def _after_commit(conn):
+        _release(conn.info)
+        if has_request_context():
+            g._sqlite_committed = True
+
+    @event.listens_for(engine, "rollback")
+    def _after_rollback(conn):
+        _release(conn.info)
+
+    # רשת ביטחון: חיבור שחוזר ל-pool בלי commit/rollback מפורש
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_conn, record):
+        _release(record.info)
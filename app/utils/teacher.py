@@ -1,22 +1,58 @@
+# app/utils/teacher.py
+from dataclasses import dataclass
+
+from sqlalchemy import select
+
+from app.extensions import db
 from app.models import User
+from app.utils.cache import TEACHERS_TAG, get_cache
 
 
-def get_default_teacher():
-    # Try a few conventional names, otherwise just the first teacher
-    t = User.query.filter(
-        User.role == "teacher",
-        User.username.in_(["Limor", "limor"]),
-    ).first()
-    if t:
-        return t
-    return User.query.filter_by(role="teacher").first()
+@dataclass(frozen=True)
+class DefaultTeacher:
+    """מה שהקוראים צריכים מהמורה ברירת המחדל – עותק קפוא שנשמר במטמון."""
+    id: int
+    email: str | None
 
-# app/utils/teacher.py
-from app.models import User
 
-def get_default_teacher():
-    """המורה ה'ראשון' במערכת – הוותיק ביותר (לפי created_at, אח"כ id)."""
+def _default_teacher_query():
     return (User.query
             .filter_by(role="teacher")
-            .order_by(User.created_at.asc(), User.id.asc())
-            .first())
+            .order_by(User.created_at.asc(), User.id.asc()))
+
+
+def _is_current(t: DefaultTeacher | None) -> bool:
+    """בדיקה לפי מפתח ראשי שהערך מהמטמון עדיין נכון – עדיין מורה, אותו אימייל."""
+    if t is None:
+        return False
+    row = db.session.execute(
+        select(User.email).where(User.id == t.id, User.role == "teacher")
+    ).first()
+    return row is not None and row.email == t.email
+
+
+def get_default_teacher():
+    """
+    המורה ה'ראשון' במערכת – הוותיק ביותר (לפי created_at, אח"כ id), כ-DefaultTeacher.
+    ממטמון; מתבטל כשנוסף/נמחק מורה או כשמשתנה התפקיד/האימייל שלו. ב-backend
+    מקומי worker אחר לא שומע על הביטול, ולכן ערך מהמטמון נבדק בשליפה לפי
+    מפתח ראשי – מורה שנמחק או שהאימייל שלו השתנה נטען מחדש.
+    """
+    loaded = []
+
+    def load():
+        loaded.append(True)
+        t = _default_teacher_query().with_entities(User.id, User.email).first()
+        return DefaultTeacher(t.id, t.email) if t else None
+    cache = get_cache()
+    t = cache.get_or_set("default_teacher:info", load, tags=[TEACHERS_TAG])
+    if loaded or _is_current(t):
+        return t
+    cache.invalidate_tags(TEACHERS_TAG)
+    return cache.get_or_set("default_teacher:info", load, tags=[TEACHERS_TAG])
+
+
+def get_default_teacher_id():
+    """id של המורה ה'ראשון' (ממטמון)."""
+    t = get_default_teacher()
+    return t.id if t else None
@@ -0,0 +1,38 @@
+# app/utils/template_cache.py
+"""
+מטמון bytecode של Jinja על הדיסק, משותף לכל ה-workers.
+
+worker חדש לא מקמפל טמפלטים מהמקור: הוא טוען את ה-bytecode שכבר נכתב
+(ב-build של האימג' דרך `flask templates compile`, או ע"י worker קודם).
+Jinja בודק checksum של המקור, כך שטמפלט שהשתנה מקומפל מחדש אוטומטית.
+"""
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+
+def init_template_cache(app):
+    directory = app.config.get("JINJA_CACHE_DIR")
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    cache = FileSystemBytecodeCache(directory, pattern="__jinja_%s.cache")
+    app.jinja_env.bytecode_cache = cache
+    return cache
+
+
+def compile_all(app) -> tuple[int, list]:
+    """
+    טוען כל טמפלט שה-loader של האפליקציה מכיר – כולל blueprint-ים עם
+    template_folder משלהם (למשל student) – כך שה-bytecode נכתב למטמון.
+    """
+    compiled, failed = 0, []
+    for name in sorted(set(app.jinja_env.list_templates())):
+        if not name.endswith((".html", ".txt", ".xml")):
+            continue
+        try:
+            app.jinja_env.get_template(name)
+            compiled += 1
+        except Exception as exc:
+            failed.append((name, f"{type(exc).__name__}: {exc}"))
+    return compiled, failed
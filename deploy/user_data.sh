@@ -122,7 +122,7 @@ services:
     expose:
       - "8000"
     healthcheck:
-      test: ["CMD-SHELL","python -c 'import urllib.request,sys; urllib.request.urlopen(\"http://localhost:8000/api/ping\", timeout=3); sys.exit(0)' || exit 1"]
+      test: ["CMD-SHELL","python -c 'import urllib.request,sys; urllib.request.urlopen(\"http://localhost:8000/readyz\", timeout=3); sys.exit(0)' || exit 1"]
       interval: 5s
       timeout: 3s
       retries: 60
@@ -139,7 +139,7 @@ services:
       backend:
         condition: service_healthy
     healthcheck:
-      test: ["CMD-SHELL","wget -qO- http://backend:8000/api/ping | grep -q 'status'"]
+      test: ["CMD-SHELL","wget -qO- http://backend:8000/healthz | grep -q 'OK'"]
       interval: 5s
       timeout: 3s
       retries: 30
@@ -244,4 +244,15 @@ EOF
 systemctl daemon-reload
 systemctl enable myapp-compose.service
 
+# -------------------------
+# משימות מחזוריות (כל אחת רצה תחת lease – הרצה חופפת פשוט מדלגת)
+# -------------------------
+cat > /etc/cron.d/myapp-jobs <<'EOF'
+*/5 * * * * root cd /opt/myapp && docker compose exec -T backend flask lessons sweep-overdue >> /var/log/myapp-jobs.log 2>&1
+* * * * * root cd /opt/myapp && docker compose exec -T backend flask notifications send >> /var/log/myapp-jobs.log 2>&1
+30 3 * * * root cd /opt/myapp && docker compose exec -T backend flask audit archive >> /var/log/myapp-jobs.log 2>&1
+45 3 * * * root cd /opt/myapp && docker compose exec -T backend flask idempotency purge >> /var/log/myapp-jobs.log 2>&1
+EOF
+chmod 0644 /etc/cron.d/myapp-jobs
+
 echo "[user-data] finished OK at $(date -Iseconds)"
@@ -0,0 +1,44 @@
+# gunicorn.conf.py
+# האפליקציה נטענת פעם אחת בתהליך האב (preload) וה-workers יורשים אותה ב-fork,
+# כך ש-restart מתגלגל לא משלם import + create_app בכל worker.
+import os
+import shutil
+
+bind = f"0.0.0.0:{os.getenv('APP_PORT', '8000')}"
+workers = int(os.getenv("GUNICORN_WORKERS", "3"))
+threads = int(os.getenv("GUNICORN_THREADS", "2"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+# Prometheus: כל worker כותב לתיקייה משותפת; ה-master מגיש /metrics מפורט נפרד.
+# חייב להיות מוגדר לפני ש-prometheus_client נטען (כלומר לפני import של app).
+metrics_enabled = os.getenv("METRICS_ENABLED", "1") == "1"
+metrics_port = int(os.getenv("METRICS_PORT", "9200"))
+if metrics_enabled:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+    # כאן ולא ב-on_starting: עם preload האפליקציה (והמדדים שלה) נטענת לפני
+    # ה-hook, והתיקייה חייבת להתקיים כבר אז. קבצים של הרצה קודמת היו מזהמים
+    # את המונים.
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def when_ready(server):
+    if metrics_enabled:
+        from prometheus_flask_exporter.multiprocess import GunicornPrometheusMetrics
+        GunicornPrometheusMetrics.start_http_server_when_ready(metrics_port)
+
+
+def child_exit(server, worker):
+    if metrics_enabled:
+        from prometheus_flask_exporter.multiprocess import GunicornPrometheusMetrics
+        GunicornPrometheusMetrics.mark_process_dead_on_child_exit(worker.pid)
+
+
+def post_fork(server, worker):
+    # חיבורי מסד שנפתחו באב (אם בכלל) לא משותפים בין תהליכים
+    from app.utils.readiness import dispose_engines
+    app = getattr(worker.app, "callable", None)
+    if app is not None:
+        dispose_engines(app)
+        # בדיקת המסד מתחילה מיד, לא רק ב-probe הראשון
+        app.extensions["readiness"].ensure_checker(app)
@@ -5,6 +5,9 @@ from flask import current_app
 
 from alembic import context
 
+from app.utils.batched_migration import CHECKPOINT_TABLE
+from app.utils.db_pool import without_timeouts
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -90,13 +93,21 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # טבלת ה-checkpoint של batched_update נוצרת בזמן ריצה, מחוץ ל-db.metadata;
+    # בלי זה autogenerate / `flask db check` היו מציעים למחוק אותה
+    def include_object(object, name, type_, reflected, compare_to):
+        return not (type_ == "table" and name == CHECKPOINT_TABLE)
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
-    with connectable.connect() as connection:
+    # בלי ה-statement timeout של הבקשות: backfills ובניית אינדקסים ארוכים
+    with connectable.connect() as connection, without_timeouts(connection):
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
@@ -8,6 +8,8 @@ Create Date: 2025-09-25 07:27:52.474800
 from alembic import op
 import sqlalchemy as sa
 
+from app.utils.batched_migration import batched_update
+
 
 # revision identifiers, used by Alembic.
 revision = '02c515f814a9'
@@ -17,14 +19,32 @@ depends_on = None
 
 
 def upgrade():
-    # ### commands auto generated by Alembic - please adjust! ###
+    bind = op.get_bind()
+    cols = {c["name"] for c in sa.inspect(bind).get_columns("lesson")}
+
     with op.batch_alter_table('lesson', schema=None) as batch_op:
-        batch_op.add_column(sa.Column('hourly_rate_cents', sa.Integer(), server_default='11000', nullable=False))
-        batch_op.add_column(sa.Column('hourly_rate_at_time_cents', sa.Integer(), server_default='11000', nullable=False))
-        batch_op.drop_column('hourly_rate_at_time')
-        batch_op.drop_column('hourly_rate')
+        if 'hourly_rate_cents' not in cols:
+            batch_op.add_column(sa.Column('hourly_rate_cents', sa.Integer(), server_default='11000', nullable=False))
+        if 'hourly_rate_at_time_cents' not in cols:
+            batch_op.add_column(sa.Column('hourly_rate_at_time_cents', sa.Integer(), server_default='11000', nullable=False))
+
+    # backfill מהעמודות הישנות (שקלים, float) – במנות, לפני שמוחקים אותן
+    if 'hourly_rate' in cols:
+        at_time = "hourly_rate_at_time" if "hourly_rate_at_time" in cols else "hourly_rate"
+        with op.get_context().autocommit_block():
+            batched_update(
+                bind, "lesson_rate_cents", "lesson",
+                set_sql=(
+                    "hourly_rate_cents = CAST(ROUND(COALESCE(hourly_rate, 110) * 100) AS INTEGER), "
+                    f"hourly_rate_at_time_cents = CAST(ROUND(COALESCE({at_time}, hourly_rate, 110) * 100) AS INTEGER)"
+                ),
+            )
 
-    # ### end Alembic commands ###
+    with op.batch_alter_table('lesson', schema=None) as batch_op:
+        if 'hourly_rate_at_time' in cols:
+            batch_op.drop_column('hourly_rate_at_time')
+        if 'hourly_rate' in cols:
+            batch_op.drop_column('hourly_rate')
 
 
 def downgrade():
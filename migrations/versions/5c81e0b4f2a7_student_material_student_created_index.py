@@ -0,0 +1,37 @@
+"""
+add (student_id, created_at) index to student_material
+
+Revision ID: 5c81e0b4f2a7
+Revises: 3b47d6a1c92b
+Create Date: 2025-10-01 09:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "5c81e0b4f2a7"
+down_revision = "3b47d6a1c92b"
+branch_labels = None
+depends_on = None
+
+IDX_NAME = "ix_student_material_student_created"
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    # צור אינדקס רק אם לא קיים
+    existing_idx = [i["name"] for i in insp.get_indexes("student_material")]
+    if IDX_NAME not in existing_idx:
+        op.create_index(IDX_NAME, "student_material", ["student_id", "created_at"], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    existing_idx = [i["name"] for i in insp.get_indexes("student_material")]
+    if IDX_NAME in existing_idx:
+        op.drop_index(IDX_NAME, table_name="student_material")
@@ -0,0 +1,48 @@
+"""
+teacher dashboard read model: user.students_version + lesson (teacher_id, end_at) index
+
+Revision ID: 8d2f64a1c3e9
+Revises: 5c81e0b4f2a7
+Create Date: 2025-10-02 09:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "8d2f64a1c3e9"
+down_revision = "5c81e0b4f2a7"
+branch_labels = None
+depends_on = None
+
+IDX_NAME = "ix_lesson_teacher_end"
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    cols = [c["name"] for c in insp.get_columns("user")]
+    if "students_version" not in cols:
+        op.add_column(
+            "user",
+            sa.Column("students_version", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+    existing_idx = [i["name"] for i in insp.get_indexes("lesson")]
+    if IDX_NAME not in existing_idx:
+        op.create_index(IDX_NAME, "lesson", ["teacher_id", "end_at"], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    existing_idx = [i["name"] for i in insp.get_indexes("lesson")]
+    if IDX_NAME in existing_idx:
+        op.drop_index(IDX_NAME, table_name="lesson")
+
+    cols = [c["name"] for c in insp.get_columns("user")]
+    if "students_version" in cols:
+        with op.batch_alter_table("user", schema=None) as batch_op:
+            batch_op.drop_column("students_version")
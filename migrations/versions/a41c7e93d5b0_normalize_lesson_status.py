@@ -0,0 +1,109 @@
+"""
+normalize lesson.status / lesson.paid_status and add access-path indexes
+
+Revision ID: a41c7e93d5b0
+Revises: 8d2f64a1c3e9
+Create Date: 2025-10-03 09:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a41c7e93d5b0"
+down_revision = "8d2f64a1c3e9"
+branch_labels = None
+depends_on = None
+
+LESSON_STATUSES = ("scheduled", "done", "cancelled")
+PAID_STATUSES = ("unpaid", "partial", "paid")
+SCHEDULED_ONLY = "status = 'scheduled'"
+
+
+def _in_list(values):
+    return ", ".join(f"'{v}'" for v in values)
+
+
+# (name, columns, partial)
+NEW_INDEXES = [
+    ("ix_lesson_teacher_status_start", ["teacher_id", "status", "start_at"], False),
+    ("ix_lesson_teacher_start_scheduled", ["teacher_id", "start_at"], True),
+    ("ix_lesson_student_start_scheduled", ["student_id", "start_at"], True),
+    ("ix_lesson_teacher_end", ["teacher_id", "end_at"], True),
+]
+
+
+def _is_partial(bind, index) -> bool:
+    if index.get("dialect_options", {}).get(f"{bind.dialect.name}_where") is not None:
+        return True
+    if bind.dialect.name == "sqlite":
+        sql = bind.execute(
+            sa.text("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = :name"),
+            {"name": index["name"]},
+        ).scalar()
+        return bool(sql) and " WHERE " in sql.upper()
+    return False
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    # backfill: אותיות קטנות, בלי רווחים, NULL/ערך לא מוכר -> ברירת מחדל
+    op.execute("UPDATE lesson SET status = lower(trim(status)) WHERE status IS NOT NULL")
+    op.execute(
+        f"UPDATE lesson SET status = 'scheduled' "
+        f"WHERE status IS NULL OR status NOT IN ({_in_list(LESSON_STATUSES)})"
+    )
+    op.execute("UPDATE lesson SET paid_status = lower(trim(paid_status)) WHERE paid_status IS NOT NULL")
+    op.execute(
+        f"UPDATE lesson SET paid_status = 'unpaid' "
+        f"WHERE paid_status IS NULL OR paid_status NOT IN ({_in_list(PAID_STATUSES)})"
+    )
+
+    # הסכימה יכולה להגיע גם מ-create_all (flask init-db) – יוצרים רק מה שחסר
+    insp = sa.inspect(bind)
+    existing_ck = {c["name"] for c in insp.get_check_constraints("lesson")}
+    with op.batch_alter_table("lesson", schema=None) as batch_op:
+        batch_op.alter_column("status", existing_type=sa.String(length=20),
+                              nullable=False, server_default="scheduled")
+        batch_op.alter_column("paid_status", existing_type=sa.String(length=20),
+                              nullable=False, server_default="unpaid")
+        if "ck_lesson_status" not in existing_ck:
+            batch_op.create_check_constraint("ck_lesson_status", f"status IN ({_in_list(LESSON_STATUSES)})")
+        if "ck_lesson_paid_status" not in existing_ck:
+            batch_op.create_check_constraint("ck_lesson_paid_status", f"paid_status IN ({_in_list(PAID_STATUSES)})")
+
+    # ix_lesson_teacher_end הופך לאינדקס חלקי (רק שיעורים פעילים);
+    # אם הוא כבר חלקי (create_all) משאירים אותו
+    insp = sa.inspect(bind)
+    indexes = {i["name"]: i for i in insp.get_indexes("lesson")}
+    teacher_end = indexes.get("ix_lesson_teacher_end")
+    if teacher_end is not None and not _is_partial(bind, teacher_end):
+        op.drop_index("ix_lesson_teacher_end", table_name="lesson")
+        del indexes["ix_lesson_teacher_end"]
+
+    for name, cols, partial in NEW_INDEXES:
+        if name in indexes:
+            continue
+        kw = {}
+        if partial:
+            kw = {"postgresql_where": sa.text(SCHEDULED_ONLY), "sqlite_where": sa.text(SCHEDULED_ONLY)}
+        op.create_index(name, "lesson", cols, unique=False, **kw)
+
+
+def downgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    existing_idx = [i["name"] for i in insp.get_indexes("lesson")]
+    for name, _cols, _partial in NEW_INDEXES:
+        if name in existing_idx:
+            op.drop_index(name, table_name="lesson")
+    op.create_index("ix_lesson_teacher_end", "lesson", ["teacher_id", "end_at"], unique=False)
+
+    with op.batch_alter_table("lesson", schema=None) as batch_op:
+        batch_op.drop_constraint("ck_lesson_paid_status", type_="check")
+        batch_op.drop_constraint("ck_lesson_status", type_="check")
+        batch_op.alter_column("paid_status", existing_type=sa.String(length=20),
+                              nullable=False, server_default=None)
+        batch_op.alter_column("status", existing_type=sa.String(length=20),
+                              nullable=True, server_default=None)
@@ -0,0 +1,86 @@
+"""
+overdue sweeper: lesson.overdue_flagged_at, user.overdue_policy, job_lease, notification
+
+Revision ID: a9d3e7b15c20
+Revises: f3a8c1d27b64
+Create Date: 2025-10-09 09:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a9d3e7b15c20"
+down_revision = "f3a8c1d27b64"
+branch_labels = None
+depends_on = None
+
+SWEEP_IDX = "ix_lesson_overdue_sweep"
+OVERDUE_UNSWEPT = "status = 'scheduled' AND overdue_flagged_at IS NULL"
+NOTIFICATION_INDEXES = [
+    ("ix_notification_pending", ["id"], "sent_at IS NULL"),
+    ("ix_notification_user_created", ["user_id", "created_at"], None),
+]
+
+
+def _where(predicate):
+    if predicate is None:
+        return {}
+    return {"postgresql_where": sa.text(predicate), "sqlite_where": sa.text(predicate)}
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if "overdue_flagged_at" not in [c["name"] for c in insp.get_columns("lesson")]:
+        op.add_column("lesson", sa.Column("overdue_flagged_at", sa.DateTime(), nullable=True))
+    if "overdue_policy" not in [c["name"] for c in insp.get_columns("user")]:
+        op.add_column("user", sa.Column("overdue_policy", sa.String(length=20), nullable=True))
+
+    if SWEEP_IDX not in [i["name"] for i in insp.get_indexes("lesson")]:
+        op.create_index(SWEEP_IDX, "lesson", ["end_at"], unique=False, **_where(OVERDUE_UNSWEPT))
+
+    tables = set(insp.get_table_names())
+    if "job_lease" not in tables:
+        op.create_table(
+            "job_lease",
+            sa.Column("name", sa.String(length=100), primary_key=True),
+            sa.Column("owner", sa.String(length=100), nullable=False),
+            sa.Column("acquired_at", sa.DateTime(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+        )
+    if "notification" not in tables:
+        op.create_table(
+            "notification",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("user.id"), nullable=False),
+            sa.Column("kind", sa.String(length=50), nullable=False),
+            sa.Column("payload", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("sent_at", sa.DateTime()),
+            sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        )
+    insp = sa.inspect(bind)
+    existing_idx = [i["name"] for i in insp.get_indexes("notification")]
+    for name, cols, predicate in NOTIFICATION_INDEXES:
+        if name not in existing_idx:
+            op.create_index(name, "notification", cols, unique=False, **_where(predicate))
+
+
+def downgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    tables = set(insp.get_table_names())
+    for table in ("notification", "job_lease"):
+        if table in tables:
+            op.drop_table(table)
+
+    if SWEEP_IDX in [i["name"] for i in insp.get_indexes("lesson")]:
+        op.drop_index(SWEEP_IDX, table_name="lesson")
+    if "overdue_flagged_at" in [c["name"] for c in insp.get_columns("lesson")]:
+        with op.batch_alter_table("lesson", schema=None) as batch_op:
+            batch_op.drop_column("overdue_flagged_at")
+    if "overdue_policy" in [c["name"] for c in insp.get_columns("user")]:
+        with op.batch_alter_table("user", schema=None) as batch_op:
+            batch_op.drop_column("overdue_policy")
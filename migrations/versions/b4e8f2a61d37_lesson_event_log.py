@@ -0,0 +1,57 @@
+"""
+lesson audit log: lesson_event, lesson_event_archive
+
+Revision ID: b4e8f2a61d37
+Revises: a9d3e7b15c20
+Create Date: 2025-10-10 09:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b4e8f2a61d37"
+down_revision = "a9d3e7b15c20"
+branch_labels = None
+depends_on = None
+
+TABLES = {
+    "lesson_event": ["ix_lesson_event_lesson_ts", "ix_lesson_event_teacher_ts"],
+    "lesson_event_archive": ["ix_lesson_event_archive_lesson_ts", "ix_lesson_event_archive_teacher_ts"],
+}
+EVENT_ID = sa.BigInteger().with_variant(sa.Integer(), "sqlite")
+
+
+def _columns(autoincrement):
+    return [
+        sa.Column("id", EVENT_ID, primary_key=True, autoincrement=autoincrement),
+        sa.Column("lesson_id", sa.Integer(), nullable=False),
+        sa.Column("teacher_id", sa.Integer()),
+        sa.Column("student_id", sa.Integer()),
+        sa.Column("actor_id", sa.Integer()),
+        sa.Column("action", sa.String(length=20), nullable=False),
+        sa.Column("changes", sa.Text(), nullable=False, server_default="{}"),
+        sa.Column("ts", sa.DateTime(), nullable=False),
+    ]
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    tables = set(insp.get_table_names())
+    for table, (lesson_idx, teacher_idx) in TABLES.items():
+        if table not in tables:
+            op.create_table(table, *_columns(autoincrement=(table == "lesson_event")))
+        existing_idx = [i["name"] for i in sa.inspect(bind).get_indexes(table)]
+        if lesson_idx not in existing_idx:
+            op.create_index(lesson_idx, table, ["lesson_id", "ts"], unique=False)
+        if teacher_idx not in existing_idx:
+            op.create_index(teacher_idx, table, ["teacher_id", "ts"], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    tables = set(sa.inspect(bind).get_table_names())
+    for table in ("lesson_event_archive", "lesson_event"):
+        if table in tables:
+            op.drop_table(table)
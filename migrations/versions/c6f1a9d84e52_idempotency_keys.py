@@ -0,0 +1,48 @@
+"""
+idempotency keys for POST endpoints: idempotency_key
+
+Revision ID: c6f1a9d84e52
+Revises: b4e8f2a61d37
+Create Date: 2025-10-11 09:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c6f1a9d84e52"
+down_revision = "b4e8f2a61d37"
+branch_labels = None
+depends_on = None
+
+EXPIRES_IDX = "ix_idempotency_key_expires"
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if "idempotency_key" not in set(insp.get_table_names()):
+        op.create_table(
+            "idempotency_key",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("scope", sa.String(length=40), nullable=False),
+            sa.Column("endpoint", sa.String(length=100), nullable=False),
+            sa.Column("key", sa.String(length=64), nullable=False),
+            sa.Column("request_hash", sa.String(length=64), nullable=False),
+            sa.Column("token", sa.String(length=32), nullable=False),
+            sa.Column("status_code", sa.Integer()),
+            sa.Column("location", sa.String(length=500)),
+            sa.Column("content_type", sa.String(length=100)),
+            sa.Column("body", sa.Text()),
+            sa.Column("claimed_at", sa.DateTime(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.UniqueConstraint("scope", "endpoint", "key", name="uq_idempotency_key"),
+        )
+    if EXPIRES_IDX not in [i["name"] for i in sa.inspect(bind).get_indexes("idempotency_key")]:
+        op.create_index(EXPIRES_IDX, "idempotency_key", ["expires_at"], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if "idempotency_key" in set(sa.inspect(bind).get_table_names()):
+        op.drop_table("idempotency_key")
@@ -0,0 +1,70 @@
+"""
+add lesson_archive table (time-based archival of old lessons)
+
+Revision ID: c7e2a9d4f618
+Revises: a41c7e93d5b0
+Create Date: 2025-10-06 09:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c7e2a9d4f618"
+down_revision = "a41c7e93d5b0"
+branch_labels = None
+depends_on = None
+
+TABLE = "lesson_archive"
+INDEXES = [
+    ("ix_lesson_archive_teacher_status_start", ["teacher_id", "status", "start_at"]),
+    ("ix_lesson_archive_student_start", ["student_id", "start_at"]),
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    # צור טבלה רק אם לא קיימת (init-db/create_all אולי כבר יצר אותה)
+    if TABLE not in insp.get_table_names():
+        op.create_table(
+            TABLE,
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+            sa.Column("teacher_id", sa.Integer(), sa.ForeignKey("user.id")),
+            sa.Column("student_id", sa.Integer(), sa.ForeignKey("user.id")),
+            sa.Column("start_at", sa.DateTime(), nullable=False),
+            sa.Column("end_at", sa.DateTime(), nullable=False),
+            sa.Column("status", sa.String(length=20), nullable=False),
+            sa.Column("hourly_rate_cents", sa.Integer(), nullable=False),
+            sa.Column("hourly_rate_at_time_cents", sa.Integer(), nullable=False),
+            sa.Column("paid_status", sa.String(length=20), nullable=False),
+            sa.Column("paid_amount", sa.Float(), nullable=False),
+            sa.Column("payment_method", sa.String(length=30), nullable=True),
+            sa.Column("duration_minutes", sa.Integer(), nullable=False),
+            sa.Column("notes", sa.Text()),
+            sa.Column("archived_at", sa.DateTime(), nullable=False),
+        )
+        insp = sa.inspect(bind)
+
+    existing_idx = [i["name"] for i in insp.get_indexes(TABLE)]
+    for name, cols in INDEXES:
+        if name not in existing_idx:
+            op.create_index(name, TABLE, cols, unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if TABLE not in insp.get_table_names():
+        return
+    # מחזירים שורות מארכבות ל-lesson לפני שמוחקים את הטבלה
+    cols = ("id, teacher_id, student_id, start_at, end_at, status, hourly_rate_cents, "
+            "hourly_rate_at_time_cents, paid_status, paid_amount, payment_method, duration_minutes, notes")
+    op.execute(f"INSERT INTO lesson ({cols}) SELECT {cols} FROM {TABLE}")
+    existing_idx = [i["name"] for i in insp.get_indexes(TABLE)]
+    for name, _ in INDEXES:
+        if name in existing_idx:
+            op.drop_index(name, table_name=TABLE)
+    op.drop_table(TABLE)
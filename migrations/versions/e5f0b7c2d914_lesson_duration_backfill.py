@@ -0,0 +1,52 @@
+"""
+ensure lesson.duration_minutes and backfill it from start_at/end_at
+
+Replaces scripts/add_duration_minutes.py (SQLite-only PRAGMA/ALTER at import time).
+
+Revision ID: e5f0b7c2d914
+Revises: c7e2a9d4f618
+Create Date: 2025-10-07 09:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.batched_migration import batched_update, minutes_between
+
+# revision identifiers, used by Alembic.
+revision = "e5f0b7c2d914"
+down_revision = "c7e2a9d4f618"
+branch_labels = None
+depends_on = None
+
+DEFAULT_MINUTES = 60
+
+
+def duration_sql(dialect: str) -> str:
+    return f"COALESCE({minutes_between('start_at', 'end_at', dialect)}, {DEFAULT_MINUTES})"
+
+
+def upgrade():
+    bind = op.get_bind()
+    cols = {c["name"] for c in sa.inspect(bind).get_columns("lesson")}
+
+    added = "duration_minutes" not in cols
+    if added:
+        # nullable בשלב ההוספה – אחרת כל השורות היו מקבלות 60 ולא המשך האמיתי
+        op.add_column("lesson", sa.Column("duration_minutes", sa.Integer(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        batched_update(
+            bind, "lesson_duration_minutes", "lesson",
+            set_sql=f"duration_minutes = {duration_sql(bind.dialect.name)}",
+            where_sql="duration_minutes IS NULL",
+        )
+
+    if added:
+        with op.batch_alter_table("lesson", schema=None) as batch_op:
+            batch_op.alter_column("duration_minutes", existing_type=sa.Integer(), nullable=False)
+
+
+def downgrade():
+    # העמודה קיימת במודל מההתחלה; לא מוחקים נתונים
+    pass
@@ -0,0 +1,112 @@
+"""
+payment ledger: payment, payment_allocation, ledger_entry, student_balance
+
+Backfills the ledger from the legacy lesson columns: a charge per done lesson
+and a payment per lesson with paid_amount > 0 (lesson + lesson_archive),
+with running balances computed by a window function, then one
+student_balance row per student.
+
+Revision ID: f3a8c1d27b64
+Revises: e5f0b7c2d914
+Create Date: 2025-10-08 09:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.ledger import backfill_from_lessons
+
+# revision identifiers, used by Alembic.
+revision = "f3a8c1d27b64"
+down_revision = "e5f0b7c2d914"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "payment": [
+        ("ix_payment_student_created", ["student_id", "created_at"]),
+        ("ix_payment_teacher_created", ["teacher_id", "created_at"]),
+    ],
+    "payment_allocation": [
+        ("ix_payment_allocation_payment_id", ["payment_id"]),
+        ("ix_payment_allocation_lesson_id", ["lesson_id"]),
+    ],
+    "ledger_entry": [
+        ("ix_ledger_student_created", ["student_id", "created_at", "id"]),
+        ("ix_ledger_lesson", ["lesson_id"]),
+    ],
+    "student_balance": [
+        ("ix_student_balance_teacher_balance", ["teacher_id", "balance_cents"]),
+    ],
+}
+
+
+def _create_tables(insp):
+    tables = set(insp.get_table_names())
+    if "payment" not in tables:
+        op.create_table(
+            "payment",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("teacher_id", sa.Integer(), sa.ForeignKey("user.id"), nullable=False),
+            sa.Column("student_id", sa.Integer(), sa.ForeignKey("user.id"), nullable=False),
+            sa.Column("amount_cents", sa.Integer(), nullable=False),
+            sa.Column("method", sa.String(length=30)),
+            sa.Column("note", sa.String(length=255)),
+            sa.Column("created_by_id", sa.Integer(), sa.ForeignKey("user.id")),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+    if "payment_allocation" not in tables:
+        op.create_table(
+            "payment_allocation",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("payment_id", sa.Integer(), sa.ForeignKey("payment.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("lesson_id", sa.Integer(), nullable=False),
+            sa.Column("amount_cents", sa.Integer(), nullable=False),
+        )
+    if "ledger_entry" not in tables:
+        op.create_table(
+            "ledger_entry",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("student_id", sa.Integer(), sa.ForeignKey("user.id"), nullable=False),
+            sa.Column("teacher_id", sa.Integer()),
+            sa.Column("entry_type", sa.String(length=20), nullable=False),
+            sa.Column("amount_cents", sa.Integer(), nullable=False),
+            sa.Column("balance_after_cents", sa.Integer(), nullable=False),
+            sa.Column("lesson_id", sa.Integer()),
+            sa.Column("payment_id", sa.Integer(), sa.ForeignKey("payment.id")),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.CheckConstraint("entry_type IN ('opening', 'charge', 'payment')", name="ck_ledger_entry_type"),
+        )
+    if "student_balance" not in tables:
+        op.create_table(
+            "student_balance",
+            sa.Column("student_id", sa.Integer(), sa.ForeignKey("user.id"), primary_key=True, autoincrement=False),
+            sa.Column("teacher_id", sa.Integer()),
+            sa.Column("balance_cents", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("charged_cents", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("paid_cents", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+        )
+
+
+def upgrade():
+    bind = op.get_bind()
+    _create_tables(sa.inspect(bind))
+
+    insp = sa.inspect(bind)
+    for table, indexes in INDEXES.items():
+        existing_idx = [i["name"] for i in insp.get_indexes(table)]
+        for name, cols in indexes:
+            if name not in existing_idx:
+                op.create_index(name, table, cols, unique=False)
+
+    backfill_from_lessons(bind, include_archive="lesson_archive" in insp.get_table_names())
+
+
+def downgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    tables = set(insp.get_table_names())
+    for table in ("student_balance", "ledger_entry", "payment_allocation", "payment"):
+        if table in tables:
+            op.drop_table(table)
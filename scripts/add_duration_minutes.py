@@ -1,20 +1,44 @@
 # scripts/add_duration_minutes.py
+"""
+משלים lesson.duration_minutes לפי start_at/end_at, במנות (SQLite ו-Postgres).
+
+במסד שמנוהל ע"י מיגרציות זה חלק מ-`flask db upgrade` (e5f0b7c2d914); הסקריפט
+נשאר למסדים שנוצרו ב-init-db בלבד:
+
+    python -m scripts.add_duration_minutes [--batch-size 5000] [--pause 0.05]
+"""
+import argparse
+import sys
+
+import sqlalchemy as sa
+
 from app import create_app, db
-from sqlalchemy import text
-
-app = create_app()
-
-with app.app_context():
-    # בדיקה אילו עמודות קיימות כרגע בטבלת lesson
-    rows = db.session.execute(text("PRAGMA table_info(lesson)")).fetchall()
-    cols = [r[1] for r in rows]
-    print("current columns:", cols)
-
-    if "duration_minutes" not in cols:
-        db.session.execute(
-            text("ALTER TABLE lesson ADD COLUMN duration_minutes INTEGER DEFAULT 60")
-        )
-        db.session.commit()
-        print("✅ added column: duration_minutes (DEFAULT 60)")
-    else:
-        print("✅ duration_minutes already exists - nothing to do")
+from app.utils.batched_migration import batched_update, minutes_between
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill lesson.duration_minutes in batches")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--pause", type=float, default=None, help="שניות בין מנות")
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        engine = db.engine
+        cols = {c["name"] for c in sa.inspect(engine).get_columns("lesson")}
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if "duration_minutes" not in cols:
+                conn.execute(sa.text("ALTER TABLE lesson ADD COLUMN duration_minutes INTEGER"))
+                print("added column: duration_minutes")
+            batched_update(
+                conn, "lesson_duration_minutes", "lesson",
+                set_sql=f"duration_minutes = COALESCE({minutes_between('start_at', 'end_at', engine.dialect.name)}, 60)",
+                where_sql="duration_minutes IS NULL",
+                batch_size=args.batch_size,
+                pause=args.pause,
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+# scripts/bench_endpoints.py
+"""
+בנצ'מרק / בדיקת עומס לנקודות הקצה החמות, עם שער רגרסיה.
+
+    # מסד נתונים ייעודי + dataset סינתטי + gunicorn מקומי
+    export DATABASE_URL=sqlite:////tmp/bench.db
+    python -m scripts.seed_all --teachers 20 --students 400 --years 3 --lessons-per-week 30
+    python -m scripts.bench_endpoints --concurrency 8 --duration 15 --save bench-baseline.json
+
+    # אחרי שינוי: השוואה מול ה-baseline (יוצא 1 אם יש רגרסיה)
+    python -m scripts.bench_endpoints --concurrency 8 --duration 15 --compare bench-baseline.json
+
+הכול רץ על מכונה אחת בלי רשת חיצונית: הסקריפט מרים gunicorn על 127.0.0.1
+(או משתמש ב---url של שרת קיים), מתחבר כמורה וכתלמיד מה-dataset (seed_all,
+סיסמה 123456) ומריץ כל תרחיש עם N threads של http.client עם keep-alive.
+"""
+import argparse
+import json
+import math
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.client import HTTPConnection
+from urllib.parse import urlencode, urlsplit
+
+from sqlalchemy import select
+
+PASSWORD = "123456"
+
+
+# -------------------------
+# dataset / משתמשים
+# -------------------------
+def _bench_identities(seed: int) -> dict:
+    """שמות המשתמש של מורה/תלמיד מה-dataset + חומר עם קובץ להורדה."""
+    from app import create_app
+    from app.extensions import db
+    from app.models import StudentMaterial, User
+
+    app = create_app()
+    with app.app_context():
+        prefix = f"seed{seed}-"
+        teacher = db.session.execute(
+            select(User).where(User.email == f"{prefix}t0@example.com")).scalar_one_or_none()
+        if teacher is None:
+            raise SystemExit(f"no dataset for seed={seed}; run: python -m scripts.seed_all --seed {seed} ...")
+        student = db.session.execute(
+            select(User).where(User.teacher_id == teacher.id, User.role == "student")
+            .order_by(User.id).limit(1)).scalar_one()
+
+        # קובץ של 256KB להורדה (נוצר פעם אחת)
+        stored = f"bench-{seed}.bin"
+        path = os.path.join(app.config["MATERIALS_UPLOAD_PATH"], stored)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(os.urandom(256 * 1024))
+        material = db.session.execute(
+            select(StudentMaterial).where(StudentMaterial.file_path == stored)).scalar_one_or_none()
+        if material is None:
+            material = StudentMaterial(student_id=student.id, teacher_id=teacher.id,
+                                       title="bench", file_path=stored, file_name="bench.bin")
+            db.session.add(material)
+            db.session.commit()
+        return {"teacher": teacher.username, "student": student.username, "material_id": material.id}
+
+
+# -------------------------
+# HTTP
+# -------------------------
+class Client:
+    """חיבור keep-alive אחד + עוגיית session."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.conn = HTTPConnection(host, port, timeout=60)
+        self.cookie = None
+
+    def request(self, method, path, body=None):
+        headers = {}
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        if body is not None:
+            body = urlencode(body)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+        except (ConnectionError, OSError):
+            # השרת סגר את החיבור – פותחים מחדש פעם אחת
+            self.conn.close()
+            self.conn = HTTPConnection(self.host, self.port, timeout=60)
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+        resp.read()
+        for k, v in resp.getheaders():
+            if k.lower() == "set-cookie" and v.startswith("session="):
+                self.cookie = v.split(";", 1)[0]
+        return resp.status
+
+    def login(self, username):
+        status = self.request("POST", "/login", {"username": username, "password": PASSWORD})
+        if status != 302 or not self.cookie:
+            raise SystemExit(f"login failed for {username!r} (status {status})")
+
+
+def scenarios(ids):
+    """(שם, תפקיד, method, path, body). תפקיד None = אנונימי."""
+    return [
+        ("calendar_events", "teacher", "GET", "/api/calendar/events", None),
+        ("teacher.dashboard", "teacher", "GET", "/teacher/dashboard", None),
+        ("lessons_completed", "teacher", "GET", "/teacher/lessons/completed", None),
+        ("lessons_completed.pdf", "teacher", "GET", "/teacher/lessons/completed?export=pdf", None),
+        ("student.dashboard", "student", "GET", "/student/dashboard", None),
+        ("auth.login", None, "POST", "/login", {"username": ids["teacher"], "password": PASSWORD}),
+        ("material_download", "student", "GET", f"/student/materials/{ids['material_id']}/download", None),
+    ]
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def run_scenario(host, port, ids, scenario, concurrency, duration, warmup):
+    name, role, method, path, body = scenario
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = [math.inf]   # נקבע ע"י ה-thread הראשי מיד אחרי ה-barrier
+    ready = threading.Barrier(concurrency + 1)
+    setup_errors = []
+
+    def worker():
+        try:
+            client = Client(host, port)
+            if role:
+                client.login(ids[role])
+            for _ in range(warmup):
+                if role is None:
+                    client.cookie = None
+                client.request(method, path, body)
+        except BaseException as e:   # כולל SystemExit מ-login שנכשל
+            with lock:
+                setup_errors.append(f"{type(e).__name__}: {e}")
+            ready.abort()   # משחרר את כל מי שמחכה ב-barrier, במקום תקיעה
+            return
+        try:
+            ready.wait()
+        except threading.BrokenBarrierError:
+            return
+        local, local_err = [], 0
+        while time.perf_counter() < deadline[0]:
+            if role is None:
+                client.cookie = None   # אנונימי: כל בקשה היא התחברות מלאה
+            start = time.perf_counter()
+            try:
+                status = client.request(method, path, body)
+                if status >= 400:
+                    local_err += 1
+            except Exception:
+                local_err += 1
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_err
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    try:
+        ready.wait()
+    except threading.BrokenBarrierError:
+        for t in threads:
+            t.join()
+        raise SystemExit(f"{name}: worker setup failed: {setup_errors[0] if setup_errors else 'unknown error'}")
+    started = time.perf_counter()
+    deadline[0] = started + duration
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    lat = sorted(x * 1000 for x in latencies)
+    return {
+        "requests": len(lat),
+        "errors": errors[0],
+        "rps": round(len(lat) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(lat, 50), 2),
+        "p95_ms": round(percentile(lat, 95), 2),
+        "p99_ms": round(percentile(lat, 99), 2),
+        "mean_ms": round(statistics.fmean(lat), 2) if lat else 0.0,
+    }
+
+
+# -------------------------
+# שרת
+# -------------------------
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers, threads):
+    port = _free_port()
+    env = dict(os.environ, GUNICORN_WORKERS=str(workers), GUNICORN_THREADS=str(threads),
+               METRICS_ENABLED=os.getenv("METRICS_ENABLED", "0"))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}", "wsgi:app"],
+        env=env,
+    )
+    for _ in range(300):
+        try:
+            conn = HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/healthz")
+            if conn.getresponse().status == 200:
+                return proc, port
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise SystemExit("gunicorn did not come up")
+
+
+# -------------------------
+# baseline / רגרסיה
+# -------------------------
+def compare(current, baseline, threshold_pct):
+    """רשימת רגרסיות: p95 עלה או rps ירד ביותר מ-threshold_pct אחוז."""
+    regressions = []
+    for name, cur in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        limit = 1 + threshold_pct / 100.0
+        if base["p95_ms"] and cur["p95_ms"] > base["p95_ms"] * limit:
+            regressions.append(f"{name}: p95 {base['p95_ms']}ms -> {cur['p95_ms']}ms")
+        if base["rps"] and cur["rps"] < base["rps"] / limit:
+            regressions.append(f"{name}: rps {base['rps']} -> {cur['rps']}")
+        if cur["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: errors {base.get('errors', 0)} -> {cur['errors']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="שרת קיים (למשל http://127.0.0.1:8000); ברירת מחדל: gunicorn מקומי")
+    parser.add_argument("--seed", type=int, default=42, help="ה-seed שאיתו נוצר ה-dataset")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0, help="שניות לכל תרחיש")
+    parser.add_argument("--warmup", type=int, default=3, help="בקשות חימום לכל thread")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=2)
+    parser.add_argument("--only", action="append", help="להריץ רק תרחישים אלה (ניתן לחזור)")
+    parser.add_argument("--save", help="לשמור את התוצאות כ-baseline JSON")
+    parser.add_argument("--compare", help="baseline JSON להשוואה")
+    parser.add_argument("--threshold", type=float, default=20.0, help="אחוז רגרסיה מותר")
+    args = parser.parse_args(argv)
+
+    ids = _bench_identities(args.seed)
+    proc = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        proc, port = start_server(args.workers, args.threads)
+        host = "127.0.0.1"
+
+    try:
+        results = {}
+        for sc in scenarios(ids):
+            if args.only and sc[0] not in args.only:
+                continue
+            res = run_scenario(host, port, ids, sc, args.concurrency, args.duration, args.warmup)
+            results[sc[0]] = res
+            print(f"{sc[0]:<24} rps={res['rps']:>8} p50={res['p50_ms']:>8}ms "
+                  f"p95={res['p95_ms']:>8}ms p99={res['p99_ms']:>8}ms errors={res['errors']}")
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    report = {
+        "meta": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "workers": args.workers,
+            "threads": args.threads,
+            "seed": args.seed,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "scenarios": results,
+    }
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"REGRESSION (>{args.threshold}%):")
+            for r in regressions:
+                print("  " + r)
+            return 1
+        print(f"no regressions beyond {args.threshold}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
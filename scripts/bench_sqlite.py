@@ -0,0 +1,165 @@
+# scripts/bench_sqlite.py
+"""
+בנצ'מרק קריאה/כתיבה ל-SQLite: לפני (SQLITE_TUNED=0) ואחרי (SQLITE_TUNED=1).
+
+    python -m scripts.bench_sqlite --processes 3 --threads 2 --duration 10 --write-ratio 0.2
+
+לכל מצב נוצר קובץ SQLite חדש בתיקייה זמנית, עם כמה אלפי שיעורים. אחר כך
+רצים P תהליכים (כמו workers של gunicorn) עם T threads כל אחד: כתיבה = הוספת
+ליד (כמו submit_lead), קריאה = 50 השיעורים האחרונים של מורה. נספרים פעולות
+לשנייה, p95, ושגיאות "database is locked".
+"""
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def _prepare(lessons):
+    from app import create_app
+    from app.extensions import db
+    from scripts.seed_all import seed_all
+
+    app = create_app()
+    with app.app_context():
+        seed_all(teachers=2, students=20, years=max(0.1, lessons / (2 * 10 * 52.0)),
+                 lessons_per_week=10, materials_per_student=0, leads=0, seed=7, demo=False)
+        db.session.remove()
+
+
+def _worker(threads, duration, write_ratio, start_at, out):
+    from sqlalchemy import select
+    from app import create_app
+    from app.extensions import db
+    from app.models import Lead, Lesson, User
+
+    app = create_app()
+    with app.app_context():
+        teacher_ids = db.session.execute(select(User.id).where(User.role == "teacher")).scalars().all()
+        db.session.remove()
+
+    results = []
+    lock = threading.Lock()
+
+    def run(seed):
+        rng = random.Random(seed)
+        stats = {"reads": [], "writes": [], "locked": 0, "errors": 0}
+        while time.time() < start_at:
+            time.sleep(0.001)
+        deadline = start_at + duration
+        while time.time() < deadline:
+            is_write = rng.random() < write_ratio
+            t0 = time.perf_counter()
+            # כל פעולה היא "בקשה" נפרדת כמו בשרת (app context ו-session חדשים):
+            # GET קורא (BEGIN רגיל), POST כותב (BEGIN IMMEDIATE)
+            try:
+                with app.test_request_context("/", method="POST" if is_write else "GET"):
+                    try:
+                        if is_write:
+                            db.session.add(Lead(name="bench", phone="0500000000", message="bench"))
+                            db.session.commit()
+                        else:
+                            db.session.execute(
+                                select(Lesson.id, Lesson.start_at)
+                                .where(Lesson.teacher_id == rng.choice(teacher_ids))
+                                .order_by(Lesson.start_at.desc()).limit(50)
+                            ).all()
+                            db.session.commit()
+                    except Exception:
+                        db.session.rollback()
+                        raise
+            except Exception as exc:
+                if "locked" in str(exc) or "busy" in str(exc):
+                    stats["locked"] += 1
+                else:
+                    stats["errors"] += 1
+                continue
+            (stats["writes"] if is_write else stats["reads"]).append(time.perf_counter() - t0)
+        with lock:
+            results.append(stats)
+
+    ts = [threading.Thread(target=run, args=(os.getpid() * 100 + i,)) for i in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    merged = {"reads": [], "writes": [], "locked": 0, "errors": 0}
+    for s in results:
+        for k in merged:
+            merged[k] += s[k]
+    out.put(merged)
+
+
+def run_mode(tuned, args):
+    tmpdir = tempfile.mkdtemp(prefix="bench-sqlite-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ["SQLITE_TUNED"] = "1" if tuned else "0"
+    os.environ["METRICS_ENABLED"] = "0"
+    os.environ["QUERY_TRACE"] = "0"
+
+    ctx = mp.get_context("spawn")   # כל תהליך בונה את ה-app מחדש, כמו worker
+    prep = ctx.Process(target=_prepare, args=(args.lessons,))
+    prep.start()
+    prep.join()
+
+    out = ctx.Queue()
+    start_at = time.time() + 3.0
+    procs = [ctx.Process(target=_worker, args=(args.threads, args.duration, args.write_ratio, start_at, out))
+             for _ in range(args.processes)]
+    for p in procs:
+        p.start()
+    merged = {"reads": [], "writes": [], "locked": 0, "errors": 0}
+    for _ in procs:
+        s = out.get()
+        for k in merged:
+            merged[k] += s[k]
+    for p in procs:
+        p.join()
+
+    reads = sorted(x * 1000 for x in merged["reads"])
+    writes = sorted(x * 1000 for x in merged["writes"])
+    return {
+        "reads_per_s": round(len(reads) / args.duration, 1),
+        "writes_per_s": round(len(writes) / args.duration, 1),
+        "read_p95_ms": round(_percentile(reads, 95), 2),
+        "write_p95_ms": round(_percentile(writes, 95), 2),
+        "locked_errors": merged["locked"],
+        "other_errors": merged["errors"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--lessons", type=int, default=5000, help="בערך כמה שיעורים ב-dataset")
+    parser.add_argument("--only", choices=["before", "after"], help="להריץ רק מצב אחד")
+    args = parser.parse_args(argv)
+
+    report = {}
+    for name, tuned in (("before", False), ("after", True)):
+        if args.only and args.only != name:
+            continue
+        report[name] = run_mode(tuned, args)
+        print(f"{name:<7} " + " ".join(f"{k}={v}" for k, v in report[name].items()), flush=True)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
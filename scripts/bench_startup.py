@@ -0,0 +1,65 @@
+# scripts/bench_startup.py
+"""
+מדידת זמן עלייה: import של החבילה, create_app(), והבקשה הראשונה.
+
+    python -m scripts.bench_startup --runs 5 --path / --path /api/ping
+
+כל ריצה היא תהליך פייתון חדש (cold import). הפלט הוא JSON עם min/median/max
+לכל שלב, במילישניות.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app as pkg
+t1 = time.perf_counter()
+application = pkg.create_app()
+t2 = time.perf_counter()
+client = application.test_client()
+first = {}
+for path in sys.argv[1:]:
+    s = time.perf_counter()
+    client.get(path)
+    first[path] = (time.perf_counter() - s) * 1000
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "create_app_ms": (t2 - t1) * 1000, "first_request_ms": first}))
+"""
+
+
+def _summary(values):
+    return {
+        "min": round(min(values), 2),
+        "median": round(statistics.median(values), 2),
+        "max": round(max(values), 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", action="append", dest="paths", help="נתיב לבקשה הראשונה (ניתן לחזור)")
+    args = parser.parse_args()
+    paths = args.paths or ["/healthz", "/"]
+
+    samples = []
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, "-c", CHILD, *paths],
+                             check=True, capture_output=True, text=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    report = {
+        "runs": args.runs,
+        "import_ms": _summary([s["import_ms"] for s in samples]),
+        "create_app_ms": _summary([s["create_app_ms"] for s in samples]),
+        "first_request_ms": {p: _summary([s["first_request_ms"][p] for s in samples]) for p in paths},
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# scripts/explain_lesson_queries.py
+"""
+בדיקת EXPLAIN לנתיבי הגישה החמים: כל שאילתה חייבת לרוץ על אחד האינדקסים
+שהוגדרו עבורה, ולא בסריקה מלאה של lesson / student_material.
+
+    python -m scripts.explain_lesson_queries
+
+יוצא עם קוד 1 אם שאילתה כלשהי לא משתמשת באינדקס הצפוי. אותן שאילתות
+נבדקות ב-tests/test_lesson_indexes.py (רץ ב-CI).
+עובד על SQLite (EXPLAIN QUERY PLAN) ועל Postgres (EXPLAIN FORMAT JSON,
+עם enable_seqscan=off כדי שטבלה קטנה לא תסתיר אינדקס חסר).
+"""
+import json
+import sys
+from datetime import datetime
+
+from app import create_app
+from app.extensions import db
+from app.models import Lesson, StudentMaterial, lesson_scheduled_clause
+from app.teacher.dashboard import overdue_lessons_query, recent_lessons_query
+
+
+def access_paths():
+    """(שם, שאילתה, אינדקסים מקובלים) – אותן שאילתות שהמסכים מריצים."""
+    now = datetime.utcnow()
+    return [
+        ("teacher.dashboard recent lessons",
+         recent_lessons_query(1),
+         {"ix_lesson_teacher_start_scheduled", "ix_lesson_teacher_status_start"}),
+        ("teacher.dashboard overdue lessons",
+         overdue_lessons_query(1, now),
+         {"ix_lesson_teacher_end", "ix_lesson_teacher_status_start"}),
+        ("teacher.lessons_completed",
+         Lesson.query.filter(Lesson.teacher_id == 1, Lesson.status == "done")
+         .order_by(Lesson.start_at.desc()),
+         {"ix_lesson_teacher_status_start"}),
+        ("student._get_upcoming_lessons",
+         Lesson.query.filter(Lesson.student_id == 1, Lesson.start_at >= now, lesson_scheduled_clause())
+         .order_by(Lesson.start_at.asc()).limit(5),
+         {"ix_lesson_student_start_scheduled", "ix_lesson_student_start"}),
+        ("main.calendar_events (teacher)",
+         Lesson.query.filter(Lesson.teacher_id == 1, Lesson.status != "cancelled")
+         .order_by(Lesson.start_at.asc()),
+         {"ix_lesson_teacher_start", "ix_lesson_teacher_status_start"}),
+        ("student._get_student_materials",
+         StudentMaterial.query.filter(StudentMaterial.student_id == 1)
+         .order_by(StudentMaterial.created_at.desc()),
+         {"ix_student_material_student_created"}),
+    ]
+
+
+def _driver_sql(conn, query):
+    compiled = query.statement.compile(dialect=conn.dialect)
+    if compiled.positional:
+        params = tuple(compiled.params[k] for k in compiled.positiontup)
+    else:
+        params = compiled.params
+    return compiled.string, params
+
+
+def _pg_index_names(node, out):
+    if isinstance(node, dict):
+        if "Index Name" in node:
+            out.add(node["Index Name"])
+        for child in node.get("Plans", []):
+            _pg_index_names(child, out)
+        if "Plan" in node:
+            _pg_index_names(node["Plan"], out)
+    elif isinstance(node, list):
+        for item in node:
+            _pg_index_names(item, out)
+
+
+def used_indexes(conn, query) -> tuple[set, str]:
+    sql, params = _driver_sql(conn, query)
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        raw = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql, params).scalar()
+        plan = raw if isinstance(raw, list) else json.loads(raw)
+        names = set()
+        _pg_index_names(plan, names)
+        return names, json.dumps(plan, indent=1)
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    details = [r[-1] for r in rows]
+    names = set()
+    for d in details:
+        for marker in ("USING INDEX ", "USING COVERING INDEX "):
+            if marker in d:
+                names.add(d.split(marker, 1)[1].split(" ", 1)[0])
+    return names, "\n".join(details)
+
+
+def main() -> int:
+    app = create_app()
+    failed = 0
+    with app.app_context():
+        with db.engine.connect() as conn:
+            for name, query, expected in access_paths():
+                with conn.begin():
+                    used, plan = used_indexes(conn, query)
+                ok = bool(used & expected)
+                print(f"[{'OK' if ok else 'FAIL'}] {name}: used={sorted(used) or '-'}")
+                if not ok:
+                    failed += 1
+                    print(f"    expected one of {sorted(expected)}\n    plan:\n{plan}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,47 +1,338 @@
 # scripts/seed_all.py
+"""
+מחולל נתונים סינתטיים (לפיתוח ולבנצ'מרקים).
+
+    python -m scripts.seed_all                                  # מורה אחד, 5 תלמידים
+    python -m scripts.seed_all --teachers 100 --students 3000 --years 5 --lessons-per-week 40
+
+- N מורים, M תלמידים (מחולקים בין המורים), שנים של היסטוריית שיעורים בלי
+  חפיפות (לכל מורה השיעורים רצים ברצף בכל יום, וכל תלמיד לומד רק אצל המורה שלו),
+  תמהיל סטטוסים / תשלומים / payment_method, חומרי לימוד ולידים.
+- דטרמיניסטי לפי --seed: כל התאריכים יחסיים ל---anchor-date (ברירת מחדל קבועה,
+  DEFAULT_ANCHOR), לא לשעה הנוכחית – אותו seed נותן אותן שורות בכל יום.
+  --anchor-date today מעגן להיום (כדי שיהיו שיעורים עתידיים בדשבורד).
+- משתמשי הדמו המוכרים (המורה לימור + 5 תלמידים, סיסמה 123456) נוצרים אם
+  חסרים; המורה מקבלת created_at מוקדם, כך שהיא נשארת "המורה הראשונה"
+  (get_default_teacher). --no-demo מדלג עליהם.
+- הכנסה במנות (executemany); ב-Postgres השיעורים נטענים ב-COPY.
+- עובד על SQLite ועל Postgres.
+"""
+import argparse
+import csv
+import io
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from faker import Faker
+from sqlalchemy import insert, select
+
 from app import create_app
 from app.extensions import db
-from app.models import User
-
-
-def seed_all():
-    # === מורה ===
-    teacher = User(
-        username="לימור",
-        email="jonatan0897@gmail.com",
-        role="teacher",
-    )
-    teacher.set_password("123456")
-    db.session.add(teacher)
+from app.models import Lead, Lesson, StudentMaterial, User
+from app.constants import PAYMENT_METHODS, SCHOOLS
+from app.utils.ledger import backfill_from_lessons
+
+LESSON_COLUMNS = [
+    "teacher_id", "student_id", "start_at", "end_at", "status",
+    "hourly_rate_cents", "hourly_rate_at_time_cents",
+    "paid_status", "paid_amount", "payment_method", "duration_minutes", "notes",
+]
+DURATIONS = [45, 60, 60, 60, 90]
+GAPS = [0, 0, 15, 30]
+METHODS = [v for v, _ in PAYMENT_METHODS if v]
+METHOD_WEIGHTS = [40, 35, 10, 10, 5][:len(METHODS)]
+DEFAULT_ANCHOR = "2025-10-01"
+DEMO_PASSWORD = "123456"
+DEMO_TEACHER = {"username": "לימור", "email": "jonatan0897@gmail.com"}
+DEMO_STUDENTS = [
+    {"username": "יואב", "email": "yoav@classA.com", "grade": "ט'", "school": "אורט סינגלובסקי"},
+    {"username": "נועה", "email": "noa@classB.com", "grade": "י'", "school": "גימנסיה הרצליה"},
+    {"username": "רועי", "email": "roi@classC.com", "grade": "י״א", "school": "תיכון בליך"},
+    {"username": "מאיה", "email": "maya@classD.com", "grade": "י״ב", "school": "תיכון חדש"},
+    {"username": "אדם", "email": "adam@classE.com", "grade": "ח'", "school": "תיכון אבן יהודה"},
+]
+
+
+def _bulk_insert(table, rows, batch_size):
+    """מכניס rows (iterable של dict) במנות; מחזיר כמה הוכנסו."""
+    total, batch = 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(insert(table), batch)
+            db.session.commit()
+            total += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(table), batch)
+        db.session.commit()
+        total += len(batch)
+    return total
+
+
+def _copy_lessons(rows, batch_size):
+    """Postgres: COPY ... FROM STDIN במנות (מהיר בהרבה מ-INSERT)."""
+    sql = f"COPY lesson ({', '.join(LESSON_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    total = 0
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    pending = 0
+
+    def flush():
+        buf.seek(0)
+        raw = db.session.connection().connection   # אותו חיבור של ה-session, כדי שה-commit יחול עליו
+        with raw.cursor() as cur:
+            cur.copy_expert(sql, buf)
+        db.session.commit()
+        buf.seek(0)
+        buf.truncate()
+
+    for row in rows:
+        writer.writerow(["" if row[c] is None else row[c] for c in LESSON_COLUMNS])
+        pending += 1
+        if pending >= batch_size:
+            flush()
+            total += pending
+            pending = 0
+    if pending:
+        flush()
+        total += pending
+    return total
+
+
+def _user_ids(prefix):
+    return list(db.session.execute(
+        select(User.id).where(User.email.like(f"{prefix}%")).order_by(User.id)
+    ).scalars())
+
+
+def _lesson_rows(rng, teacher_students, rates, start_day, end_day, per_week, now):
+    """מייצר שיעורים למורה אחרי מורה, יום אחרי יום – בלי חפיפות."""
+    per_day = max(1, round(per_week / 5))
+    for teacher_id, student_ids in teacher_students:
+        if not student_ids:
+            continue
+        day = start_day
+        while day < end_day:
+            if day.weekday() < 5 or rng.random() < 0.15:   # בעיקר א'-ה'
+                cursor = day.replace(hour=14, minute=0)
+                for _ in range(rng.randint(max(0, per_day - 2), per_day + 2)):
+                    cursor += timedelta(minutes=rng.choice(GAPS))
+                    duration = rng.choice(DURATIONS)
+                    start_at, end_at = cursor, cursor + timedelta(minutes=duration)
+                    if end_at >= day + timedelta(days=1):
+                        break
+                    cursor = end_at
+                    student_id = rng.choice(student_ids)
+                    rate = rates[student_id]
+
+                    r = rng.random()
+                    if end_at < now:
+                        status = "done" if r < 0.80 else ("cancelled" if r < 0.90 else "scheduled")
+                    else:
+                        status = "scheduled" if r < 0.95 else "cancelled"
+
+                    paid_status, paid_amount, method = "unpaid", 0.0, None
+                    if status == "done":
+                        cost = round(rate / 100.0 * duration / 60.0, 2)
+                        p = rng.random()
+                        if p < 0.70:
+                            paid_status, paid_amount = "paid", cost
+                        elif p < 0.80:
+                            paid_status, paid_amount = "partial", round(cost / 2, 2)
+                        if paid_status != "unpaid":
+                            method = rng.choices(METHODS, weights=METHOD_WEIGHTS)[0]
+
+                    yield {
+                        "teacher_id": teacher_id,
+                        "student_id": student_id,
+                        "start_at": start_at,
+                        "end_at": end_at,
+                        "status": status,
+                        "hourly_rate_cents": rate,
+                        "hourly_rate_at_time_cents": rate,
+                        "paid_status": paid_status,
+                        "paid_amount": paid_amount,
+                        "payment_method": method,
+                        "duration_minutes": duration,
+                        "notes": None,
+                    }
+            day += timedelta(days=1)
+
+
+def parse_anchor(value: str) -> datetime:
+    if value == "today":
+        return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def seed_demo_users(created_at):
+    """משתמשי הדמו המוכרים (לכניסה ידנית); לא נוגע במי שכבר קיים."""
+    def exists(u):
+        return db.session.execute(
+            select(User.id).where((User.email == u["email"]) | (User.username == u["username"]))
+        ).first() is not None
+
+    teacher = User.query.filter_by(email=DEMO_TEACHER["email"]).first()
+    if teacher is None and not exists(DEMO_TEACHER):
+        teacher = User(role="teacher", created_at=created_at, **DEMO_TEACHER)
+        teacher.set_password(DEMO_PASSWORD)
+        db.session.add(teacher)
+        db.session.flush()
+    if teacher is None:
+        return
+    added = 0
+    for s in DEMO_STUDENTS:
+        if exists(s):
+            continue
+        student = User(role="student", teacher_id=teacher.id, created_at=created_at, **s)
+        student.set_password(DEMO_PASSWORD)
+        db.session.add(student)
+        added += 1
     db.session.commit()
-    print(f"[seed] Created teacher: {teacher.username} (id={teacher.id})")
+    print(f"[seed] demo: teacher {teacher.username} (id={teacher.id}), {added} new students, password {DEMO_PASSWORD}")
+
+
+def seed_all(teachers=1, students=5, years=1.0, lessons_per_week=10, materials_per_student=3,
+             leads=20, seed=42, batch_size=5000, use_copy=None, anchor=None, demo=True):
+    rng = random.Random(seed)
+    fake = Faker("he_IL")
+    fake.seed_instance(seed)
+    now = anchor or parse_anchor(DEFAULT_ANCHOR)
+    prefix = f"seed{seed}-"
+    t0 = time.perf_counter()
+
+    db.create_all()
+    if demo:
+        seed_demo_users(now - timedelta(days=int(365 * years) + 60))
+    if db.session.execute(select(User.id).where(User.email.like(f"{prefix}%")).limit(1)).first():
+        raise SystemExit(f"[seed] dataset with seed={seed} already exists (emails {prefix}*)")
+
+    # hash אחד לכולם – pbkdf2 לכל משתמש היה לוקח דקות
+    probe = User()
+    probe.set_password("123456")
+    password_hash = probe.password_hash
+
+    # === מורים ===
+    _bulk_insert(User.__table__, ({
+        "username": f"{fake.first_name()}-t{seed}-{i}",
+        "email": f"{prefix}t{i}@example.com",
+        "password_hash": password_hash,
+        "role": "teacher",
+        "created_at": now - timedelta(days=int(365 * years) + 30),
+        "student_rate_cents": 11000,
+        "students_version": 0,
+    } for i in range(teachers)), batch_size)
+    teacher_ids = _user_ids(f"{prefix}t")
+    print(f"[seed] teachers: {len(teacher_ids)}")
 
     # === תלמידים ===
-    students = [
-        {"username": "יואב", "email": "yoav@classA.com", "grade": "ט'", "school": "אורט סינגלובסקי"},
-        {"username": "נועה", "email": "noa@classB.com", "grade": "י'", "school": "גימנסיה הרצליה"},
-        {"username": "רועי", "email": "roi@classC.com", "grade": "י״א", "school": "תיכון בליך"},
-        {"username": "מאיה", "email": "maya@classD.com", "grade": "י״ב", "school": "תיכון חדש"},
-        {"username": "אדם", "email": "adam@classE.com", "grade": "ח'", "school": "תיכון אבן יהודה"},
-    ]
-
-    for s in students:
-        student = User(
-            username=s["username"],
-            email=s["email"],
-            role="student",
-            teacher_id=teacher.id,
-            grade=s["grade"],
-            school=s["school"],
-        )
-        student.set_password("123456")
-        db.session.add(student)
+    def student_rows():
+        for i in range(students):
+            yield {
+                "username": f"{fake.first_name()}-s{seed}-{i}",
+                "email": f"{prefix}s{i}@example.com",
+                "password_hash": password_hash,
+                "role": "student",
+                "teacher_id": teacher_ids[i % len(teacher_ids)],
+                "grade": str(rng.randint(1, 12)),
+                "school": rng.choice(SCHOOLS),
+                "created_at": now - timedelta(days=rng.randint(0, int(365 * years) + 30)),
+                "student_rate_cents": rng.choice(range(9000, 15001, 500)),
+                "students_version": 0,
+            }
+    _bulk_insert(User.__table__, student_rows(), batch_size)
+    rows = db.session.execute(
+        select(User.id, User.teacher_id, User.student_rate_cents)
+        .where(User.email.like(f"{prefix}s%")).order_by(User.id)
+    ).all()
+    rates = {r.id: r.student_rate_cents for r in rows}
+    by_teacher = {t: [] for t in teacher_ids}
+    for r in rows:
+        by_teacher[r.teacher_id].append(r.id)
+    print(f"[seed] students: {len(rows)}")
 
-    db.session.commit()
-    print(f"[seed] Created {len(students)} students for teacher '{teacher.username}'")
+    # === שיעורים ===
+    start_day = (now - timedelta(days=int(365 * years))).replace(hour=0, minute=0)
+    end_day = (now + timedelta(weeks=4)).replace(hour=0, minute=0)
+    lessons = _lesson_rows(rng, sorted(by_teacher.items()), rates, start_day, end_day, lessons_per_week, now)
+    if use_copy is None:
+        use_copy = db.engine.dialect.name == "postgresql"
+    n_lessons = _copy_lessons(lessons, batch_size) if use_copy else _bulk_insert(Lesson.__table__, lessons, batch_size)
+    print(f"[seed] lessons: {n_lessons} ({'COPY' if use_copy else 'INSERT'})")
+    # ה-INSERT המרוכז עוקף את אירועי Lesson – בונים את יומן החשבון מהשורות
+    if backfill_from_lessons(db.session.connection()):
+        db.session.commit()
+        print("[seed] ledger: rebuilt from lessons")
 
+    # === חומרי לימוד ===
+    def material_rows():
+        for r in rows:
+            for k in range(materials_per_student):
+                yield {
+                    "student_id": r.id,
+                    "teacher_id": r.teacher_id,
+                    "title": fake.sentence(nb_words=4),
+                    "description": fake.sentence(nb_words=10),
+                    "link_url": f"https://example.com/m/{r.id}/{k}",
+                    "file_path": None,
+                    "file_name": None,
+                    "created_at": now - timedelta(days=rng.randint(0, int(365 * years))),
+                }
+    n_materials = _bulk_insert(StudentMaterial.__table__, material_rows(), batch_size)
+    print(f"[seed] materials: {n_materials}")
+
+    # === לידים ===
+    n_leads = _bulk_insert(Lead.__table__, ({
+        "name": fake.name(),
+        "phone": fake.phone_number(),
+        "email": fake.email() if rng.random() < 0.7 else None,
+        "message": fake.sentence(nb_words=12),
+        "created_at": now - timedelta(days=rng.randint(0, int(365 * years))),
+    } for _ in range(leads)), batch_size)
+    print(f"[seed] leads: {n_leads}")
+    print(f"[seed] done in {time.perf_counter() - t0:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetic dataset generator")
+    parser.add_argument("--teachers", type=int, default=1)
+    parser.add_argument("--students", type=int, default=5, help="סה\"כ תלמידים, מחולקים בין המורים")
+    parser.add_argument("--years", type=float, default=1.0, help="כמה שנים אחורה של היסטוריה")
+    parser.add_argument("--lessons-per-week", type=int, default=10, help="ממוצע שיעורים בשבוע לכל מורה")
+    parser.add_argument("--materials-per-student", type=int, default=3)
+    parser.add_argument("--leads", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--no-copy", action="store_true", help="גם ב-Postgres: INSERT במקום COPY")
+    parser.add_argument("--anchor-date", default=DEFAULT_ANCHOR,
+                        help=f"YYYY-MM-DD או today; כל התאריכים יחסיים אליו (ברירת מחדל {DEFAULT_ANCHOR})")
+    parser.add_argument("--no-demo", action="store_true", help="בלי משתמשי הדמו (לימור + 5 תלמידים)")
+    args = parser.parse_args(argv)
+    try:
+        anchor = parse_anchor(args.anchor_date)
+    except ValueError:
+        parser.error("--anchor-date must be YYYY-MM-DD or 'today'")
 
-if __name__ == "__main__":
     app = create_app()
     with app.app_context():
-        seed_all()
+        seed_all(
+            teachers=args.teachers,
+            students=args.students,
+            years=args.years,
+            lessons_per_week=args.lessons_per_week,
+            materials_per_student=args.materials_per_student,
+            leads=args.leads,
+            seed=args.seed,
+            batch_size=args.batch_size,
+            use_copy=False if args.no_copy else None,
+            anchor=anchor,
+            demo=not args.no_demo,
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,10 @@
 #!/bin/bash
 set -e
 
+# ניהול סכימה קורה כאן, פעם אחת – לא בכל worker
 flask db upgrade || true
+flask init-db
+# גרסאות .gz/.br של static ש-nginx מגיש ישירות
+flask assets build || true
 
-python /app/seed_teacher.py || true
-
-exec gunicorn -w 3 --threads 2 --bind 0.0.0.0:8000 wsgi:app
-
+exec gunicorn -c gunicorn.conf.py wsgi:app
@@ -0,0 +1,63 @@
+# tests/support.py
+"""
+בסיס משותף לבדיקות: אפליקציה אחת לכל מחלקה על SQLite זמני, עם TESTING
+פעיל – כך ש-@query_budget נאכף. מחלקה עם use_test_database = True רצה על
+TEST_DATABASE_URL אם הוגדר (ב-CI: ה-Postgres של ה-compose, שכבר מכיל
+נתונים – רק לבדיקות שלא כותבות).
+"""
+import os
+import tempfile
+import unittest
+
+ENV_KEYS = ("SQLALCHEMY_DATABASE_URI", "DATABASE_URL", "METRICS_ENABLED", "QUERY_TRACE")
+
+
+class AppTestCase(unittest.TestCase):
+    use_test_database = False
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls._saved_env = {k: os.environ.get(k) for k in ENV_KEYS}
+        url = ((cls.use_test_database and os.getenv("TEST_DATABASE_URL"))
+               or f"sqlite:///{os.path.join(cls._tmp.name, 'test.db')}")
+        os.environ.pop("SQLALCHEMY_DATABASE_URI", None)
+        os.environ.pop("QUERY_TRACE", None)
+        os.environ["DATABASE_URL"] = url
+        os.environ["METRICS_ENABLED"] = "0"
+
+        from app import create_app
+        from app.extensions import db
+
+        cls.app = create_app()
+        cls.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+        cls.db = db
+        with cls.app.app_context():
+            db.create_all()
+
+    @classmethod
+    def tearDownClass(cls):
+        with cls.app.app_context():
+            cls.db.session.remove()
+            cls.db.engine.dispose()
+        for k, v in cls._saved_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        cls._tmp.cleanup()
+
+    @classmethod
+    def add_user(cls, username, role="student", **kwargs):
+        from app.models import User
+
+        user = User(username=username, email=f"{username}@example.com", role=role,
+                    password_hash="x", **kwargs)
+        cls.db.session.add(user)
+        cls.db.session.commit()
+        return user.id
+
+    def login(self, client, user_id):
+        with client.session_transaction() as sess:
+            sess["_user_id"] = str(user_id)
+            sess["_fresh"] = True
@@ -0,0 +1,122 @@
+# tests/test_api.py
+"""
+/api/v1: הרשאות, עימוד לפי cursor, fields=, ids= ו-gzip – כל בקשה בתוך
+ה-@query_budget של ה-endpoint (נאכף תחת TESTING).
+"""
+import gzip
+import unittest
+from datetime import datetime, timedelta
+
+from support import AppTestCase
+
+
+class ApiTest(AppTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from app.models import Lesson
+        from app.utils.ledger import record_payment
+
+        with cls.app.app_context():
+            cls.teacher = cls.add_user("api_teacher", role="teacher")
+            cls.other_teacher = cls.add_user("api_other", role="teacher")
+            cls.student = cls.add_user("api_student", teacher_id=cls.teacher)
+            cls.other_student = cls.add_user("api_student2", teacher_id=cls.other_teacher)
+
+            start = datetime(2025, 1, 6, 16)
+            lessons = [
+                Lesson(teacher_id=cls.teacher, student_id=cls.student, status="done",
+                       start_at=start + timedelta(days=i), end_at=start + timedelta(days=i, hours=1),
+                       notes="x" * 200)
+                for i in range(7)
+            ]
+            lessons.append(Lesson(teacher_id=cls.other_teacher, student_id=cls.other_student,
+                                  start_at=start, end_at=start + timedelta(hours=1)))
+            cls.db.session.add_all(lessons)
+            cls.db.session.commit()
+            cls.lesson_ids = [l.id for l in lessons[:7]]
+            cls.foreign_lesson = lessons[7].id
+
+            conn = cls.db.session.connection()
+            for lesson_id in cls.lesson_ids[:3]:
+                record_payment(conn, teacher_id=cls.teacher, student_id=cls.student, amount_cents=11000,
+                               method="cash", allocations={lesson_id: 11000})
+            cls.db.session.commit()
+
+    def client_for(self, user_id):
+        client = self.app.test_client()
+        self.login(client, user_id)
+        return client
+
+    def test_requires_login(self):
+        response = self.app.test_client().get("/api/v1/lessons")
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("error", response.get_json())
+
+    def test_cursor_pagination_walks_all_own_lessons(self):
+        client = self.client_for(self.teacher)
+        seen, cursor = [], None
+        while True:
+            url = "/api/v1/lessons?limit=3" + (f"&cursor={cursor}" if cursor else "")
+            body = client.get(url).get_json()
+            seen += [row["id"] for row in body["data"]]
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(seen, self.lesson_ids)
+
+    def test_descending_order_and_bad_cursor(self):
+        client = self.client_for(self.teacher)
+        body = client.get("/api/v1/lessons?order=desc&limit=2").get_json()
+        self.assertEqual([row["id"] for row in body["data"]], self.lesson_ids[:-3:-1])
+        # cursor של asc לא תקף ל-desc
+        asc_cursor = client.get("/api/v1/lessons?limit=2").get_json()["next_cursor"]
+        response = client.get(f"/api/v1/lessons?order=desc&cursor={asc_cursor}")
+        self.assertEqual(response.status_code, 400)
+
+    def test_fields(self):
+        client = self.client_for(self.teacher)
+        body = client.get("/api/v1/lessons?fields=status,notes&limit=1").get_json()
+        self.assertEqual(set(body["data"][0]), {"id", "status", "notes"})
+        self.assertEqual(client.get("/api/v1/lessons?fields=password_hash").status_code, 400)
+
+    def test_student_cannot_see_private_fields(self):
+        client = self.client_for(self.student)
+        self.assertEqual(client.get("/api/v1/lessons?fields=paid_amount").status_code, 400)
+        body = client.get("/api/v1/lessons").get_json()
+        self.assertEqual(len(body["data"]), 7)
+        self.assertNotIn("paid_status", body["data"][0])
+
+    def test_bulk_ids_hides_other_teachers_rows(self):
+        client = self.client_for(self.teacher)
+        ids = f"{self.lesson_ids[0]},{self.foreign_lesson}"
+        body = client.get(f"/api/v1/lessons?ids={ids}").get_json()
+        self.assertEqual([row["id"] for row in body["data"]], [self.lesson_ids[0]])
+        self.assertEqual(body["missing"], [self.foreign_lesson])
+        self.assertEqual(client.get(f"/api/v1/lessons/{self.foreign_lesson}").status_code, 404)
+
+    def test_payments_skip_allocations(self):
+        client = self.client_for(self.teacher)
+        response = client.get("/api/v1/payments")
+        self.assertEqual(len(response.get_json()["data"]), 3)
+        # המשתמש + התשלומים; בלי ה-selectin של Payment.allocations
+        self.assertEqual(response.headers["X-Query-Count"], "2")
+        first = response.get_json()["data"][0]["id"]
+        self.assertEqual(client.get(f"/api/v1/payments?ids={first}").headers["X-Query-Count"], "2")
+
+    def test_students_teacher_only(self):
+        self.assertEqual(self.client_for(self.student).get("/api/v1/students").status_code, 403)
+        body = self.client_for(self.teacher).get("/api/v1/students").get_json()
+        self.assertEqual([row["id"] for row in body["data"]], [self.student])
+
+    def test_gzip(self):
+        client = self.client_for(self.teacher)
+        response = client.get("/api/v1/lessons?fields=notes", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers.get("Content-Encoding"), "gzip")
+        self.assertIn(b'"notes"', gzip.decompress(response.data))
+        plain = client.get("/api/v1/lessons?fields=notes")
+        self.assertNotIn("Content-Encoding", plain.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
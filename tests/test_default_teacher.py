@@ -0,0 +1,59 @@
+# tests/test_default_teacher.py
+"""
+get_default_teacher: ערך מהמטמון נבדק מול המסד, כך ששינוי שה-worker הנוכחי
+לא שמע עליו (מחיקה / אימייל חדש ב-worker אחר) לא מחזיר מורה ישן.
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from support import AppTestCase
+
+
+class DefaultTeacherTest(AppTestCase):
+    def setUp(self):
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        from app.utils.cache import get_cache
+
+        self.db.session.execute(text('DELETE FROM "user"'))
+        self.db.session.commit()
+        get_cache().clear()
+        old = datetime(2020, 1, 1)
+        self.first = self.add_user("first_teacher", role="teacher", created_at=old)
+        self.second = self.add_user("second_teacher", role="teacher", created_at=old + timedelta(days=1))
+
+    def tearDown(self):
+        self.db.session.remove()
+        self.ctx.pop()
+
+    def behind_the_cache(self, sql, **params):
+        """שינוי כמו מ-worker אחר: ישירות במסד, בלי אירועי ה-ORM שמבטלים את המטמון."""
+        self.db.session.execute(text(sql), params)
+        self.db.session.commit()
+
+    def test_returns_oldest_teacher(self):
+        from app.utils.teacher import get_default_teacher
+
+        t = get_default_teacher()
+        self.assertEqual((t.id, t.email), (self.first, "first_teacher@example.com"))
+
+    def test_deleted_teacher_is_reloaded(self):
+        from app.utils.teacher import get_default_teacher
+
+        get_default_teacher()
+        self.behind_the_cache('DELETE FROM "user" WHERE id = :id', id=self.first)
+        self.assertEqual(get_default_teacher().id, self.second)
+
+    def test_changed_email_is_reloaded(self):
+        from app.utils.teacher import get_default_teacher
+
+        get_default_teacher()
+        self.behind_the_cache('UPDATE "user" SET email = :email WHERE id = :id',
+                              email="new@example.com", id=self.first)
+        self.assertEqual(get_default_teacher().email, "new@example.com")
+
+
+if __name__ == "__main__":
+    unittest.main()
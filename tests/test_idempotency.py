@@ -0,0 +1,69 @@
+# tests/test_idempotency.py
+"""
+@idempotent: בקשה חוזרת עם אותו מפתח לא רצה שוב, מפתח עם גוף אחר מקבל 422,
+ותפיסת המפתח לא גורמת ל-view לטעון מחדש את current_user.
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from support import AppTestCase
+
+
+class IdempotencyTest(AppTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with cls.app.app_context():
+            cls.teacher = cls.add_user("idem_teacher", role="teacher")
+            cls.student = cls.add_user("idem_student", teacher_id=cls.teacher)
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.login(self.client, self.teacher)
+        self.day = getattr(type(self), "_day", 0) + 1
+        type(self)._day = self.day
+
+    def lesson_form(self, **extra):
+        start = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=self.day)
+        return {"student_id": str(self.student), "start_at": start.strftime("%d/%m/%Y %H:%M"),
+                "duration_minutes": "60", **extra}
+
+    def count(self, sql, **params):
+        with self.app.app_context():
+            return self.db.session.execute(text(sql), params).scalar()
+
+    def test_repeated_key_is_replayed(self):
+        before = self.count("SELECT COUNT(*) FROM lesson")
+        form = self.lesson_form(idempotency_key="lesson-key-0001")
+        first = self.client.post("/teacher/lessons/new", data=form)
+        second = self.client.post("/teacher/lessons/new", data=form)
+        self.assertEqual(first.status_code, 302)
+        self.assertEqual(second.status_code, 302)
+        self.assertEqual(second.headers.get("Idempotent-Replayed"), "true")
+        self.assertEqual(second.headers["Location"], first.headers["Location"])
+        self.assertEqual(self.count("SELECT COUNT(*) FROM lesson"), before + 1)
+
+    def test_same_key_different_body_is_rejected(self):
+        self.client.post("/teacher/lessons/new", data=self.lesson_form(idempotency_key="lesson-key-0002"))
+        response = self.client.post("/teacher/lessons/new",
+                                    data=self.lesson_form(idempotency_key="lesson-key-0002", note="other"))
+        self.assertEqual(response.status_code, 422)
+
+    def test_claim_keeps_current_user_loaded(self):
+        response = self.client.post("/teacher/lessons/new", data=self.lesson_form(idempotency_key="lesson-key-0003"))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.headers["X-Query-Repeats"], "0")
+
+    def test_account_payment_is_idempotent(self):
+        form = {"amount": "50", "payment_method": "cash", "idempotency_key": "account-key-0001"}
+        url = f"/teacher/students/{self.student}/account"
+        before = self.count("SELECT COUNT(*) FROM payment")
+        self.client.post(url, data=form)
+        self.assertEqual(self.client.post(url, data=form).headers.get("Idempotent-Replayed"), "true")
+        self.assertEqual(self.count("SELECT COUNT(*) FROM payment"), before + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+# tests/test_ledger.py
+"""יומן החשבון: דף חשבון חתוך מציג את התנועות האחרונות, ומילוי מהעמודות הישנות."""
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from support import AppTestCase
+
+
+class LedgerTest(AppTestCase):
+    def setUp(self):
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        for table in ("payment_allocation", "ledger_entry", "payment", "student_balance", "lesson", '"user"'):
+            self.db.session.execute(text(f"DELETE FROM {table}"))
+        self.db.session.commit()
+        self.teacher = self.add_user("ledger_teacher", role="teacher")
+        self.student = self.add_user("ledger_student", teacher_id=self.teacher)
+
+    def tearDown(self):
+        self.db.session.remove()
+        self.ctx.pop()
+
+    def test_truncated_statement_shows_latest_entries(self):
+        from app.utils.ledger import record_payment, statement
+
+        conn = self.db.session.connection()
+        for cents in (100, 200, 300, 400, 500):
+            record_payment(conn, teacher_id=self.teacher, student_id=self.student, amount_cents=cents)
+        self.db.session.commit()
+
+        opening, entries, truncated = statement(self.student, limit=3)
+        self.assertTrue(truncated)
+        self.assertEqual([e.amount_cents for e in entries], [300, 400, 500])
+        self.assertEqual(opening, 300)
+        self.assertEqual(entries[-1].balance_after_cents, 1500)
+
+        opening, entries, truncated = statement(self.student, limit=5)
+        self.assertFalse(truncated)
+        self.assertEqual((opening, len(entries)), (0, 5))
+
+    def test_backfill_matches_cost_cents(self):
+        from app.models import Lesson
+        from app.utils.ledger import backfill_from_lessons, cost_cents, sync_lesson_charges
+
+        start = datetime(2025, 1, 6, 16)
+        # 5030 * 45 / 60 = 3772.5: ROUND של SQL נותן 3773, cost_cents נותן 3772
+        for i, (rate, minutes) in enumerate([(5030, 45), (5090, 45), (11000, 60)]):
+            self.db.session.execute(text(
+                "INSERT INTO lesson (teacher_id, student_id, start_at, end_at, status, duration_minutes, "
+                "hourly_rate_cents, hourly_rate_at_time_cents, paid_amount, paid_status) "
+                "VALUES (:t, :s, :a, :b, 'done', :m, :r, :r, 0, 'unpaid')"),
+                {"t": self.teacher, "s": self.student, "a": start + timedelta(days=i),
+                 "b": start + timedelta(days=i, minutes=minutes), "m": minutes, "r": rate})
+        self.db.session.commit()
+
+        conn = self.db.session.connection()
+        self.assertTrue(backfill_from_lessons(conn, include_archive=False))
+        charges = dict(conn.execute(text("SELECT lesson_id, amount_cents FROM ledger_entry")).all())
+        lessons = Lesson.query.all()
+        for lesson in lessons:
+            self.assertEqual(charges[lesson.id],
+                             -cost_cents(lesson.hourly_rate_at_time_cents, lesson.duration_minutes))
+
+        sync_lesson_charges(conn, lessons)
+        count = conn.execute(text("SELECT COUNT(*) FROM ledger_entry")).scalar()
+        self.assertEqual(count, len(lessons))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+# tests/test_lesson_indexes.py
+"""
+נועל את האינדקסים של נתיבי הגישה החמים: כל שאילתה ב-access_paths() חייבת
+לרוץ על אחד האינדקסים שהוגדרו עבורה (EXPLAIN), ולא בסריקה מלאה.
+
+    python -m unittest discover -s tests -v
+
+ברירת המחדל: SQLite זמני שנבנה ב-create_all. TEST_DATABASE_URL מריץ את אותן
+בדיקות על מסד אחר (ב-CI: ה-Postgres של ה-compose).
+"""
+import unittest
+
+from support import AppTestCase
+
+
+class LessonIndexPlanTest(AppTestCase):
+    use_test_database = True
+
+    def test_access_paths_use_their_indexes(self):
+        from scripts.explain_lesson_queries import access_paths, used_indexes
+
+        with self.app.app_context():
+            with self.db.engine.connect() as conn:
+                for name, query, expected in access_paths():
+                    with self.subTest(name):
+                        with conn.begin():
+                            used, plan = used_indexes(conn, query)
+                        self.assertTrue(used & expected,
+                                        f"{name}: expected one of {sorted(expected)}, "
+                                        f"used {sorted(used) or 'none'}\n{plan}")
+
+    def test_lessons_completed_uses_teacher_status_start(self):
+        from app.models import Lesson
+        from scripts.explain_lesson_queries import used_indexes
+
+        with self.app.app_context():
+            query = (Lesson.query.filter(Lesson.teacher_id == 1, Lesson.status == "done")
+                     .order_by(Lesson.start_at.desc()))
+            with self.db.engine.connect() as conn:
+                with conn.begin():
+                    used, plan = used_indexes(conn, query)
+        self.assertIn("ix_lesson_teacher_status_start", used, plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+# tests/test_payments.py
+"""סימון תשלום מרוכז: קלט לא תקין מחזיר 400 ולא 500."""
+import unittest
+from datetime import datetime, timedelta
+
+from support import AppTestCase
+
+
+class PaymentsBatchTest(AppTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from app.models import Lesson
+
+        with cls.app.app_context():
+            cls.teacher = cls.add_user("pay_teacher", role="teacher")
+            student = cls.add_user("pay_student", teacher_id=cls.teacher)
+            start = datetime(2025, 1, 6, 16)
+            lesson = Lesson(teacher_id=cls.teacher, student_id=student, status="done",
+                            start_at=start, end_at=start + timedelta(hours=1))
+            cls.db.session.add(lesson)
+            cls.db.session.commit()
+            cls.lesson = lesson.id
+
+    def post(self, payload):
+        client = self.app.test_client()
+        self.login(client, self.teacher)
+        return client.post("/teacher/lessons/payments", json=payload)
+
+    def test_non_finite_amount_is_rejected(self):
+        for amount in ("inf", "-inf", "nan", "1e400"):
+            with self.subTest(amount):
+                response = self.post({"lesson_ids": [self.lesson], "payment_method": "cash", "amount": amount})
+                self.assertEqual(response.status_code, 400)
+
+    def test_non_object_body_is_rejected(self):
+        for payload in ([self.lesson], "cash", 3):
+            with self.subTest(payload):
+                self.assertEqual(self.post(payload).status_code, 400)
+
+    def test_valid_payment(self):
+        response = self.post({"lesson_ids": [self.lesson], "payment_method": "cash", "amount": "110"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["updated"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+# tests/test_query_budget.py
+"""
+@query_budget נאכף בבדיקות: view שחורג מהתקציב נכשל ב-QueryBudgetExceeded,
+ופקודות טרנזקציה (BEGIN / BEGIN IMMEDIATE של SQLite) לא נספרות.
+"""
+import unittest
+
+from sqlalchemy import text
+
+from support import AppTestCase
+
+
+class QueryBudgetTest(AppTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from app.utils.querytrace import query_budget
+
+        db = cls.db
+
+        def two_queries():
+            db.session.execute(text("SELECT 1")).scalar()
+            db.session.execute(text("SELECT 2")).scalar()
+            db.session.commit()
+            return "ok"
+
+        def write_and_read():
+            db.session.execute(text('UPDATE "user" SET grade = grade WHERE id = 0'))
+            db.session.commit()
+            db.session.execute(text("SELECT 1")).scalar()
+            db.session.commit()
+            return "ok"
+
+        cls.app.add_url_rule("/_budget/over", "budget_over", query_budget(1)(two_queries))
+        cls.app.add_url_rule("/_budget/exact", "budget_exact", query_budget(2)(two_queries))
+        cls.app.add_url_rule("/_budget/write", "budget_write", query_budget(2)(write_and_read))
+
+    def test_over_budget_fails(self):
+        from app.utils.querytrace import QueryBudgetExceeded
+
+        with self.assertRaises(QueryBudgetExceeded):
+            self.app.test_client().get("/_budget/over")
+
+    def test_within_budget_passes(self):
+        response = self.app.test_client().get("/_budget/exact")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Query-Count"], "2")
+
+    def test_transaction_statements_not_counted(self):
+        response = self.app.test_client().get("/_budget/write")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Query-Count"], "2")
+
+    def test_real_view_over_budget_fails(self):
+        from app.utils.querytrace import QueryBudgetExceeded
+
+        teacher_id = self._teacher()
+        view = self.app.view_functions["teacher.dashboard"]
+        budget = view._query_budget
+        client = self.app.test_client()
+        self.login(client, teacher_id)
+        try:
+            view._query_budget = 0
+            with self.assertRaises(QueryBudgetExceeded):
+                client.get("/teacher/dashboard")
+        finally:
+            view._query_budget = budget
+        self.assertEqual(client.get("/teacher/dashboard").status_code, 200)
+
+    def _teacher(self):
+        with self.app.app_context():
+            from app.models import User
+
+            existing = User.query.filter_by(username="budget_teacher").first()
+            return existing.id if existing else self.add_user("budget_teacher", role="teacher")
+
+
+if __name__ == "__main__":
+    unittest.main()